@@ -2,13 +2,22 @@
 
 이 서버는 다음과 같은 도구를 제공합니다.
 - get_conversation_history: 최근 대화 기록을 조회
-- plot: 업로드된 데이터셋으로 기본 차트를 생성하고 이미지 파일 경로 반환
+- search_conversation_history: 전체 대화 기록에서 키워드로 관련 메시지 발췌를 검색(FTS5)
+- plot: 업로드된 데이터셋의 균등 표본 계층으로 기본 차트를 생성하고 이미지 파일 경로 반환
+- query_data: 전체 데이터셋에 대한 정확한 필터/그룹/집계/상위 N 질의(결과 캐시).
+  `max_error`를 주면 표본 계층으로 빠르게 근사(오차 한계 포함)
+- get_dataset_summary: 업로드 시 미리 계산된 컬럼 요약(타입/범위/카디널리티/상위 값/결측률)
+  (같은 내용을 `dataset://{dataset_id}/summary` 리소스로도 제공)
 
 LangGraph 에이전트는 표준 입출력(stdio)로 이 서버와 통신합니다.
 """
 
+import asyncio
+import hashlib
+import json
 import os
 import sys
+import threading
 import time
 from pathlib import Path
 
@@ -25,8 +34,13 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from mcp.server.fastmcp import FastMCP
 from mcp.server.fastmcp.prompts import base
+from config import settings
 from core.memory import get_memory
-from core.data_processing.meta import read_meta, get_latest_uploaded_file
+from core.data_processing.meta import dataset_dir, read_meta, get_latest_uploaded_file
+from core.data_processing.load import load_frame
+from core.data_processing.query import normalize_spec, required_columns, run_query
+from core.data_processing.samples import load_sample, scale_estimates
+from core.data_processing.summary import build_summary, read_summary
 
 mcp = FastMCP("DataAnalysis")
 
@@ -34,6 +48,7 @@ mcp = FastMCP("DataAnalysis")
 global_df = None
 data_dir = Path("data")
 plots_dir = data_dir / "plots"
+_PLOT_LOCK = threading.Lock()  # 도구 본문은 스레드에서 실행되므로 pyplot 사용을 직렬화
 plots_dir.mkdir(parents=True, exist_ok=True)
 
 @mcp.prompt()
@@ -72,6 +87,56 @@ async def get_conversation_history(limit: int = 20, user_id: str = "default") ->
     except Exception as e:
         return f"대화 기록 조회 중 오류 발생: {str(e)}"
 
+@mcp.tool()
+async def search_conversation_history(query: str, limit: int = 5, user_id: str = "default") -> str:
+    """전체 대화 기록에서 키워드로 관련 메시지를 찾아 관련도 순 발췌를 반환합니다.
+
+    오래전에 나눈 대화를 떠올려야 할 때 get_conversation_history로 전체를 불러오는 대신 사용하세요.
+
+    Args:
+        query: 검색어(공백으로 구분한 단어를 모두 포함하는 메시지를 찾음)
+        limit: 최대 결과 수(기본 5, 최대 20)
+        user_id: 사용자 ID
+    """
+    try:
+        memory = get_memory(user_id)
+        results = memory.search_messages(query, limit=max(1, min(int(limit), 20)))
+        if not results:
+            return f"'{query}'와 일치하는 대화 기록이 없습니다."
+
+        lines = [f"'{query}' 검색 결과 {len(results)}건(관련도 순):"]
+        for r in results:
+            role_name = "사용자" if r["role"] == "user" else "어시스턴트"
+            lines.append(f"- [#{r['id']}] {role_name} ({r['timestamp']}): {r['snippet']}")
+        return "\n".join(lines)
+
+    except Exception as e:
+        return f"대화 기록 검색 중 오류 발생: {str(e)}"
+
+
+def _resolve_dataset(dataset_id: str | None):
+    """dataset_id(미지정 시 최신 업로드)의 (dsid, meta)를 찾습니다. 실패 시 (None, 오류 dict)."""
+    if not dataset_id:
+        dsid, meta = get_latest_uploaded_file()
+    else:
+        dsid = dataset_id
+        meta = read_meta(dsid)
+
+    if not dsid or not meta:
+        return None, {
+            "error": "NO_DATASET",
+            "message": "사용 가능한 업로드 데이터셋이 없습니다.",
+        }
+
+    raw_path = Path(meta.get("raw_path", ""))
+    if not raw_path.exists():
+        return None, {
+            "error": "MISSING_FILE",
+            "message": f"원본 파일을 찾을 수 없습니다: {raw_path}",
+        }
+    return dsid, meta
+
+
 # -------------------- 추가 도구: 데이터 시각화 --------------------
 
 @mcp.tool()
@@ -82,11 +147,14 @@ async def plot(
     hue: str | None = None,
     title: str | None = None,
     dataset_id: str | None = None,
-    limit: int = 5000,
+    limit: int = 100_000,
     bins: int | None = None,
+    max_error: float | None = None,
 ) -> dict:
     """업로드된 데이터셋으로 차트를 생성하고 이미지 경로를 반환합니다.
 
+    앞부분 행이 아니라 업로드 시 만든 균등 무작위 표본 중 정확도 목표를 만족하는 가장 작은 계층을 사용합니다.
+
     Args:
         kind: 차트 유형. hist|bar|line|scatter|box|heatmap 지원.
         x: x축 컬럼명(필요한 경우).
@@ -94,45 +162,32 @@ async def plot(
         hue: 카테고리 분할 컬럼명(선택).
         title: 차트 제목(선택).
         dataset_id: 대상 데이터셋 ID(미지정 시 최신 업로드 사용).
-        limit: 로딩할 최대 행 수(기본 5000, 메모리 보호용).
+        limit: 로딩할 최대 행 수(기본 100000, 메모리 보호용). 이보다 큰 표본 계층은 쓰지 않습니다.
         bins: 히스토그램 bin 개수(선택).
+        max_error: 비율(막대 높이, 히스토그램 구간 비중 등)의 95% 오차 한계 목표(기본 0.02 = ±2%p).
 
     Returns:
-        {"path": 이미지 파일 경로, "title": 제목, "kind": 종류, "columns_used": [..], "rows_used": N}
+        {"path": 이미지 파일 경로, "title": 제목, "kind": 종류, "columns_used": [..], "rows_used": N,
+         "total_rows": 전체 행 수, "margin_of_error": 사용한 표본의 오차 한계, "exact": 전체를 사용했는지}
     """
-    # 1) 대상 데이터셋 식별 및 메타 로드
-    if not dataset_id:
-        dsid, meta = get_latest_uploaded_file()
-    else:
-        dsid = dataset_id
-        meta = read_meta(dsid)
-
-    if not dsid or not meta:
-        return {
-            "error": "NO_DATASET",
-            "message": "사용 가능한 업로드 데이터셋이 없습니다.",
-        }
+    # pandas/matplotlib/파일 I/O는 블로킹이므로 스레드에서 실행해 MCP 이벤트 루프를 막지 않습니다.
+    return await asyncio.to_thread(_plot, kind, x, y, hue, title, dataset_id, limit, bins, max_error)
 
-    raw_path = Path(meta.get("raw_path", ""))
-    sniff = meta.get("sniff", {}) or {}
-    encoding = sniff.get("encoding") or "utf-8"
-    sep = sniff.get("delimiter") or None
 
-    if not raw_path.exists():
-        return {
-            "error": "MISSING_FILE",
-            "message": f"원본 파일을 찾을 수 없습니다: {raw_path}",
-        }
+def _plot(kind, x, y, hue, title, dataset_id, limit, bins, max_error) -> dict:
+    # 1) 대상 데이터셋 식별 및 메타 로드
+    dsid, meta = _resolve_dataset(dataset_id)
+    if not dsid:
+        return meta
 
-    # 2) 데이터 로드(상한선)
+    # 2) 정확도 목표에 맞는 표본 계층 로드(상한선)
     try:
-        df = pd.read_csv(
-            raw_path,
-            sep=sep,
-            encoding=encoding,
-            engine="python",
-            nrows=max(100, int(limit)),
-            on_bad_lines="skip",
+        df, sample = load_sample(
+            dsid,
+            meta,
+            max_error or settings.SAMPLE_MAX_ERROR,
+            max_rows=max(100, int(limit)),
+            tiers=settings.SAMPLE_TIERS,
         )
     except Exception as e:
         return {"error": "LOAD_FAILED", "message": f"데이터 로드 실패: {e}"}
@@ -145,7 +200,12 @@ async def plot(
     if y and y not in used_cols: used_cols.append(y)
     if hue and hue not in used_cols: used_cols.append(hue)
 
-    # 3) 차트 생성
+    # 3) 차트 생성(pyplot 전역 상태를 쓰므로 렌더링/저장은 한 번에 하나씩)
+    with _PLOT_LOCK:
+        return _render_plot(df, sample, dsid, kind, x, y, title, bins, used_cols)
+
+
+def _render_plot(df, sample, dsid, kind, x, y, title, bins, used_cols) -> dict:
     plt.figure(figsize=(8, 5))
     try:
         k = (kind or "").lower()
@@ -165,7 +225,7 @@ async def plot(
             tmp = (
                 df[[x, y]]
                 .dropna()
-                .groupby(x)[y]
+                .groupby(x, observed=True)[y]
                 .mean()
                 .sort_values(ascending=False)
                 .head(20)
@@ -241,9 +301,176 @@ async def plot(
         "kind": kind,
         "columns_used": used_cols,
         "rows_used": int(len(df)),
+        "total_rows": sample["total_rows"],
+        "margin_of_error": sample["margin_of_error"],
+        "exact": sample["exact"],
         "dataset_id": dsid,
     }
 
 
+# -------------------- 추가 도구: 정확한 집계 질의 --------------------
+
+def _query_cache_path(dsid: str, meta: dict, spec: dict) -> Path:
+    """(데이터셋, 질의) 결과 캐시 경로. 원본 파일 크기/수정 시각을 키에 넣어 변경 시 자동 무효화합니다."""
+    stat = Path(meta["raw_path"]).stat()
+    key = json.dumps({"spec": spec, "size": stat.st_size, "mtime": stat.st_mtime_ns}, sort_keys=True, ensure_ascii=False)
+    return dataset_dir(dsid) / "query_cache" / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.json"
+
+
+def _prune_query_cache(cache_dir: Path, keep: int):
+    """캐시 파일이 `keep`개를 넘으면 마지막 사용(mtime)이 오래된 것부터 지웁니다."""
+    entries = sorted(cache_dir.glob("*.json"), key=lambda p: p.stat().st_mtime_ns, reverse=True)
+    for stale in entries[max(0, keep):]:
+        stale.unlink(missing_ok=True)
+
+
+def _approximate_query(dsid: str, meta: dict, spec: dict, needed: set, max_error: float) -> dict:
+    """표본 계층에서 질의를 계산하고 건수/합계를 전체 규모로 환산합니다(결과 캐시 안 함)."""
+    try:
+        df, sample = load_sample(dsid, meta, max_error, columns=sorted(needed) or None, tiers=settings.SAMPLE_TIERS)
+        result = run_query(df, spec)
+    except Exception as e:
+        return {"error": "QUERY_FAILED", "message": f"근사 질의 실패: {e}"}
+    if not sample["exact"] and sample["sample_rows"]:
+        result = scale_estimates(result, sample["total_rows"] / sample["sample_rows"])
+    return {**result, "dataset_id": dsid, "cached": False, "approximate": not sample["exact"], **sample}
+
+
+@mcp.tool()
+async def query_data(
+    group_by: list[str] | None = None,
+    metrics: list[str] | None = None,
+    filters: list[dict] | None = None,
+    columns: list[str] | None = None,
+    sort_by: str | None = None,
+    ascending: bool = False,
+    top_n: int = 20,
+    dataset_id: str | None = None,
+    max_error: float | None = None,
+) -> dict:
+    """전체 데이터셋에서 필터/그룹별 집계/정렬/상위 N을 정확히 계산합니다.
+
+    평균·합계·건수·최댓값, 그룹별 비교, 상위 N 행 같은 통계 질문은 doc_search 대신 이 도구를 한 번 호출하세요.
+    대략적인 비율/추세만 필요하면 `max_error`를 주어 표본 계층으로 빠르게 근사할 수 있습니다.
+
+    Args:
+        group_by: 그룹 기준 컬럼 목록(예: ["region"]).
+        metrics: "<컬럼>:<집계>" 목록. 집계는 count|sum|mean|min|max|median|nunique|std,
+            행 수는 "count"(예: ["sales:mean", "count"]).
+        filters: [{"column": 컬럼, "op": 연산자, "value": 값}] (AND 결합).
+            op는 ==|!=|>|>=|<|<=|in|not_in|contains|isnull|notnull.
+        columns: 집계 없이 행을 조회할 때 반환할 컬럼.
+        sort_by: 정렬 기준 컬럼(집계 결과 컬럼명은 "<컬럼>_<집계>" 또는 "count").
+        ascending: 오름차순 여부(기본 내림차순).
+        top_n: 반환할 최대 행 수(기본 20, 최대 500).
+        dataset_id: 대상 데이터셋 ID(미지정 시 최신 업로드 사용).
+        max_error: 근사 모드. 비율의 95% 오차 한계 목표(예: 0.01). 이를 만족하는 가장 작은 표본 계층에서
+            계산하고 건수(count)/합계(*_sum)/matched_rows는 전체 규모로 환산합니다. 미지정 시 정확 계산.
+
+    Returns:
+        {"columns": [..], "rows": [[..]], "matched_rows": N, "result_rows": M, "truncated": bool,
+         "dataset_id": dsid, "cached": bool}
+        근사 모드: + {"approximate": true, "sample_rows", "total_rows", "margin_of_error"}
+    """
+    return await asyncio.to_thread(
+        _query_data, group_by, metrics, filters, columns, sort_by, ascending, top_n, dataset_id, max_error
+    )
+
+
+def _query_data(group_by, metrics, filters, columns, sort_by, ascending, top_n, dataset_id, max_error) -> dict:
+    dsid, meta = _resolve_dataset(dataset_id)
+    if not dsid:
+        return meta
+
+    try:
+        spec = normalize_spec(filters, group_by, metrics, columns, sort_by, ascending, top_n)
+    except ValueError as e:
+        return {"error": "ARGS", "message": str(e)}
+
+    cache_path = _query_cache_path(dsid, meta, spec)
+    if cache_path.exists():
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            os.utime(cache_path)  # 적중한 항목은 최근 사용으로 표시(LRU)
+            return {**cached, "cached": True}
+        except Exception:
+            pass
+
+    needed = required_columns(spec)
+    unknown = needed - set(meta.get("columns", []))
+    if unknown:
+        return {"error": "ARGS", "message": f"존재하지 않는 컬럼: {', '.join(sorted(unknown))}"}
+
+    if max_error:
+        return _approximate_query(dsid, meta, spec, needed, max_error)
+
+    try:
+        # 필요한 컬럼만 읽습니다. 전체 건수만 필요하면 첫 컬럼만, 표시 컬럼 없는 행 조회는 전체 컬럼을 읽습니다.
+        if needed:
+            usecols = sorted(needed)
+        elif spec["metrics"]:
+            usecols = meta.get("columns", [])[:1]
+        else:
+            usecols = None
+        df = load_frame(meta, columns=usecols)
+    except Exception as e:
+        return {"error": "LOAD_FAILED", "message": f"데이터 로드 실패: {e}"}
+
+    try:
+        result = {**run_query(df, spec), "dataset_id": dsid}
+    except Exception as e:
+        return {"error": "QUERY_FAILED", "message": f"질의 실패: {e}"}
+
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(cache_path, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False)
+        _prune_query_cache(cache_path.parent, settings.QUERY_CACHE_MAX_ENTRIES)
+    except Exception:
+        pass
+    return {**result, "cached": False}
+
+
+# -------------------- 추가 도구: 데이터셋 요약 --------------------
+
+def _load_summary(dsid: str, meta: dict) -> dict:
+    """저장된 요약을 읽고, 없으면(이전 버전 업로드 등) 한 번 계산해 저장합니다."""
+    return read_summary(dsid) or build_summary(dsid, meta)
+
+
+@mcp.tool()
+async def get_dataset_summary(dataset_id: str | None = None) -> dict:
+    """데이터셋 전체에 대한 사전 계산 요약을 반환합니다. 행을 검색하지 않고 개요 질문에 답할 때 사용하세요.
+
+    Args:
+        dataset_id: 대상 데이터셋 ID(미지정 시 최신 업로드 사용).
+
+    Returns:
+        {"dataset_id", "rows", "columns": [{"name", "type", "non_null", "missing", "missing_ratio",
+         "distinct", "distinct_exact", "top", "min"?, "max"?, "mean"?, "std"?}], "generated_at"}
+    """
+    return await asyncio.to_thread(_dataset_summary, dataset_id)
+
+
+def _dataset_summary(dataset_id: str | None) -> dict:
+    dsid, meta = _resolve_dataset(dataset_id)
+    if not dsid:
+        return meta
+    try:
+        return _load_summary(dsid, meta)
+    except Exception as e:
+        return {"error": "SUMMARY_FAILED", "message": f"요약 생성 실패: {e}"}
+
+
+@mcp.resource("dataset://{dataset_id}/summary", mime_type="application/json")
+def dataset_summary_resource(dataset_id: str) -> str:
+    """데이터셋 요약(JSON) 리소스."""
+    dsid, meta = _resolve_dataset(dataset_id)
+    if not dsid:
+        return json.dumps(meta, ensure_ascii=False)
+    return json.dumps(_load_summary(dsid, meta), ensure_ascii=False)
+
+
 if __name__ == "__main__":
     mcp.run(transport="stdio")
@@ -1,6 +1,12 @@
+import asyncio
+import logging
 import os
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager, suppress
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 # Ensure state is initialized on import
 from backend import state
@@ -8,10 +14,59 @@ from backend.routes import upload as upload_routes
 from backend.routes import chat as chat_routes
 from backend.routes import system as system_routes
 from backend.routes import profile as profile_routes
+from backend.services import executors
+from backend.services.admission import AdmissionRejected
+from config import settings
+from core import db
+from core.metrics import (
+    REGISTRY,
+    current_request_timings,
+    reset_request_timings,
+    server_timing_header,
+    start_request_timings,
+)
 
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
-app = FastAPI(title="Data Analysis AI Agent API", version="1.0.0")
+async def _retention_loop(interval_sec: int):
+    """주기적으로 대화 DB 보존 작업(아카이브/압축)을 실행합니다."""
+    while True:
+        await asyncio.sleep(interval_sec)
+        try:
+            result = await executors.run_io(state.retention.run)
+            if result["archived"] or result["pages_freed"]:
+                logging.info(f"Retention: archived={result['archived']} pages_freed={result['pages_freed']}")
+        except Exception as e:
+            logging.error(f"Retention run failed: {e}")
+
+
+async def _restore_index():
+    """시작 시 복원한 데이터셋의 Retriever를 백그라운드에서 만듭니다(요청 처리를 막지 않음)."""
+    try:
+        await state.restore_retriever()
+    except Exception as e:
+        logging.warning(f"Startup retriever restore skipped: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    restore_task = asyncio.create_task(_restore_index())
+    retention_task = None
+    if settings.RETENTION_INTERVAL_SEC > 0:
+        retention_task = asyncio.create_task(_retention_loop(settings.RETENTION_INTERVAL_SEC))
+    yield
+    restore_task.cancel()
+    with suppress(asyncio.CancelledError):
+        await restore_task
+    if retention_task is not None:
+        retention_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await retention_task
+    executors.shutdown()
+    db.close_all()
+
+
+app = FastAPI(title="Data Analysis AI Agent API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -22,6 +77,54 @@ app.add_middleware(
 )
 
 
+@app.middleware("http")
+async def timing_middleware(request: Request, call_next):
+    """요청 지연을 기록하고 단계별 시간을 `Server-Timing` 헤더로 노출합니다."""
+    token = start_request_timings()
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+        elapsed = time.perf_counter() - started
+        route = request.scope.get("route")
+        path = getattr(route, "path", request.url.path)
+        timings = current_request_timings()
+
+        REGISTRY.observe(
+            "http_request_duration_seconds",
+            elapsed,
+            labels={"method": request.method, "path": path, "status": str(response.status_code)},
+            help_text="HTTP request latency",
+        )
+        response.headers["Server-Timing"] = server_timing_header(timings + [("total", elapsed * 1000)])
+
+        if settings.SLOW_REQUEST_MS and elapsed * 1000 >= settings.SLOW_REQUEST_MS:
+            breakdown = ", ".join(f"{stage}={ms:.0f}ms" for stage, ms in timings)
+            logging.warning(f"Slow request {request.method} {path}: {elapsed * 1000:.0f}ms [{breakdown}]")
+        return response
+    finally:
+        reset_request_timings(token)
+
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    """동시 실행 상한/대기열이 가득 찬 작업은 429와 재시도 권장 시간(`Retry-After`)으로 응답합니다."""
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc), "gate": exc.name, "reason": exc.reason, "retry_after": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+@app.exception_handler(executors.ExecutorSaturated)
+async def executor_saturated_handler(request: Request, exc: executors.ExecutorSaturated):
+    """실행기 대기 큐 포화도 같은 429로 응답합니다(큐는 짧게 비므로 1초 후 재시도)."""
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc), "gate": exc.name, "reason": "executor_saturated", "retry_after": 1},
+        headers={"Retry-After": "1"},
+    )
+
+
 @app.get("/")
 async def root():
     return {"message": "Data Analysis AI Agent API"}
@@ -1,66 +1,331 @@
+import json
+import time
+from contextlib import nullcontext
 from typing import Dict, Any, List
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 
-from backend.schemas.chat import ChatMessage, ChatRequest, ChatResponse
-from backend.services.agent import run_agent
-from backend.state import conversation_memory, global_state, restore_uploaded_files, user_profile
+from backend.schemas.chat import (
+    BatchChatRequest,
+    BatchChatResponse,
+    BatchChatResult,
+    ChatMessage,
+    ChatRequest,
+    ChatResponse,
+    MessagesPage,
+)
+from backend.services.admission import LLM_GATE, AdmissionRejected, take
+from backend.services.agent import AGENT_ERROR_PREFIX, run_agent, run_agent_batch, stream_agent
+from backend.services.executors import ExecutorSaturated, run_io
+from backend.state import (
+    answer_cache,
+    context_builder,
+    conversation_memory,
+    ensure_restored,
+    global_state,
+    user_profile,
+)
+from config import settings
+from core.answer_cache import context_fingerprint
 
 
 router = APIRouter()
 
+# 한 번의 동기화 응답에 담는 최대 메시지 수
+MESSAGES_PAGE_MAX = 500
+
+
+async def _current_file_info() -> Dict[str, Any] | None:
+    """global_state의 메타에서 대화 저장/프롬프트용 파일 정보를 구성합니다(비어 있으면 먼저 복원)."""
+    await ensure_restored()
+
+    if not global_state.get("meta"):
+        return None
+    return {
+        "filename": global_state["meta"].get("raw_path", "").split("/")[-1]
+        if global_state["meta"].get("raw_path")
+        else "알 수 없음",
+        "columns": global_state["meta"].get("columns", []),
+        "shape_total": global_state["meta"].get("shape_total"),
+        "ext": global_state["meta"].get("ext", ""),
+    }
+
+
+async def _context_key() -> str:
+    """답변 캐시 키에 넣을 직전 대화 창(최근 `ANSWER_CACHE_CONTEXT_MESSAGES`개 메시지)의 해시.
+
+    질문을 저장하기 전에 계산해야 같은 맥락의 같은 질문이 같은 키를 얻습니다.
+    """
+    if not settings.ANSWER_CACHE_ENABLED or settings.ANSWER_CACHE_CONTEXT_MESSAGES <= 0:
+        return ""
+    recent = await run_io(conversation_memory.get_recent_messages, limit=settings.ANSWER_CACHE_CONTEXT_MESSAGES)
+    return context_fingerprint(recent)
+
+
+async def _cached_answer(question: str, context_key: str) -> str | None:
+    """현재 데이터셋/프로필 버전/대화 창 기준으로 캐시된 답변을 조회합니다(유사도 조회의 임베딩은 스레드 풀)."""
+    if not settings.ANSWER_CACHE_ENABLED:
+        return None
+    return await run_io(answer_cache.get, global_state.get("file_hash"), user_profile.version, question, context_key)
+
+
+async def _remember_answer(question: str, answer: str, context_key: str):
+    """정상 답변만 캐시에 저장합니다(오류 안내 문구는 제외)."""
+    if settings.ANSWER_CACHE_ENABLED and answer and not answer.startswith(AGENT_ERROR_PREFIX):
+        await run_io(
+            answer_cache.put, global_state.get("file_hash"), user_profile.version, question, answer, context_key
+        )
+
+
+async def _messages_since(since_id: int | None, turn: List[ChatMessage]) -> tuple[List[ChatMessage], bool]:
+    """채팅 응답에 담을 (메시지, 더 있는지 여부).
+
+    클라이언트 커서(since_id)가 있으면 그 이후 최대 `MESSAGES_PAGE_MAX`개, 없으면 이번 턴만.
+    더 있으면 클라이언트가 마지막 id로 `/messages?since_id=`를 이어 호출합니다.
+    """
+    if since_id is None:
+        return turn, False
+    page, has_more = await run_io(conversation_memory.get_messages_page, since_id=since_id, limit=MESSAGES_PAGE_MAX)
+    return [ChatMessage(**msg) for msg in page], has_more
+
 
 @router.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
     try:
+        current_file_info = await _current_file_info()
 
-        if not global_state.get("meta"):
-            restore_uploaded_files()
-
-        current_file_info = None
-        if global_state.get("meta"):
-            current_file_info = {
-                "filename": global_state["meta"].get("raw_path", "").split("/")[-1]
-                if global_state["meta"].get("raw_path")
-                else "알 수 없음",
-                "columns": global_state["meta"].get("columns", []),
-                "shape_total": global_state["meta"].get("shape_total"),
-                "ext": global_state["meta"].get("ext", ""),
-            }
-        
         # 사용자가 업로드 된 파일을 원하면, 파일 이름을 추출.
         enhanced_message = conversation_memory.enhance_message_with_file_context(
             request.message, current_file_info
         )
 
-        # 유저의 질문을 데이터 베이스에 저장.
-        conversation_memory.add_message(
-            role="user", content=enhanced_message, file_context=current_file_info
-        )
+        # 같은 파일/프로필/직전 대화에서 반복된 질문이면 에이전트를 건너뜁니다.
+        context_key = await _context_key()
+        response = await _cached_answer(enhanced_message, context_key)
 
-        recent_messages = conversation_memory.get_recent_messages(limit=10)
-        response = await run_agent(enhanced_message, recent_messages, global_state, user_profile)
+        # 에이전트를 실행할 때는 질문을 저장하기 전에 LLM 슬롯부터 잡습니다(포화 시 아무것도 남기지 않고 429).
+        async with LLM_GATE.slot() if response is None else nullcontext():
+            # 현재 질문은 user 입력으로 따로 들어가므로 저장 전에 이전 대화 컨텍스트를 만듭니다.
+            context = await run_io(context_builder.build) if response is None else []
 
-        conversation_memory.add_message(
-            role="assistant", content=response, file_context=current_file_info
-        )
+            if response is None:
+                # MCP 세션 포화(AdmissionRejected)도 질문을 저장하기 전에 429로 끝나도록 먼저 실행합니다.
+                response = await run_agent(enhanced_message, context, global_state, user_profile)
+                await _remember_answer(enhanced_message, response, context_key)
+
+            # 유저의 질문을 데이터 베이스에 저장.
+            user_message_id = await run_io(
+                conversation_memory.add_message, role="user", content=enhanced_message, file_context=current_file_info
+            )
 
-        recent_messages = conversation_memory.get_recent_messages(limit=50)
-        api_messages = [ChatMessage(role=msg["role"], content=msg["content"]) for msg in recent_messages]
+        assistant_message_id = await run_io(
+            conversation_memory.add_message, role="assistant", content=response, file_context=current_file_info
+        )
 
-        return ChatResponse(response=response, messages=api_messages)
+        # 전체 대화를 다시 보내지 않고 클라이언트가 아직 모르는 메시지만 돌려줍니다.
+        turn = [
+            ChatMessage(id=user_message_id, role="user", content=enhanced_message),
+            ChatMessage(id=assistant_message_id, role="assistant", content=response),
+        ]
+        messages, has_more = await _messages_since(request.since_id, turn)
+        return ChatResponse(response=response, messages=messages, has_more=has_more)
 
+    except (AdmissionRejected, ExecutorSaturated):
+        # 포화는 429 처리기가 응답합니다. 오류 메시지를 저장하려고 실행기를 다시 쓰지 않습니다.
+        raise
     except Exception as e:
         error_response = f"에러가 발생했습니다: {str(e)}"
-        conversation_memory.add_message(role="assistant", content=error_response)
-        recent_messages = conversation_memory.get_recent_messages(limit=50)
-        api_messages = [ChatMessage(role=msg["role"], content=msg["content"]) for msg in recent_messages]
-        return ChatResponse(response=error_response, messages=api_messages)
+        error_message_id = await run_io(conversation_memory.add_message, role="assistant", content=error_response)
+        turn = [ChatMessage(id=error_message_id, role="assistant", content=error_response)]
+        messages, has_more = await _messages_since(request.since_id, turn)
+        return ChatResponse(response=error_response, messages=messages, has_more=has_more)
+
+
+@router.post("/chat/batch", response_model=BatchChatResponse)
+async def chat_batch(request: BatchChatRequest):
+    """같은 파일에 대한 여러 질문을 한 번에 처리합니다.
+
+    캐시에 없는 질문은 MCP 세션/도구/retriever 하나를 공유해 동시에 실행하고(`run_agent_batch`),
+    질문별 답변과 처리 시간을 입력 순서대로 돌려줍니다. 질문/답변은 모두 끝난 뒤 입력 순서대로 대화에
+    저장하므로, 슬롯이 없어 429로 거절되면 아무것도 저장되지 않습니다.
+    """
+    if len(request.questions) > settings.BATCH_MAX_QUESTIONS:
+        raise HTTPException(status_code=400, detail=f"질문은 최대 {settings.BATCH_MAX_QUESTIONS}개까지 보낼 수 있습니다.")
+    started = time.perf_counter()
+    current_file_info = await _current_file_info()
+    questions = [
+        conversation_memory.enhance_message_with_file_context(q, current_file_info) for q in request.questions
+    ]
+    # 배치의 질문은 모두 같은 직전 대화를 맥락으로 합니다.
+    context_key = await _context_key()
+    answers: List[str | None] = [await _cached_answer(q, context_key) for q in questions]
+    pending = [i for i, answer in enumerate(answers) if answer is None]
+    # 같은 질문이 여러 번 들어 있으면 한 번만 실행합니다.
+    unique = list(dict.fromkeys(questions[i] for i in pending))
+
+    runs: Dict[str, Dict[str, Any]] = {}
+    concurrency = 0
+    if unique:
+        context = await run_io(context_builder.build)
+        fan_out = min(request.max_concurrency or settings.BATCH_MAX_CONCURRENCY, settings.BATCH_MAX_CONCURRENCY)
+        outcomes, concurrency = await run_agent_batch(unique, context, global_state, user_profile, fan_out)
+        runs = dict(zip(unique, outcomes))
+        for question, outcome in runs.items():
+            await _remember_answer(question, outcome["response"], context_key)
+
+    results: List[BatchChatResult] = []
+    for original, question, cached in zip(request.questions, questions, answers):
+        outcome = runs.get(question) if cached is None else None
+        response = cached if cached is not None else outcome["response"]
+        await run_io(conversation_memory.add_message, role="user", content=question, file_context=current_file_info)
+        message_id = await run_io(
+            conversation_memory.add_message, role="assistant", content=response, file_context=current_file_info
+        )
+        results.append(
+            BatchChatResult(
+                question=original,
+                response=response,
+                elapsed_ms=outcome["elapsed_ms"] if outcome else 0.0,
+                cached=cached is not None,
+                error=outcome["error"] if outcome else None,
+                message_id=message_id,
+            )
+        )
+    return BatchChatResponse(
+        results=results,
+        concurrency=concurrency,
+        elapsed_ms=round((time.perf_counter() - started) * 1000, 1),
+    )
+
+
+def _sse(event: str, data: Any) -> str:
+    """Server-Sent Events 프레임 한 개를 직렬화합니다."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """에이전트 응답을 SSE(text/event-stream)로 스트리밍합니다.
+
+    이벤트 종류는 `stream_agent`와 동일하며(token/tool_start/tool_end/plot/done/error),
+    최종 답변은 `done` 전송 직전에 대화 메모리에 저장하고 `done`에 질문/답변 메시지 id
+    (`user_message_id`, `message_id`)를 담아 클라이언트 동기화 커서로 쓰게 합니다.
+    오류로 끝나면 오류 메시지를 저장합니다.
+
+    LLM 슬롯은 스트림을 열기 전에 잡고(포화 시 429) 스트림이 끝나거나 끊기면 반납합니다. MCP 세션 슬롯도
+    포화 시 429로 응답하도록 첫 이벤트를 받은 뒤에 응답을 시작하고 질문을 저장합니다.
+    """
+    current_file_info = await _current_file_info()
+    enhanced_message = conversation_memory.enhance_message_with_file_context(
+        request.message, current_file_info
+    )
+    context_key = await _context_key()
+    cached = await _cached_answer(enhanced_message, context_key)
+    ticket = await take(LLM_GATE) if cached is None else None
+    events = None
+    try:
+        if cached is None:
+            context = await run_io(context_builder.build)
+            events = stream_agent(enhanced_message, context, global_state, user_profile)
+            first = await anext(events)
+        user_message_id = await run_io(
+            conversation_memory.add_message, role="user", content=enhanced_message, file_context=current_file_info
+        )
+    except BaseException:
+        if ticket is not None:
+            ticket.release()
+        if events is not None:
+            await events.aclose()
+        raise
+
+    async def save_answer(content: str) -> int:
+        return await run_io(
+            conversation_memory.add_message, role="assistant", content=content, file_context=current_file_info
+        )
+
+    async def agent_events():
+        yield first
+        async for item in events:
+            yield item
+
+    async def release():
+        """슬롯을 반납하고 에이전트 스트림을 닫습니다(여러 번 호출해도 안전)."""
+        if ticket is not None:
+            ticket.release()
+        if events is not None:
+            await events.aclose()
+
+    async def event_stream():
+        final_response: str | None = None
+        saved = False
+        try:
+            if cached is not None:
+                final_response = cached
+                saved = True
+                message_id = await save_answer(cached)
+                yield _sse("token", {"text": cached})
+                yield _sse(
+                    "done",
+                    {
+                        "response": cached,
+                        "first_token_ms": 0.0,
+                        "elapsed_ms": 0.0,
+                        "cached": True,
+                        "user_message_id": user_message_id,
+                        "message_id": message_id,
+                    },
+                )
+                return
+            async for item in agent_events():
+                if item["event"] == "done":
+                    final_response = item["data"]["response"]
+                    await _remember_answer(enhanced_message, final_response, context_key)
+                    saved = True
+                    message_id = await save_answer(final_response)
+                    item["data"].update(user_message_id=user_message_id, message_id=message_id)
+                elif item["event"] == "error":
+                    final_response = item["data"]["message"]
+                yield _sse(item["event"], item["data"])
+        except Exception as e:
+            final_response = f"에러가 발생했습니다: {str(e)}"
+            yield _sse("error", {"message": final_response})
+        finally:
+            await release()
+            if final_response is not None and not saved:
+                await save_answer(final_response)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # 스트림이 시작되기 전에 연결이 끊겨 제너레이터가 실행되지 않은 경우에도 슬롯을 반납하고 에이전트를 멈춥니다.
+        background=BackgroundTask(release) if cached is None else None,
+    )
+
 
+@router.get("/messages", response_model=MessagesPage)
+async def get_messages(
+    request: Request,
+    response: Response,
+    since_id: int | None = None,
+    before_id: int | None = None,
+    limit: int = Query(100, ge=1, le=MESSAGES_PAGE_MAX),
+):
+    """id 커서 기반 메시지 조회.
 
-@router.get("/messages")
-async def get_messages():
-    recent_messages = conversation_memory.get_recent_messages(limit=100)
-    api_messages = [{"role": msg["role"], "content": msg["content"]} for msg in recent_messages]
-    return {"messages": api_messages}
+    - `since_id`: 그 이후 메시지(증분 동기화), `before_id`: 그 이전 메시지(과거 불러오기), 둘 다 없으면 최신 limit개
+    - 응답 ETag는 마지막 메시지 id, 삭제 횟수(초기화/보관), 질의 조건으로 정해지며, `If-None-Match`가 같으면
+      본문 없이 304를 반환합니다. 삭제는 마지막 id를 바꾸지 않으므로 삭제 횟수가 없으면 지워진 기록이 계속 보입니다.
+    """
+    last_id, deletes = await run_io(conversation_memory.get_sync_state)
+    etag = f'W/"{last_id}.{deletes}-{since_id}-{before_id}-{limit}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
 
+    messages, has_more = await run_io(
+        conversation_memory.get_messages_page, since_id=since_id, before_id=before_id, limit=limit
+    )
+    response.headers["ETag"] = etag
+    return MessagesPage(messages=[ChatMessage(**msg) for msg in messages], last_id=last_id, has_more=has_more)
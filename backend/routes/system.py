@@ -1,9 +1,21 @@
+import json
 import os
 import shutil
-from fastapi import APIRouter, HTTPException
+from typing import List, Optional
 
-from backend.state import conversation_memory, global_state
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+
+from backend.schemas.file import PreviewPage
+from backend.services.executors import run_cpu, run_io
+from backend.state import answer_cache, conversation_memory, global_state, retention
+from config import settings
 from config.paths import META_DIR, UPLOAD_DIR
+from core.data_processing.columnar import is_columnar
+from core.data_processing.ids import is_dataset_id
+from core.data_processing.meta import read_meta
+from core.data_processing.offsets import build_row_index, read_row_index, read_rows
+from core.metrics import REGISTRY
 
 
 router = APIRouter()
@@ -18,19 +30,91 @@ async def get_file_info():
         "meta": global_state["meta"],
         "preview_df": global_state["preview_df"],
         "dtype_df": global_state["dtype_df"],
+        "index": getattr(global_state.get("retriever"), "index_report", None),
     }
 
 
+async def _row_index(dsid: str, meta: dict) -> Optional[dict]:
+    """저장된 행 오프셋 색인을 읽고, 없거나 원본 크기와 맞지 않으면 다시 만듭니다(이전 업로드 호환).
+
+    Parquet/Arrow는 색인 없이 읽으므로 None입니다.
+    """
+    if is_columnar(meta):
+        return None
+    index = await run_io(read_row_index, dsid)
+    size = await run_io(os.path.getsize, meta["raw_path"])
+    if index is None or index["size_bytes"] != size:
+        index = await run_cpu(build_row_index, dsid, meta, settings.ROW_INDEX_STRIDE)
+    return index
+
+
+@router.get("/preview", response_model=PreviewPage)
+async def get_preview(
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1),
+    columns: Optional[List[str]] = Query(None),
+    dataset_id: Optional[str] = None,
+):
+    """원본의 임의 위치 한 페이지를 읽습니다. 행 오프셋 색인으로 바로 이동하므로 파일 크기와 무관하게 일정한 비용입니다."""
+    if dataset_id is not None and not is_dataset_id(dataset_id):
+        # 메타/원본 경로를 만들기 전에 형식을 확인합니다(경로 조작 방지).
+        raise HTTPException(status_code=400, detail="INVALID_DATASET_ID")
+    dsid = dataset_id or global_state.get("dsid")
+    meta = global_state.get("meta") if dsid and dsid == global_state.get("dsid") else None
+    if dsid and meta is None:
+        meta = await run_io(read_meta, dsid)
+    if not meta:
+        raise HTTPException(status_code=404, detail="업로드된 파일이 없습니다.")
+    unknown = [c for c in columns or [] if c not in meta.get("columns", [])]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"UNKNOWN_COLUMN: {', '.join(unknown)}")
+
+    limit = min(limit, settings.PREVIEW_MAX_ROWS)
+    index = await _row_index(dsid, meta)
+    df, total = await run_io(read_rows, meta, index, offset, limit, columns)
+    # to_json을 거쳐 NaN/Timestamp 등을 JSON 값(null/ISO 문자열)으로 바꿉니다.
+    rows = json.loads(df.to_json(orient="records", date_format="iso", force_ascii=False)) if len(df) else []
+    return PreviewPage(
+        dataset_id=dsid,
+        offset=offset,
+        limit=limit,
+        total_rows=total,
+        columns=[str(c) for c in df.columns],
+        rows=rows,
+        has_more=offset + len(rows) < total,
+    )
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus 텍스트 형식의 메트릭(단계별 시간, 요청 지연, 캐시/인덱스 카운터)."""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/storage")
+async def get_storage():
+    """대화 DB/WAL/아카이브 크기와 메시지 수를 보고합니다."""
+    return await run_io(retention.storage_report)
+
+
+@router.post("/storage/retention")
+async def run_retention():
+    """보존 작업(오래된 메시지 아카이브 → 빈 페이지 반환)을 즉시 실행하고 결과를 반환합니다."""
+    return await run_io(retention.run)
+
+
+def _reset_data_dirs():
+    """메타/업로드 디렉터리를 지우고 빈 디렉터리로 다시 만듭니다(대용량 삭제라 스레드 풀에서 실행)."""
+    for d in (META_DIR, UPLOAD_DIR):
+        if d.exists():
+            shutil.rmtree(d)
+        d.mkdir(parents=True, exist_ok=True)
+
+
 @router.delete("/clear-data")
 async def clear_all_data():
     try:
-        if META_DIR.exists():
-            shutil.rmtree(META_DIR)
-        if UPLOAD_DIR.exists():
-            shutil.rmtree(UPLOAD_DIR)
-
-        META_DIR.mkdir(parents=True, exist_ok=True)
-        UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+        await run_io(_reset_data_dirs)
 
         global_state.update(
             {
@@ -40,10 +124,13 @@ async def clear_all_data():
                 "meta": None,
                 "preview_df": None,
                 "dtype_df": None,
+                "summary": None,
             }
         )
 
-        conversation_memory.clear_conversation()
+        answer_cache.invalidate()
+        await run_io(conversation_memory.clear_conversation)
+        await run_io(retention.clear_archive)
         return {"success": True, "message": "모든 데이터가 초기화되었습니다."}
     except Exception as e:
         return {"success": False, "message": f"데이터 초기화 실패: {e}"}
@@ -1,45 +1,199 @@
+import asyncio
 import hashlib
 import os
 import tempfile
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
-import pandas as pd
 from fastapi import APIRouter, File, HTTPException, UploadFile
 
 from backend.schemas.file import FileUploadResponse
-from backend.services.ingest import save_upload_to_disk_from_path
+from backend.services.admission import INDEX_GATE, PRIORITY_UPLOAD, AdmissionRejected
+from backend.services.executors import ExecutorSaturated, run_cpu, run_io
+from backend.services.ingest import (
+    append_tail,
+    discard_query_cache,
+    discard_snapshot,
+    find_append_start,
+    restore_dataset,
+    sample_dtype_table,
+    save_upload_to_disk_from_path,
+    snapshot_dataset,
+)
 from backend.state import global_state
-from core.data_processing.sniff import sniff_file
-from core.data_processing.load import sample_load
-from core.data_processing.meta import write_meta
-from core.rag.builder import build_retriever_from_csv
+from config import settings
+from core.data_processing.sniff import SUPPORTED, sniff_file
+from core.data_processing.dtypes import plan_dtypes
+from core.data_processing.load import load_frame, sample_load
+from core.data_processing.meta import read_meta, write_meta
+from core.data_processing.offsets import build_row_index, extend_row_index
+from core.data_processing.samples import build_samples, extend_samples, load_sample
+from core.data_processing.summary import append_summary, build_summary
+from core.metrics import REGISTRY, span
+from core.rag.builder import build_append_payload, build_index_payload, retriever_from_payload
 
 
 router = APIRouter()
 
 
+def _write_temp(file_bytes: bytes, ext: str) -> tuple[str, str]:
+    """업로드 바이트를 임시 파일로 쓰고 (경로, md5)를 반환합니다."""
+    file_hash = hashlib.md5(file_bytes).hexdigest()
+    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=f".{ext}")
+    temp_file.write(file_bytes)
+    temp_file.close()
+    return temp_file.name, file_hash
+
+
+def _plan_dtypes(meta: Dict[str, Any], summary: Dict[str, Any]):
+    """전체 요약으로 읽기 타입 계획을 정해 메타에 넣습니다(이후 모든 로더가 이 타입으로 읽음)."""
+    if settings.DTYPE_PLAN:
+        meta["dtypes"] = plan_dtypes(summary, settings.DTYPE_DOWNCAST_FLOATS, settings.DTYPE_CATEGORY_MAX)
+
+
+async def _append_rows(
+    dsid: str, meta: Dict[str, Any], temp_path: str, start_byte: int, file_hash: str, size_bytes: int
+) -> FileUploadResponse:
+    """원본 뒤에 추가된 꼬리 구간만 처리해 요약/색인/메타를 갱신합니다(스니핑·전체 행수 집계·재임베딩 없음).
+
+    꼬리는 업로드 임시 파일에서 같은 바이트 위치로 읽고, 파생 상태를 모두 만든 뒤에야 원본에 이어 씁니다.
+    도중에 실패하면(포화로 인한 429 포함) 원본 크기와 파생 파일/메타를 시작 전으로 되돌리므로, 재시도해도
+    같은 꼬리가 다시 추가 업로드로 처리됩니다.
+    """
+    old_rows = int((meta.get("shape_total") or [0])[0])
+    raw_path = meta["raw_path"]
+    backup = await run_io(snapshot_dataset, dsid, raw_path)
+    try:
+        staged = {**meta, "raw_path": temp_path}
+        # 하나가 실패해도 나머지가 파일을 다 쓴 뒤에 되돌리도록 모두 끝날 때까지 기다립니다.
+        results = await asyncio.gather(
+            run_cpu(append_summary, dsid, staged, start_byte),
+            run_cpu(extend_row_index, dsid, staged, start_byte, settings.ROW_INDEX_STRIDE),
+            run_cpu(extend_samples, dsid, staged, start_byte, old_rows, settings.SAMPLE_TIERS),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        summary = results[0]
+        # 꼬리 행으로 값 범위/고유값이 바뀌었을 수 있으므로 꼬리를 읽기 전에 타입 계획을 다시 정합니다.
+        _plan_dtypes(meta, summary)
+        staged = {**meta, "raw_path": temp_path}
+
+        retriever = global_state.get("retriever") if global_state.get("dsid") == dsid else None
+        in_place = retriever is not None and retriever.row_doc is not None
+        with span("index_append"):
+            if in_place:
+                payload = await run_cpu(build_append_payload, staged, start_byte, len(retriever.row_doc))
+            else:
+                # 다른 데이터셋이 활성 상태라 이어 붙일 색인이 메모리에 없으면 전체를 색인합니다.
+                payload = await run_cpu(build_index_payload, staged)
+
+        meta.update(
+            shape_total=[int(summary["rows"]), len(meta.get("columns", []))],
+            size_bytes=size_bytes,
+            md5=file_hash,
+        )
+        await run_io(append_tail, temp_path, raw_path, start_byte)
+        await run_io(write_meta, dsid, meta)
+        with span("index_append"):
+            if in_place:
+                await run_io(retriever.extend, payload)
+                # 전체 생성 경로(`retriever_from_payload`)와 같은 게이지를 이어 붙인 색인 기준으로 갱신합니다.
+                REGISTRY.set_gauge(
+                    "rag_index_vectors",
+                    retriever.index_report["vectors"],
+                    help_text="Vectors in the most recently built retriever index",
+                )
+                REGISTRY.set_gauge(
+                    "rag_index_rows", len(retriever.row_doc), help_text="Source rows behind the most recent retriever index"
+                )
+            else:
+                retriever = await run_io(retriever_from_payload, payload)
+    except BaseException:
+        # 취소 중에도 끝까지 되돌리도록 이벤트 루프에서 바로 실행합니다(작은 파일 복사/자르기).
+        restore_dataset(dsid, raw_path, start_byte, backup)
+        raise
+    await run_io(discard_snapshot, backup)
+    await run_io(discard_query_cache, dsid)
+    appended = int(summary["rows"]) - old_rows
+    REGISTRY.inc("upload_appended_rows_total", appended, help_text="Rows added through append uploads")
+
+    if global_state.get("dsid") == dsid and global_state.get("preview_df") is not None:
+        preview = global_state["preview_df"]
+    else:
+        preview = (await run_io(load_frame, meta, None, 20)).to_dict("records")
+    dtypes = (await run_io(sample_dtype_table, dsid, meta)).to_dict("records")
+
+    global_state.update(
+        {
+            "file_hash": file_hash,
+            "dsid": dsid,
+            "meta": meta,
+            "preview_df": preview,
+            "dtype_df": dtypes,
+            "retriever": retriever,
+            "summary": summary,
+        }
+    )
+    return FileUploadResponse(
+        success=True,
+        message=f"기존 데이터셋에 {appended}행 추가 - dataset_id: {dsid}",
+        dataset_id=dsid,
+        meta=meta,
+        preview_df=preview,
+        dtype_df=dtypes,
+        appended_rows=appended,
+    )
+
+
 @router.post("/upload", response_model=FileUploadResponse)
-async def upload_file(file: UploadFile = File(...), sample_rows: int = 100):
+async def upload_file(file: UploadFile = File(...), sample_rows: int = 100, dataset_id: Optional[str] = None):
+    """파일을 업로드합니다.
+
+    `dataset_id`를 주면 추가(append) 모드: 기존 원본이 새 파일의 바이트 접두사이면 늘어난 꼬리 행만
+    처리합니다. 접두사가 아니면 새 데이터셋으로 전체 처리합니다.
+
+    요약/표본/임베딩/색인 학습은 메모리를 많이 쓰므로 `INDEX_GATE` 슬롯 수만큼만 동시에 처리하고,
+    나머지는 대기열에서 기다립니다(대기열이 가득 차면 429).
+    """
+    async with INDEX_GATE.slot(PRIORITY_UPLOAD):
+        return await _process_upload(file, sample_rows, dataset_id)
+
+
+async def _process_upload(file: UploadFile, sample_rows: int, dataset_id: Optional[str]) -> FileUploadResponse:
     try:
         ext = file.filename.split(".")[-1].lower() if "." in file.filename else ""
-        if ext not in {"csv", "tsv", "txt"}:
+        if ext not in SUPPORTED:
             raise HTTPException(status_code=400, detail="지원하지 않는 파일 형식입니다.")
 
-        file_bytes = await file.read()
-        file_hash = hashlib.md5(file_bytes).hexdigest()
-
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=f".{ext}")
-        temp_file.write(file_bytes)
-        temp_file.close()
-
-        dsid, raw_path, ext = save_upload_to_disk_from_path(temp_file.name, file.filename)
+        # 파싱/임베딩은 프로세스 풀(run_cpu), 파일·DB I/O는 스레드 풀(run_io)에서 실행해
+        # 대용량 업로드 중에도 이벤트 루프가 다른 요청을 처리할 수 있게 합니다.
+        with span("upload_read"):
+            file_bytes = await file.read()
+            temp_path, file_hash = await run_io(_write_temp, file_bytes, ext)
+
+        if dataset_id:
+            existing = await run_io(read_meta, dataset_id)
+            if existing is None:
+                raise HTTPException(status_code=404, detail=f"데이터셋이 없습니다: {dataset_id}")
+            with span("upload_append"):
+                start_byte = await run_io(find_append_start, temp_path, existing)
+            if start_byte is not None:
+                try:
+                    return await _append_rows(dataset_id, existing, temp_path, start_byte, file_hash, len(file_bytes))
+                finally:
+                    os.unlink(temp_path)
+
+        with span("upload_save"):
+            dsid, raw_path, ext = await run_io(save_upload_to_disk_from_path, temp_path, file.filename)
 
         try:
-            sniff_info = sniff_file(raw_path=raw_path, ext=ext)
+            with span("sniff"):
+                sniff_info = await run_cpu(sniff_file, raw_path=raw_path, ext=ext)
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"파일 스니핑 오류: {e}")
 
-        df, sample_info = sample_load(raw_path=raw_path, sniff_info=sniff_info, sample_rows=sample_rows)
+        df, sample_info = await run_cpu(sample_load, raw_path=raw_path, sniff_info=sniff_info, sample_rows=sample_rows)
 
         meta: Dict[str, Any] = {
             "sniff": sniff_info,
@@ -48,19 +202,25 @@ async def upload_file(file: UploadFile = File(...), sample_rows: int = 100):
             "columns": list(df.columns),
             "ext": ext,
             "raw_path": str(raw_path),
+            "size_bytes": len(file_bytes),
+            "md5": file_hash,
         }
-        write_meta(dsid, meta)
-
-        dtype_df = pd.DataFrame(
-            {
-                "column": df.columns,
-                "null_count": df.isnull().sum().values,
-                "null_ratio": (df.isnull().mean() * 100).round(2).values,
-                "dtype": df.dtypes.astype(str).values,
-            }
+        await run_io(write_meta, dsid, meta)
+        # 개요 질문용 컬럼 요약(타입/범위/카디널리티/상위 값/결측률)을 전체 파일 기준으로 미리 계산하고,
+        # 페이지 미리보기용 행 오프셋 색인과 도구용 균등 표본 계층을 함께 만듭니다.
+        summary, _, _ = await asyncio.gather(
+            run_cpu(build_summary, dsid, meta),
+            run_cpu(build_row_index, dsid, meta, settings.ROW_INDEX_STRIDE),
+            run_cpu(build_samples, dsid, meta, settings.SAMPLE_TIERS),
         )
+        _plan_dtypes(meta, summary)
+        await run_io(write_meta, dsid, meta)
+
+        dtype_df = await run_io(sample_dtype_table, dsid, meta)
 
-        retriever = build_retriever_from_csv(raw_path)
+        with span("index_build"):
+            payload = await run_cpu(build_index_payload, meta)
+            retriever = await run_io(retriever_from_payload, payload)
 
         global_state.update(
             {
@@ -70,19 +230,23 @@ async def upload_file(file: UploadFile = File(...), sample_rows: int = 100):
                 "preview_df": df.head(20).to_dict("records"),
                 "dtype_df": dtype_df.to_dict("records"),
                 "retriever": retriever,
+                "summary": summary,
             }
         )
 
-        os.unlink(temp_file.name)
+        os.unlink(temp_path)
 
         return FileUploadResponse(
             success=True,
-            message=f"파일 업로드 성공 - dataset_id: {dsid}",
+            message=f"파일 업로드 성공 - dataset_id: {dsid}"
+            + (" (기존 데이터셋의 뒤에 행만 추가된 파일이 아니어서 새 데이터셋으로 처리)" if dataset_id else ""),
             dataset_id=dsid,
             meta=meta,
             preview_df=df.head(20).to_dict("records"),
             dtype_df=dtype_df.to_dict("records"),
         )
 
+    except (AdmissionRejected, ExecutorSaturated):
+        raise
     except Exception as e:
         return FileUploadResponse(success=False, message=f"업로드 실패: {str(e)}")
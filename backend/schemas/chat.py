@@ -1,17 +1,52 @@
-from typing import List
-from pydantic import BaseModel
+from typing import List, Optional
+from pydantic import BaseModel, Field
 
 
 class ChatMessage(BaseModel):
+    id: Optional[int] = None
     role: str
     content: str
+    timestamp: Optional[str] = None
 
 
 class ChatRequest(BaseModel):
     message: str
+    # 클라이언트가 가진 마지막 메시지 id. 주면 그 이후 메시지를 모두 돌려주고,
+    # 없으면 이번 턴에 저장된 질문/답변만 돌려줍니다.
+    since_id: Optional[int] = None
 
 
 class ChatResponse(BaseModel):
     response: str
     messages: List[ChatMessage]
+    # since_id 이후 메시지가 한 응답 상한보다 많으면 true(나머지는 /messages?since_id=로 이어 받기)
+    has_more: bool = False
+
+
+class BatchChatRequest(BaseModel):
+    questions: List[str] = Field(min_length=1)
+    # 동시에 실행할 최대 질문 수(서버 상한 `BATCH_MAX_CONCURRENCY`와 남은 LLM 슬롯 수로 다시 제한)
+    max_concurrency: Optional[int] = Field(default=None, ge=1)
+
+
+class BatchChatResult(BaseModel):
+    question: str
+    response: str
+    elapsed_ms: float
+    cached: bool = False
+    error: Optional[str] = None
+    message_id: Optional[int] = None
+
+
+class BatchChatResponse(BaseModel):
+    results: List[BatchChatResult]
+    # 실제로 동시에 실행한 질문 수와 요청 전체 처리 시간
+    concurrency: int
+    elapsed_ms: float
+
+
+class MessagesPage(BaseModel):
+    messages: List[ChatMessage]
+    last_id: int
+    has_more: bool
 
@@ -9,4 +9,15 @@ class FileUploadResponse(BaseModel):
     meta: Optional[Dict[str, Any]] = None
     preview_df: Optional[List[Dict[str, Any]]] = None
     dtype_df: Optional[List[Dict[str, Any]]] = None
+    appended_rows: Optional[int] = None
 
+
+
+class PreviewPage(BaseModel):
+    dataset_id: str
+    offset: int
+    limit: int
+    total_rows: int
+    columns: List[str]
+    rows: List[Dict[str, Any]]
+    has_more: bool
@@ -0,0 +1,184 @@
+"""LLM/MCP/색인 작업의 동시 실행 상한과 우선순위 대기열(admission control).
+
+요청이 몰릴 때 에이전트 실행(연속된 LLM 호출), MCP 서버 서브프로세스, 업로드 색인(임베딩)이 제한 없이
+동시에 돌면 외부 API 한도와 메모리를 한꺼번에 소진합니다. 종류마다 `AdmissionGate`를 두어
+
+- 실행 중 작업이 `limit`개 미만이면 바로 들어가고,
+- 아니면 우선순위(숫자가 작을수록 먼저) → 도착 순으로 대기열에서 기다리며,
+- 대기열이 `max_queue`개로 가득 찼거나 `max_wait_sec` 안에 차례가 오지 않으면 `AdmissionRejected`로 거절합니다.
+
+라우트는 이를 429 + `Retry-After`(최근 평균 점유 시간으로 추정한 대기 시간)로 응답해, 과부하 시
+서버가 쓰러지는 대신 클라이언트가 나중에 다시 시도하게 합니다. 게이트는 이벤트 루프 안에서만 사용합니다.
+"""
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import List, Optional, Tuple
+
+from config import settings
+from core.metrics import REGISTRY
+
+# 우선순위(작을수록 먼저): 대화형 채팅 > 업로드 > 배치
+PRIORITY_INTERACTIVE = 0
+PRIORITY_UPLOAD = 1
+PRIORITY_BATCH = 2
+
+RETRY_AFTER_MIN_SEC = 1
+RETRY_AFTER_MAX_SEC = 300
+
+
+class AdmissionRejected(RuntimeError):
+    """게이트가 포화되어 작업을 받을 수 없을 때 발생합니다. `retry_after`는 권장 재시도 대기(초)."""
+
+    def __init__(self, name: str, reason: str, retry_after: int):
+        super().__init__(f"ADMISSION_REJECTED: {name} ({reason})")
+        self.name = name
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionGate:
+    """동시 실행 상한 + 우선순위 대기열."""
+
+    def __init__(self, name: str, limit: int, max_queue: int, max_wait_sec: float):
+        self.name = name
+        self.limit = max(1, limit)
+        self.max_queue = max(0, max_queue)
+        self.max_wait_sec = max_wait_sec
+        self.active = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        # 슬롯 점유 시간의 지수 이동 평균(Retry-After 추정용)
+        self._avg_hold = 1.0
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for _, _, fut in self._waiters if not fut.done())
+
+    def retry_after(self) -> int:
+        """대기열이 모두 빠질 때까지의 대략적인 시간(초)."""
+        waves = (self.queued + 1) / self.limit
+        return int(min(RETRY_AFTER_MAX_SEC, max(RETRY_AFTER_MIN_SEC, math.ceil(self._avg_hold * waves))))
+
+    def _reject(self, reason: str):
+        REGISTRY.inc(
+            "admission_rejected_total",
+            labels={"gate": self.name, "reason": reason},
+            help_text="Work rejected by a saturated admission gate",
+        )
+        raise AdmissionRejected(self.name, reason, self.retry_after())
+
+    async def acquire(self, priority: int = PRIORITY_INTERACTIVE):
+        """슬롯 하나를 얻을 때까지 기다립니다. 포화/시간 초과 시 `AdmissionRejected`."""
+        started = time.perf_counter()
+        if self.active < self.limit and not self.queued:
+            self.active += 1
+        else:
+            if self.queued >= self.max_queue:
+                self._reject("queue_full")
+            fut = asyncio.get_running_loop().create_future()
+            heapq.heappush(self._waiters, (priority, next(self._seq), fut))
+            try:
+                await asyncio.wait_for(asyncio.shield(fut), timeout=self.max_wait_sec or None)
+            except asyncio.TimeoutError:
+                if not fut.done():
+                    fut.cancel()
+                    self._reject("timeout")
+                # 시간 초과와 동시에 슬롯을 넘겨받은 경우에는 그대로 진행합니다.
+            except BaseException:
+                if fut.done() and not fut.cancelled():
+                    self._release_slot()
+                else:
+                    fut.cancel()
+                raise
+        REGISTRY.observe(
+            "admission_wait_seconds",
+            time.perf_counter() - started,
+            labels={"gate": self.name},
+            help_text="Time spent waiting for an admission slot",
+        )
+
+    def try_acquire(self) -> bool:
+        """비어 있는 슬롯이 있고 기다리는 작업이 없을 때만 바로 잡습니다(기다리지 않음)."""
+        if self.active < self.limit and not self.queued:
+            self.active += 1
+            return True
+        return False
+
+    def _release_slot(self):
+        """슬롯을 반납하고, 대기 중인 가장 높은 우선순위 작업에 바로 넘깁니다."""
+        while self._waiters:
+            _, _, fut = heapq.heappop(self._waiters)
+            if not fut.done():
+                fut.set_result(True)
+                return
+        self.active -= 1
+
+    def release(self, held_sec: Optional[float] = None):
+        if held_sec is not None:
+            self._avg_hold = 0.8 * self._avg_hold + 0.2 * held_sec
+        self._release_slot()
+
+    @asynccontextmanager
+    async def slot(self, priority: int = PRIORITY_INTERACTIVE):
+        """`async with gate.slot(priority):` 블록 동안 슬롯을 점유합니다."""
+        await self.acquire(priority)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - started)
+
+
+class Ticket:
+    """블록 범위를 넘어 점유하는 슬롯(스트리밍 응답 등). `release`는 여러 번 불러도 한 번만 반납합니다."""
+
+    def __init__(self, gate: AdmissionGate):
+        self.gate = gate
+        self.started = time.perf_counter()
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.gate.release(time.perf_counter() - self.started)
+
+
+async def take(gate: AdmissionGate, priority: int = PRIORITY_INTERACTIVE) -> Ticket:
+    """슬롯을 얻어 `Ticket`으로 돌려줍니다."""
+    await gate.acquire(priority)
+    return Ticket(gate)
+
+
+async def take_up_to(gate: AdmissionGate, count: int, priority: int = PRIORITY_BATCH) -> List[Ticket]:
+    """슬롯 하나는 기다려서 얻고, 나머지는 지금 비어 있는 만큼만(최대 `count`개) 더 잡습니다.
+
+    여러 슬롯을 모두 기다리며 붙잡고 있으면 요청끼리 서로의 슬롯을 기다리며 멈출 수 있으므로,
+    기다리는 것은 첫 슬롯뿐입니다. 부하가 높을수록 적은 슬롯(좁은 동시 실행)으로 진행합니다.
+    """
+    tickets = [await take(gate, priority)]
+    while len(tickets) < count and gate.try_acquire():
+        tickets.append(Ticket(gate))
+    return tickets
+
+
+# 에이전트 실행(질문 하나의 LLM 호출 연쇄), MCP 서버 세션(서브프로세스), 업로드 처리(요약/표본/임베딩/색인 학습)
+LLM_GATE = AdmissionGate("llm", settings.LLM_MAX_CONCURRENT, settings.LLM_MAX_QUEUE, settings.ADMISSION_MAX_WAIT_SEC)
+MCP_GATE = AdmissionGate("mcp", settings.MCP_MAX_SESSIONS, settings.MCP_MAX_QUEUE, settings.ADMISSION_MAX_WAIT_SEC)
+INDEX_GATE = AdmissionGate("index", settings.INDEX_MAX_CONCURRENT, settings.INDEX_MAX_QUEUE, settings.ADMISSION_MAX_WAIT_SEC)
+GATES = (LLM_GATE, MCP_GATE, INDEX_GATE)
+
+
+def _gate_samples():
+    for gate in GATES:
+        labels = {"gate": gate.name}
+        yield ("admission_queue_depth", "gauge", "Work waiting for an admission slot", labels, gate.queued)
+        yield ("admission_active", "gauge", "Work holding an admission slot", labels, gate.active)
+        yield ("admission_limit", "gauge", "Concurrent slots per admission gate", labels, gate.limit)
+
+
+REGISTRY.add_collector(_gate_samples)
@@ -2,23 +2,47 @@
 
 MCP 도구와(대화 기록/시각화) RAG 검색 도구를 조합해 사용자 질문에 답변합니다.
 사용자 프로필과 파일 정보를 system 메시지로 주입해 개인화/문맥화를 강화합니다.
+`run_agent`는 최종 답변만 반환하고, `stream_agent`는 토큰/도구 이벤트를 실시간으로 흘려보냅니다.
 """
 
+import asyncio
+import json
 import os
 import sys
-from typing import Any, Dict, List
+import time
+from contextlib import asynccontextmanager, suppress
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from uuid import UUID
 
+from backend.services.admission import (
+    LLM_GATE,
+    MCP_GATE,
+    PRIORITY_BATCH,
+    PRIORITY_INTERACTIVE,
+    AdmissionRejected,
+    take_up_to,
+)
+from backend.services.executors import run_io
+from config import settings
+from core.data_processing.summary import format_summary
 from core.llm.factory import get_llm
+from core.profile import EMPTY_PROFILE_SUMMARY
+from core.metrics import REGISTRY, record_stage, span
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tools import StructuredTool
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 from langchain_mcp_adapters.tools import load_mcp_tools
 from langgraph.prebuilt import create_react_agent
-from langchain.tools.retriever import create_retriever_tool
+from pydantic import BaseModel, Field
 
 
 # Load LLM once
 LLM = get_llm()
 
+# run_agent/stream_agent가 실패 시 돌려주는 안내 문구의 접두어(캐시 저장 제외 판단용)
+AGENT_ERROR_PREFIX = "죄송합니다. 처리 중 오류가 발생했습니다"
+
 # MCP server parameters
 SERVER_PARAMS = StdioServerParameters(
     command=sys.executable,
@@ -26,20 +50,122 @@ SERVER_PARAMS = StdioServerParameters(
 )
 
 
-async def run_agent(
-    user_input: str,
-    conversation_history: List[Dict[str, Any]] | None,
-    global_state: Dict[str, Any],
-    user_profile,
-) -> str:
-    """가용 도구와 컨텍스트를 사용해 ReAct 에이전트를 실행합니다."""
-    try:
+class StageTimingCallback(BaseCallbackHandler):
+    """LLM 호출/도구 호출/retriever 검색 시간을 단계 메트릭(`core.metrics`)으로 기록합니다.
+
+    단계 이름: `llm`, `tool.<도구명>`(MCP 도구 왕복 포함), `retriever`
+    """
+
+    # 이벤트 루프에서 바로 실행해 요청 컨텍스트(contextvars)를 그대로 공유합니다.
+    run_inline = True
+
+    def __init__(self):
+        self._starts: Dict[UUID, Tuple[str, float]] = {}
+
+    def _start(self, run_id: UUID, stage: str):
+        self._starts[run_id] = (stage, time.perf_counter())
+
+    def _finish(self, run_id: UUID):
+        started = self._starts.pop(run_id, None)
+        if started:
+            record_stage(started[0], time.perf_counter() - started[1])
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs: Any):
+        self._start(run_id, "llm")
+        REGISTRY.inc("agent_llm_calls_total", help_text="LLM calls made by the agent")
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any):
+        self._finish(run_id)
+
+    def on_llm_error(self, error, *, run_id: UUID, **kwargs: Any):
+        self._finish(run_id)
+
+    def on_tool_start(self, serialized, input_str, *, run_id: UUID, **kwargs: Any):
+        name = (serialized or {}).get("name") or kwargs.get("name") or "unknown"
+        self._start(run_id, f"tool.{name}")
+        REGISTRY.inc("agent_tool_calls_total", labels={"tool": name}, help_text="Tool calls made by the agent")
+
+    def on_tool_end(self, output, *, run_id: UUID, **kwargs: Any):
+        self._finish(run_id)
+
+    def on_tool_error(self, error, *, run_id: UUID, **kwargs: Any):
+        self._finish(run_id)
+
+    def on_retriever_start(self, serialized, query, *, run_id: UUID, **kwargs: Any):
+        self._start(run_id, "retriever")
+
+    def on_retriever_end(self, documents, *, run_id: UUID, **kwargs: Any):
+        self._finish(run_id)
+
+    def on_retriever_error(self, error, *, run_id: UUID, **kwargs: Any):
+        self._finish(run_id)
+
+
+DOC_SEARCH_MAX_K = 20
+
+
+class DocSearchInput(BaseModel):
+    query: str = Field(description="찾을 내용(자연어, ID/코드/값 그대로도 가능)")
+    filters: Optional[List[Dict[str, Any]]] = Field(
+        default=None,
+        description=(
+            '검색 전에 행을 좁히는 조건(AND). 예: [{"column": "country", "op": "==", "value": "KR"}]. '
+            "op: ==, !=, >, >=, <, <=, in, not_in, contains, isnull, notnull"
+        ),
+    )
+    k: Optional[int] = Field(default=None, description=f"반환할 행 수(최대 {DOC_SEARCH_MAX_K})")
+
+
+def _doc_search_tool(retriever) -> StructuredTool:
+    """구조화 필터를 받는 `doc_search` 도구. 필터로 후보 행을 먼저 좁힌 뒤 관련도 순으로 검색합니다."""
+
+    def doc_search(query: str, filters: Optional[List[Dict[str, Any]]] = None, k: Optional[int] = None) -> str:
+        try:
+            with span("retriever"):
+                documents, matched = retriever.search(
+                    query, filters=filters, k=min(k, DOC_SEARCH_MAX_K) if k else None
+                )
+        except ValueError as e:
+            return f"검색 조건 오류: {e}"
+        if not documents:
+            return "조건에 맞는 행이 없습니다." if filters else "관련된 행을 찾지 못했습니다."
+        body = "\n\n".join(
+            (f"[원본 {doc.metadata['rows']}행]\n" if doc.metadata.get("rows", 1) > 1 else "") + doc.page_content
+            for doc in documents
+        )
+        if filters:
+            return f"조건에 맞는 행 {matched}개 중 관련도 상위 {len(documents)}개:\n\n{body}"
+        return body
+
+    return StructuredTool.from_function(
+        func=doc_search,
+        name="doc_search",
+        description=(
+            "업로드된 문서에서 질문과 관련된 행을 찾습니다(의미 + 정확한 값 일치). "
+            "특정 조건의 행만 보려면 filters로 후보를 좁히세요. "
+            "요약/개요/핵심 정리 등도 이 도구로 필요한 근거를 수집한 후 작성하세요."
+        ),
+        args_schema=DocSearchInput,
+    )
+
+
+@asynccontextmanager
+async def agent_session(global_state: Dict[str, Any], priority: int = PRIORITY_INTERACTIVE):
+    """MCP 서버 세션을 열고 도구를 로드한 ReAct 에이전트를 제공합니다.
+
+    MCP 서버는 세션마다 서브프로세스이므로 `MCP_GATE` 슬롯을 잡은 동안만 열어 둡니다
+    (슬롯이 없으면 `priority` 순서로 대기, 포화 시 `AdmissionRejected`).
+    """
+    async with MCP_GATE.slot(priority):
+        started = time.perf_counter()
         async with stdio_client(SERVER_PARAMS) as (read, write):
             async with ClientSession(read, write) as session:
                 await session.initialize()
+                record_stage("mcp_spawn", time.perf_counter() - started)
 
                 try:
-                    mcp_tools = await load_mcp_tools(session)
+                    with span("mcp_load_tools"):
+                        mcp_tools = await load_mcp_tools(session)
                     tools = list(mcp_tools)
                 except Exception as e:
                     print(f"Warning: Failed to load MCP tools: {e}")
@@ -48,70 +174,321 @@ async def run_agent(
                 # Attach retriever tool if present
                 if global_state.get("retriever"):
                     try:
-                        retriever_tool = create_retriever_tool(
-                            global_state["retriever"],
-                            name="doc_search",
-                            description=(
-                                "업로드된 문서에서 질문과 관련된 내용을 찾습니다. "
-                                "요약/개요/핵심 정리 등도 이 도구로 필요한 근거를 수집한 후 작성하세요."
-                            ),
-                        )
-                        tools.append(retriever_tool)
+                        tools.append(_doc_search_tool(global_state["retriever"]))
                     except Exception as e:
                         print(f"Warning: Failed to add retriever tool: {e}")
 
-                agent = create_react_agent(LLM, tools)
+                yield create_react_agent(LLM, tools)
 
-                messages: List[Dict[str, str]] = []
 
-                # Inject user profile
-                try:
-                    profile_summary = user_profile.get_profile_summary()
-                    if profile_summary != "사용자 프로필 정보가 없습니다.":
-                        messages.append(
-                            {
-                                "role": "system",
-                                "content": (
-                                    f"사용자 프로필 정보:\n{profile_summary}\n\n"
-                                    f"위 정보를 바탕으로 개인화된 답변을 제공해주세요."
-                                ),
-                            }
-                        )
-                except Exception as e:
-                    print(f"Warning: Failed to get profile summary: {e}")
-
-                # Inject file-aware context
-                if global_state.get("meta"):
-                    file_info = global_state["meta"]
-                    messages.append(
-                        {
-                            "role": "system",
-                            "content": (
-                                "현재 업로드된 파일 정보:\n"
-                                f"- 파일명: {file_info.get('raw_path', '').split('/')[-1] if file_info.get('raw_path') else '알 수 없음'}\n"
-                                f"- 형식: {file_info.get('ext', '알 수 없음')}\n"
-                                f"- 컬럼: {', '.join(file_info.get('columns', []))}\n"
-                                f"- 전체 데이터 크기: {file_info.get('shape_total', '알 수 없음')}\n\n"
-                                "사용자가 파일에 대해 질문하면 doc_search 도구를 사용하여 파일 내용을 검색하고 분석해주세요."
-                            ),
-                        }
-                    )
+def build_messages(
+    user_input: str,
+    conversation_history: List[Dict[str, Any]] | None,
+    global_state: Dict[str, Any],
+    user_profile,
+) -> List[Dict[str, str]]:
+    """프로필/파일 정보/최근 대화를 system 메시지로 묶어 에이전트 입력을 구성합니다."""
+    messages: List[Dict[str, str]] = []
 
-                if conversation_history:
-                    messages.append(
-                        {
-                            "role": "system",
-                            "content": "이전 대화 내용을 참고하여 맥락을 이해하고 답변해주세요.",
-                        }
-                    )
-                    for msg in conversation_history[-5:]:
-                        messages.append({"role": msg["role"], "content": msg["content"]})
+    # Inject user profile
+    try:
+        profile_summary = user_profile.get_profile_summary()
+        if profile_summary != EMPTY_PROFILE_SUMMARY:
+            messages.append(
+                {
+                    "role": "system",
+                    "content": (
+                        f"사용자 프로필 정보:\n{profile_summary}\n\n"
+                        f"위 정보를 바탕으로 개인화된 답변을 제공해주세요."
+                    ),
+                }
+            )
+    except Exception as e:
+        print(f"Warning: Failed to get profile summary: {e}")
+
+    # Inject file-aware context
+    if global_state.get("meta"):
+        file_info = global_state["meta"]
+        summary_block = ""
+        if global_state.get("summary"):
+            summary_text = format_summary(global_state["summary"], max_tokens=settings.DATASET_SUMMARY_TOKENS)
+            summary_block = f"컬럼 요약(전체 데이터 기준):\n{summary_text}\n\n"
+        messages.append(
+            {
+                "role": "system",
+                "content": (
+                    "현재 업로드된 파일 정보:\n"
+                    f"- 파일명: {file_info.get('raw_path', '').split('/')[-1] if file_info.get('raw_path') else '알 수 없음'}\n"
+                    f"- 형식: {file_info.get('ext', '알 수 없음')}\n"
+                    f"- 컬럼: {', '.join(file_info.get('columns', []))}\n"
+                    f"- 전체 데이터 크기: {file_info.get('shape_total', '알 수 없음')}\n\n"
+                    f"{summary_block}"
+                    "파일 개요/컬럼 특성 질문은 위 요약으로 바로 답하고, 요약에 없는 세부 내용이 필요할 때만 도구를 사용하세요. "
+                    "사용자가 파일에 대해 질문하면 doc_search 도구를 사용하여 파일 내용을 검색하고 분석해주세요. "
+                    "특정 조건의 행(예: 국가가 KR인 행)을 찾을 때는 doc_search의 filters로 후보를 좁히세요. "
+                    "평균·합계·건수·최댓값, 그룹별 비교, 상위 N 같은 통계 질문은 전체 데이터를 정확히 계산하는 "
+                    "query_data 도구를 사용하세요."
+                ),
+            }
+        )
 
-                messages.append({"role": "user", "content": user_input})
+    # conversation_history는 ConversationContextBuilder가 예산 내로 구성한 (요약 +) 최근 턴입니다.
+    if conversation_history:
+        messages.append(
+            {
+                "role": "system",
+                "content": "이전 대화 내용을 참고하여 맥락을 이해하고 답변해주세요.",
+            }
+        )
+        for msg in conversation_history:
+            messages.append({"role": msg["role"], "content": msg["content"]})
 
-                response = await agent.ainvoke({"messages": messages})
-                answer = response["messages"][-1].content
-                return answer
+    messages.append({"role": "user", "content": user_input})
+    return messages
+
+
+async def run_agent(
+    user_input: str,
+    conversation_history: List[Dict[str, Any]] | None,
+    global_state: Dict[str, Any],
+    user_profile,
+) -> str:
+    """가용 도구와 컨텍스트를 사용해 ReAct 에이전트를 실행합니다.
+
+    실행 중 오류는 오류 문구 답변으로 돌려주지만, MCP 세션 슬롯을 얻지 못한 `AdmissionRejected`는 그대로 올립니다.
+    """
+    try:
+        async with agent_session(global_state) as agent:
+            # 프로필 요약은 SQLite 조회이므로 스레드 풀에서 구성합니다.
+            messages = await run_io(build_messages, user_input, conversation_history, global_state, user_profile)
+            with span("agent_run"):
+                response = await agent.ainvoke({"messages": messages}, config={"callbacks": [StageTimingCallback()]})
+            answer = response["messages"][-1].content
+            return answer
+    except AdmissionRejected:
+        # MCP 세션 포화는 오류 답변이 아니라 429로 응답하도록 호출자에게 넘깁니다.
+        raise
     except Exception as e:
         print(f"Error in run_agent: {e}")
-        return f"죄송합니다. 처리 중 오류가 발생했습니다: {str(e)}"
+        return f"{AGENT_ERROR_PREFIX}: {str(e)}"
+
+
+async def run_agent_batch(
+    user_inputs: List[str],
+    conversation_history: List[Dict[str, Any]] | None,
+    global_state: Dict[str, Any],
+    user_profile,
+    max_concurrency: int,
+) -> Tuple[List[Dict[str, Any]], int]:
+    """여러 질문을 MCP 세션/도구/retriever 하나를 공유해 동시에 실행합니다.
+
+    질문마다 MCP 서버를 띄우지 않고 세션과 에이전트를 한 번만 만들며, system 메시지(프로필/파일 정보/
+    대화 컨텍스트)도 한 번만 구성합니다. 동시 실행 수는 `max_concurrency`와 지금 비어 있는 LLM 슬롯 중
+    작은 값입니다(배치 우선순위로 첫 슬롯만 기다림). 슬롯을 얻지 못하면 `AdmissionRejected`.
+
+    Returns:
+        (입력 순서대로 `{"response", "elapsed_ms", "error"}`, 실제 동시 실행 수)
+        `error`는 실패 시 오류 문자열, 아니면 None
+    """
+    if not user_inputs:
+        return [], 0
+    results: List[Dict[str, Any]] = [{} for _ in user_inputs]
+    # LLM 슬롯을 먼저, MCP 슬롯을 나중에 잡습니다(채팅과 같은 순서라 서로의 슬롯을 기다리며 멈추지 않음).
+    tickets = await take_up_to(LLM_GATE, min(max(1, max_concurrency), len(user_inputs)), PRIORITY_BATCH)
+    try:
+        async with agent_session(global_state, PRIORITY_BATCH) as agent:
+            base = (await run_io(build_messages, "", conversation_history, global_state, user_profile))[:-1]
+            queue: asyncio.Queue = asyncio.Queue()
+            for item in enumerate(user_inputs):
+                queue.put_nowait(item)
+
+            async def worker():
+                while not queue.empty():
+                    i, question = queue.get_nowait()
+                    started = time.perf_counter()
+                    try:
+                        with span("agent_run"):
+                            response = await agent.ainvoke(
+                                {"messages": base + [{"role": "user", "content": question}]},
+                                config={"callbacks": [StageTimingCallback()]},
+                            )
+                        answer, error = response["messages"][-1].content, None
+                    except Exception as e:
+                        print(f"Error in run_agent_batch: {e}")
+                        answer, error = f"{AGENT_ERROR_PREFIX}: {str(e)}", str(e)
+                    results[i] = {
+                        "response": answer,
+                        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+                        "error": error,
+                    }
+
+            await asyncio.gather(*(worker() for _ in tickets))
+    except AdmissionRejected:
+        raise
+    except Exception as e:
+        # 세션을 열지 못한 경우: 실행하지 못한 질문 모두 오류로 돌려줍니다.
+        print(f"Error in run_agent_batch: {e}")
+        for i, result in enumerate(results):
+            if not result:
+                results[i] = {"response": f"{AGENT_ERROR_PREFIX}: {str(e)}", "elapsed_ms": 0.0, "error": str(e)}
+    finally:
+        for ticket in tickets:
+            ticket.release()
+    REGISTRY.inc("agent_batch_questions_total", len(user_inputs), help_text="Questions run through batch chat")
+    return results, len(tickets)
+
+
+def _content_text(content: Any) -> str:
+    """LLM 메시지 content(str 또는 파트 리스트)에서 텍스트만 추출합니다."""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        parts = []
+        for part in content:
+            if isinstance(part, str):
+                parts.append(part)
+            elif isinstance(part, dict) and part.get("type") == "text":
+                parts.append(part.get("text", ""))
+        return "".join(parts)
+    return ""
+
+
+def _tool_output_payload(output: Any) -> Any:
+    """도구 출력(ToolMessage/문자열/dict)을 JSON 직렬화 가능한 값으로 정규화합니다."""
+    content = getattr(output, "content", output)
+    if isinstance(content, list):
+        content = _content_text(content)
+    if isinstance(content, str):
+        try:
+            return json.loads(content)
+        except (TypeError, ValueError):
+            return content
+    if isinstance(content, dict):
+        return content
+    return str(content)
+
+
+# 생산자 작업이 끝났음을 알리는 큐 표식
+_STREAM_END = object()
+
+
+async def stream_agent(
+    user_input: str,
+    conversation_history: List[Dict[str, Any]] | None,
+    global_state: Dict[str, Any],
+    user_profile,
+) -> AsyncIterator[Dict[str, Any]]:
+    """에이전트 실행 과정을 이벤트 dict로 스트리밍합니다.
+
+    LangGraph `astream_events(v2)`를 사용하며 다음 이벤트를 순서대로 내보냅니다.
+    - `token`: LLM 토큰 조각 `{"text"}`
+    - `tool_start` / `tool_end`: 도구 호출 시작/종료 `{"name", "input" | "output"}`
+    - `plot`: plot 도구가 생성한 이미지 경로 `{"path", "title", "kind"}`
+    - `done`: 최종 답변과 첫 토큰까지의 시간 `{"response", "first_token_ms", "elapsed_ms"}`
+    - `error`: 처리 중 오류 `{"message"}` (이후 스트림 종료)
+
+    MCP 세션 슬롯을 얻지 못하면 이벤트 대신 `AdmissionRejected`를 올립니다(첫 이벤트 전).
+
+    MCP 세션(`stdio_client`/`ClientSession`)은 별도 작업에서 열고 닫으며, 이 제너레이터는 큐만 읽습니다.
+    클라이언트가 끊겨 응답 제너레이터가 다른 작업에서 닫혀도 세션의 cancel scope를 건드리지 않고,
+    생산자 작업을 취소해 그 작업 안에서 세션과 MCP 서브프로세스를 정리합니다.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def produce():
+        try:
+            async for item in _agent_events(user_input, conversation_history, global_state, user_profile):
+                queue.put_nowait(item)
+        except Exception as e:
+            queue.put_nowait(e)
+        finally:
+            queue.put_nowait(_STREAM_END)
+
+    producer = asyncio.create_task(produce())
+    try:
+        while True:
+            item = await queue.get()
+            if item is _STREAM_END:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        if not producer.done():
+            producer.cancel()
+            with suppress(asyncio.CancelledError):
+                await producer
+
+
+async def _agent_events(
+    user_input: str,
+    conversation_history: List[Dict[str, Any]] | None,
+    global_state: Dict[str, Any],
+    user_profile,
+) -> AsyncIterator[Dict[str, Any]]:
+    """`stream_agent`의 생산자: MCP 세션을 열고 에이전트 이벤트를 변환합니다(같은 작업 안에서만 순회)."""
+    started = time.perf_counter()
+    first_token_ms: float | None = None
+    answer_parts: List[str] = []
+    final_answer: str | None = None
+
+    try:
+        async with agent_session(global_state) as agent:
+            # 프로필 요약은 SQLite 조회이므로 스레드 풀에서 구성합니다.
+            messages = await run_io(build_messages, user_input, conversation_history, global_state, user_profile)
+            async for event in agent.astream_events(
+                {"messages": messages}, config={"callbacks": [StageTimingCallback()]}, version="v2"
+            ):
+                kind = event["event"]
+
+                if kind == "on_chat_model_stream":
+                    text = _content_text(event["data"]["chunk"].content)
+                    if not text:
+                        continue
+                    if first_token_ms is None:
+                        first_token_ms = (time.perf_counter() - started) * 1000
+                        record_stage("first_token", first_token_ms / 1000)
+                    answer_parts.append(text)
+                    yield {"event": "token", "data": {"text": text}}
+
+                elif kind == "on_tool_start":
+                    # 도구 호출 전 토큰은 중간 사고 과정이므로 최종 답변 후보에서 제외합니다.
+                    answer_parts = []
+                    yield {
+                        "event": "tool_start",
+                        "data": {"name": event["name"], "input": event["data"].get("input")},
+                    }
+
+                elif kind == "on_tool_end":
+                    output = _tool_output_payload(event["data"].get("output"))
+                    yield {"event": "tool_end", "data": {"name": event["name"], "output": output}}
+                    if isinstance(output, dict) and output.get("path"):
+                        yield {
+                            "event": "plot",
+                            "data": {
+                                "path": output["path"],
+                                "title": output.get("title", ""),
+                                "kind": output.get("kind"),
+                            },
+                        }
+
+                elif kind == "on_chain_end" and not event.get("parent_ids"):
+                    # 루트 그래프 종료: 마지막 AI 메시지가 최종 답변입니다.
+                    output = event["data"].get("output") or {}
+                    if isinstance(output, dict) and output.get("messages"):
+                        final_answer = _content_text(output["messages"][-1].content)
+    except AdmissionRejected:
+        raise
+    except Exception as e:
+        print(f"Error in stream_agent: {e}")
+        yield {"event": "error", "data": {"message": f"{AGENT_ERROR_PREFIX}: {str(e)}"}}
+        return
+
+    yield {
+        "event": "done",
+        "data": {
+            "response": final_answer if final_answer is not None else "".join(answer_parts),
+            "first_token_ms": round(first_token_ms, 1) if first_token_ms is not None else None,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+        },
+    }
@@ -0,0 +1,134 @@
+"""이벤트 루프 밖에서 블로킹 작업을 실행하는 관리형 실행기 계층.
+
+- `run_cpu`: 프로세스 풀. pandas 파싱, 인코딩 추정, 임베딩처럼 GIL을 오래 잡는 작업용
+- `run_io`: 스레드 풀. SQLite 조회/저장, 파일 복사처럼 대기 위주의 블로킹 I/O용
+
+각 풀은 대기+실행 중 작업 수 상한(`max_pending`)을 두어, 상한을 넘는 요청은 큐에 쌓지 않고
+`ExecutorSaturated`로 즉시 거절합니다. 프로세스 풀에서 실행된 작업의 단계 타이밍(`core.metrics.span`)은
+부모 프로세스로 돌려받아 현재 요청의 단계 목록과 메트릭에 그대로 기록합니다.
+"""
+
+import asyncio
+import contextvars
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, List, Optional, Tuple
+
+from config import settings
+from core.metrics import REGISTRY, current_request_timings, record_stage, reset_request_timings, start_request_timings
+
+
+class ExecutorSaturated(RuntimeError):
+    """실행기의 대기 큐가 가득 차 작업을 받을 수 없을 때 발생합니다."""
+
+    def __init__(self, name: str, max_pending: int):
+        super().__init__(f"EXECUTOR_SATURATED: {name} (max_pending={max_pending})")
+        self.name = name
+        self.max_pending = max_pending
+
+
+def _call_with_timings(fn: Callable, args: tuple, kwargs: dict) -> Tuple[Any, List[Tuple[str, float]]]:
+    """(자식 프로세스) 함수를 실행하고 그 안에서 기록된 단계 타이밍을 함께 반환합니다."""
+    token = start_request_timings()
+    try:
+        result = fn(*args, **kwargs)
+        return result, current_request_timings()
+    finally:
+        reset_request_timings(token)
+
+
+class BoundedExecutor:
+    """대기 작업 수 상한이 있는 실행기 래퍼. 내부 실행기는 첫 사용 시 생성합니다."""
+
+    def __init__(self, name: str, factory: Callable[[], Executor], max_pending: int, collect_timings: bool = False):
+        self.name = name
+        self.max_pending = max_pending
+        self._factory = factory
+        self._collect_timings = collect_timings
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._factory()
+            return self._executor
+
+    async def run(self, fn: Callable, *args: Any, **kwargs: Any) -> Any:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                REGISTRY.inc(
+                    "executor_rejected_total", labels={"pool": self.name}, help_text="Jobs rejected by a saturated executor"
+                )
+                raise ExecutorSaturated(self.name, self.max_pending)
+            self._pending += 1
+        loop = asyncio.get_running_loop()
+        try:
+            if self._collect_timings:
+                result, timings = await loop.run_in_executor(
+                    self._get_executor(), partial(_call_with_timings, fn, args, kwargs)
+                )
+                for stage, ms in timings:
+                    record_stage(stage, ms / 1000)
+                return result
+            # 스레드에서도 요청 컨텍스트(단계 타이밍 등)를 공유하도록 contextvars를 복사합니다.
+            ctx = contextvars.copy_context()
+            return await loop.run_in_executor(self._get_executor(), partial(ctx.run, fn, *args, **kwargs))
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+# spawn: 스레드를 쓰는 부모 프로세스를 fork할 때의 교착 위험을 피합니다.
+CPU_POOL = BoundedExecutor(
+    "cpu",
+    lambda: ProcessPoolExecutor(
+        max_workers=settings.CPU_WORKERS or min(4, os.cpu_count() or 1),
+        mp_context=multiprocessing.get_context("spawn"),
+    ),
+    max_pending=settings.CPU_MAX_PENDING,
+    collect_timings=True,
+)
+IO_POOL = BoundedExecutor(
+    "io",
+    lambda: ThreadPoolExecutor(max_workers=settings.IO_WORKERS, thread_name_prefix="io"),
+    max_pending=settings.IO_MAX_PENDING,
+)
+
+
+async def run_cpu(fn: Callable, *args: Any, **kwargs: Any) -> Any:
+    """CPU 집약 작업을 프로세스 풀에서 실행합니다. fn/인자/반환값은 pickle 가능해야 합니다."""
+    return await CPU_POOL.run(fn, *args, **kwargs)
+
+
+async def run_io(fn: Callable, *args: Any, **kwargs: Any) -> Any:
+    """블로킹 I/O 작업을 스레드 풀에서 실행합니다."""
+    return await IO_POOL.run(fn, *args, **kwargs)
+
+
+def shutdown():
+    """애플리케이션 종료 시 풀을 정리합니다."""
+    CPU_POOL.shutdown()
+    IO_POOL.shutdown()
+
+
+def _pool_samples():
+    for pool in (CPU_POOL, IO_POOL):
+        yield ("executor_pending", "gauge", "Queued + running jobs per executor pool", {"pool": pool.name}, pool.pending)
+
+
+REGISTRY.add_collector(_pool_samples)
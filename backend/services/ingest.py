@@ -1,8 +1,16 @@
 from pathlib import Path
+import hashlib
 import shutil
+import tempfile
 
-from config.paths import UPLOAD_DIR
+import pandas as pd
+
+from config import settings
+from config.paths import META_DIR, UPLOAD_DIR
 from core.data_processing.ids import gen_dataset_id
+from core.data_processing.samples import load_sample
+
+_CHUNK = 1 << 20
 
 
 def save_upload_to_disk_from_path(file_path: str, filename: str) -> tuple[str, Path, str]:
@@ -17,3 +25,120 @@ def save_upload_to_disk_from_path(file_path: str, filename: str) -> tuple[str, P
     raw_path = target_dir / f"raw.{ext if ext else 'bin'}"
     shutil.copy2(file_path, raw_path)
     return dsid, raw_path, ext
+
+
+def _md5_prefix(path: Path, size: int) -> str:
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        remaining = size
+        while remaining > 0:
+            chunk = f.read(min(_CHUNK, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            remaining -= len(chunk)
+    return digest.hexdigest()
+
+
+def sample_dtype_table(dsid: str, meta: dict) -> pd.DataFrame:
+    """앞부분이 아닌 균등 표본 계층으로 컬럼별 타입/결측 통계를 계산합니다(정렬된 파일에서도 치우치지 않음)."""
+    df, _ = load_sample(dsid, meta, settings.SAMPLE_MAX_ERROR, tiers=settings.SAMPLE_TIERS)
+    return pd.DataFrame(
+        {
+            "column": df.columns,
+            "null_count": df.isnull().sum().values,
+            "null_ratio": (df.isnull().mean() * 100).round(2).values,
+            "dtype": df.dtypes.astype(str).values,
+        }
+    )
+
+
+def file_md5(path: str | Path) -> str:
+    """파일 전체의 md5를 1MiB씩 읽어 계산합니다(파일 크기와 무관하게 메모리 일정)."""
+    path = Path(path)
+    return _md5_prefix(path, path.stat().st_size)
+
+
+def find_append_start(file_path: str, meta: dict) -> int | None:
+    """새 파일이 기존 원본 뒤에 행만 추가된 것이면 꼬리 구간의 시작 바이트(= 기존 원본 크기)를 반환합니다.
+
+    원본은 건드리지 않습니다. 꼬리는 새 파일(`file_path`)에서 같은 바이트 위치로 읽어 처리하고,
+    파생 상태를 모두 쓴 뒤 `append_tail`로 원본에 이어 씁니다.
+
+    CSV 계열이 아니거나, 기존 원본이 새 파일의 바이트 접두사가 아니거나, 기존 원본이 줄바꿈으로 끝나지 않거나(마지막 행이
+    이어 쓰였을 수 있음), 늘어난 내용이 없으면 None을 반환합니다(전체 재처리 대상).
+    """
+    if (meta.get("sniff") or {}).get("filetype") != "csv":
+        # 열 지향 파일은 푸터에 메타데이터가 있어 바이트 이어 쓰기로 행을 추가할 수 없습니다.
+        return None
+    raw_path = Path(meta["raw_path"])
+    old_size = raw_path.stat().st_size
+    new_path = Path(file_path)
+    if not old_size or new_path.stat().st_size <= old_size:
+        return None
+    with open(raw_path, "rb") as f:
+        f.seek(old_size - 1)
+        if f.read(1) != b"\n":
+            return None
+    old_md5 = meta.get("md5") if meta.get("size_bytes") == old_size else None
+    if (old_md5 or _md5_prefix(raw_path, old_size)) != _md5_prefix(new_path, old_size):
+        return None
+    return old_size
+
+
+def append_tail(file_path: str, raw_path: str, start_byte: int):
+    """새 파일의 `start_byte` 이후 구간을 원본 끝에 이어 씁니다(원본 크기가 `start_byte`일 때)."""
+    with open(file_path, "rb") as src, open(raw_path, "ab") as dst:
+        if dst.tell() != start_byte:
+            raise RuntimeError(f"APPEND_CONFLICT: 원본 크기가 {dst.tell()}바이트로 바뀌었습니다(예상 {start_byte}).")
+        src.seek(start_byte)
+        shutil.copyfileobj(src, dst, _CHUNK)
+        dst.flush()
+
+
+def _derived_files(dataset_id: str, raw_path: Path) -> list[Path]:
+    """데이터셋의 파생 파일(요약/통계/오프셋/표본). 원본은 제외합니다."""
+    d = UPLOAD_DIR / dataset_id
+    return [p for p in d.iterdir() if p.is_file() and p != raw_path] if d.exists() else []
+
+
+def snapshot_dataset(dataset_id: str, raw_path: str) -> Path:
+    """추가 업로드 전 파생 파일과 메타를 임시 디렉터리에 복사해 두고 그 경로를 반환합니다(`restore_dataset`용)."""
+    backup = Path(tempfile.mkdtemp(prefix=f"append-{dataset_id}-"))
+    (backup / "files").mkdir()
+    for p in _derived_files(dataset_id, Path(raw_path)):
+        shutil.copy2(p, backup / "files" / p.name)
+    meta_path = META_DIR / f"{dataset_id}.json"
+    if meta_path.exists():
+        shutil.copy2(meta_path, backup / "meta.json")
+    return backup
+
+
+def discard_query_cache(dataset_id: str):
+    """`query_data` 결과 캐시를 지웁니다(원본이 바뀌면 키가 달라져 이전 항목은 다시 쓰이지 않음)."""
+    shutil.rmtree(UPLOAD_DIR / dataset_id / "query_cache", ignore_errors=True)
+
+
+def restore_dataset(dataset_id: str, raw_path: str, start_byte: int, backup: Path):
+    """실패한 추가 업로드를 되돌립니다: 원본을 `start_byte`로 자르고 파생 파일/메타를 스냅숏 시점으로 복원합니다.
+
+    스냅숏 이후 새로 생긴 파생 파일은 지우므로, 재시도하면 같은 꼬리를 처음부터 다시 처리합니다.
+    """
+    raw = Path(raw_path)
+    if raw.stat().st_size > start_byte:
+        with open(raw, "r+b") as f:
+            f.truncate(start_byte)
+    saved = backup / "files"
+    for p in _derived_files(dataset_id, raw):
+        if not (saved / p.name).exists():
+            p.unlink()
+    for p in saved.iterdir():
+        shutil.copy2(p, UPLOAD_DIR / dataset_id / p.name)
+    if (backup / "meta.json").exists():
+        shutil.copy2(backup / "meta.json", META_DIR / f"{dataset_id}.json")
+    discard_snapshot(backup)
+
+
+def discard_snapshot(backup: Path):
+    """스냅숏 디렉터리를 지웁니다."""
+    shutil.rmtree(backup, ignore_errors=True)
@@ -2,20 +2,30 @@
 
 - 최근 업로드 파일 복원 및 미리보기/스키마 캐시
 - 대화 메모리/사용자 프로필 인스턴스 제공
-- 업로드된 CSV로부터 검색용 Retriever 생성
+- 복원한 데이터셋의 검색용 Retriever 재생성(INDEX_GATE 슬롯 + 프로세스 풀)
+- 반복 질문용 답변 캐시, 토큰 예산 기반 대화 컨텍스트 빌더 인스턴스 제공
+- 대화 DB 보존(아카이브/압축) 작업 인스턴스 제공
 """
 
-import hashlib
+import asyncio
 import logging
 from pathlib import Path
 from typing import Any, Dict, List
 
-import pandas as pd
-
+from backend.services.admission import INDEX_GATE, PRIORITY_UPLOAD, AdmissionRejected
+from backend.services.executors import ExecutorSaturated, run_cpu, run_io
+from backend.services.ingest import file_md5, sample_dtype_table
+from config import settings
+from core.answer_cache import AnswerCache
+from core.context import ConversationContextBuilder
 from core.memory import get_memory
+from core.metrics import REGISTRY
 from core.profile import get_user_profile
+from core.retention import ConversationRetention
+from core.data_processing.load import load_frame
 from core.data_processing.meta import get_latest_uploaded_file
-from core.rag.builder import build_retriever_from_csv
+from core.data_processing.summary import build_summary, read_summary
+from core.rag.builder import build_index_payload, get_embedding_model, retriever_from_payload
 
 
 # In-memory state (file-related only)
@@ -26,11 +36,55 @@ global_state: Dict[str, Any] = {
     "meta": None,
     "preview_df": None,
     "dtype_df": None,
+    "summary": None,
 }
 
 # Instances
 conversation_memory = get_memory()
 user_profile = get_user_profile()
+context_builder = ConversationContextBuilder(
+    conversation_memory,
+    token_budget=settings.CONTEXT_TOKEN_BUDGET,
+    summary_token_budget=settings.CONTEXT_SUMMARY_TOKENS,
+    message_token_cap=settings.CONTEXT_MESSAGE_MAX_TOKENS,
+    max_recent=settings.CONTEXT_MAX_RECENT,
+)
+retention = ConversationRetention(
+    conversation_memory,
+    max_age_days=settings.RETENTION_MAX_AGE_DAYS,
+    keep_recent=settings.RETENTION_KEEP_RECENT,
+    vacuum_pages=settings.RETENTION_VACUUM_PAGES,
+    # 보관 전에 해당 구간을 롤링 요약에 반영해 프롬프트 맥락을 유지합니다.
+    before_archive=context_builder.fold_until,
+)
+answer_cache = AnswerCache(
+    ttl_sec=settings.ANSWER_CACHE_TTL_SEC,
+    max_entries=settings.ANSWER_CACHE_MAX_ENTRIES,
+    embed_fn=(lambda text: get_embedding_model().embed_query(text)) if settings.ANSWER_CACHE_SEMANTIC else None,
+    similarity_threshold=settings.ANSWER_CACHE_SIMILARITY,
+)
+
+
+def _answer_cache_samples():
+    stats = answer_cache.stats()
+    yield ("answer_cache_entries", "gauge", "Entries in the answer cache", {}, stats["entries"])
+    yield ("answer_cache_hits_total", "counter", "Answer cache hits", {"kind": "exact"}, stats["hits"])
+    yield ("answer_cache_hits_total", "counter", "Answer cache hits", {"kind": "semantic"}, stats["semantic_hits"])
+    yield ("answer_cache_misses_total", "counter", "Answer cache misses", {}, stats["misses"])
+
+
+REGISTRY.add_collector(_answer_cache_samples)
+
+
+def _conversation_db_samples():
+    db_path = conversation_memory.pool.db_path
+    for suffix, kind in (("", "db"), ("-wal", "wal")):
+        path = db_path.with_name(db_path.name + suffix)
+        size = path.stat().st_size if path.exists() else 0
+        yield ("conversation_db_bytes", "gauge", "Conversation database file size", {"file": kind}, size)
+
+
+REGISTRY.add_collector(_conversation_db_samples)
 
 
 def ensure_initial_message():
@@ -44,26 +98,25 @@ def ensure_initial_message():
 
 
 def restore_uploaded_files():
-    """최근 업로드 파일이 있으면 global_state에 복원합니다."""
+    """최근 업로드 파일이 있으면 global_state에 복원합니다.
+
+    메타/미리보기/요약만 복원하고 Retriever는 만들지 않습니다(임베딩·색인은 `restore_retriever`가
+    INDEX_GATE 슬롯을 잡고 프로세스 풀에서 만듭니다). 해시는 메타에 저장된 md5가 현재 크기와 맞으면
+    그대로 쓰고, 아니면 파일을 조각 단위로 읽어 계산합니다.
+    """
     try:
         dataset_id, meta = get_latest_uploaded_file()
         if dataset_id and meta:
             raw_path = Path(meta["raw_path"]) if meta.get("raw_path") else None
             if raw_path and raw_path.exists():
-                with open(raw_path, "rb") as f:
-                    file_hash = hashlib.md5(f.read()).hexdigest()
+                fresh = meta.get("md5") and meta.get("size_bytes") == raw_path.stat().st_size
+                file_hash = meta["md5"] if fresh else file_md5(raw_path)
 
-                df = pd.read_csv(raw_path, nrows=20)
-                dtype_df = pd.DataFrame(
-                    {
-                        "column": df.columns,
-                        "null_count": df.isnull().sum().values,
-                        "null_ratio": (df.isnull().mean() * 100).round(2).values,
-                        "dtype": df.dtypes.astype(str).values,
-                    }
-                )
+                df = load_frame(meta, nrows=20)
+                # 업로드와 같은 표본 계층 기준 타입/결측 통계(앞 20행으로 계산하지 않음)
+                dtype_df = sample_dtype_table(dataset_id, meta)
 
-                retriever = build_retriever_from_csv(raw_path)
+                summary = read_summary(dataset_id) or build_summary(dataset_id, meta)
 
                 global_state.update(
                     {
@@ -72,7 +125,8 @@ def restore_uploaded_files():
                         "meta": meta,
                         "preview_df": df.to_dict("records"),
                         "dtype_df": dtype_df.to_dict("records"),
-                        "retriever": retriever,
+                        "retriever": None,
+                        "summary": summary,
                     }
                 )
                 logging.info(f"업로드된 파일 복원 완료: {dataset_id}")
@@ -82,6 +136,42 @@ def restore_uploaded_files():
         logging.error(f"파일 복원 중 오류: {str(e)}")
 
 
+_restore_lock = asyncio.Lock()
+# 색인 생성이 실패한 파일 해시(같은 파일로 요청마다 다시 시도하지 않음)
+_restore_failures: set = set()
+
+
+async def restore_retriever():
+    """복원된 데이터셋에 Retriever가 없으면 업로드와 같은 경로(INDEX_GATE 슬롯, run_cpu)로 만듭니다.
+
+    포화(AdmissionRejected/ExecutorSaturated)는 그대로 올리고, 그 밖의 실패는 기록만 하고 Retriever 없이 둡니다.
+    """
+    async with _restore_lock:
+        dsid, meta, file_hash = global_state.get("dsid"), global_state.get("meta"), global_state.get("file_hash")
+        if not meta or global_state.get("retriever") is not None or file_hash in _restore_failures:
+            return
+        try:
+            async with INDEX_GATE.slot(PRIORITY_UPLOAD):
+                payload = await run_cpu(build_index_payload, meta)
+                retriever = await run_io(retriever_from_payload, payload)
+        except (AdmissionRejected, ExecutorSaturated):
+            raise
+        except Exception as e:
+            logging.error(f"Retriever 복원 중 오류: {str(e)}")
+            _restore_failures.add(file_hash)
+            return
+        # 그사이 새 업로드/초기화가 있었으면 그 상태를 덮어쓰지 않습니다.
+        if global_state.get("dsid") == dsid and global_state.get("retriever") is None:
+            global_state["retriever"] = retriever
+
+
+async def ensure_restored():
+    """업로드 상태가 비어 있으면 메타를 복원하고(스레드 풀) Retriever까지 준비합니다."""
+    if not global_state.get("meta"):
+        await run_io(restore_uploaded_files)
+    await restore_retriever()
+
+
 # Initialize on import
 ensure_initial_message()
 restore_uploaded_files()
@@ -0,0 +1,218 @@
+"""`/upload`, `/chat` 엔드투엔드 지연 시간 벤치마크.
+
+기본값은 API 키/네트워크 없이 동작하는 오프라인 모드입니다.
+- `LLM_BACKEND=fake`: 도구 호출을 재생하는 결정적 모델(core.llm.fake)
+- `EMBEDDING_BACKEND=fake`: 모델 다운로드가 필요 없는 해시 임베딩
+FastAPI 앱을 같은 프로세스에 올려 httpx ASGI 전송으로 호출하며, `--base-url`을 주면
+이미 떠 있는 서버를 대상으로 측정합니다.
+
+사용 예:
+    python benchmarks/chat_latency.py --rows 5000 --uploads 2 --chats 40 --concurrency 8
+    python benchmarks/chat_latency.py --base-url http://localhost:8000 --csv data.csv --json out.json
+
+출력은 엔드포인트별 p50/p95/p99 지연, 처리량, 오류 수와 단계별 분해입니다.
+단계별 분해는 응답의 `Server-Timing` 헤더(있을 경우)를 단계 이름별로 집계합니다.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+
+DEFAULT_QUESTIONS = [
+    "이 파일을 요약해줘",
+    "어떤 컬럼들이 있어?",
+    "region별 평균 sales를 알려줘",
+    "가장 큰 sales 값을 가진 행은?",
+    "결측치가 많은 컬럼은?",
+]
+
+
+def synthetic_csv(rows: int, seed: int = 0) -> bytes:
+    """벤치마크용 합성 CSV(범주/수치/날짜 혼합)를 생성합니다."""
+    rng = random.Random(seed)
+    regions = ["KR", "US", "JP", "DE", "FR"]
+    buf = io.StringIO()
+    buf.write("id,region,product,sales,qty,date\n")
+    for i in range(rows):
+        buf.write(
+            f"{i},{rng.choice(regions)},P{rng.randint(1, 50):03d},"
+            f"{rng.uniform(1, 1000):.2f},{rng.randint(1, 20)},2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}\n"
+        )
+    return buf.getvalue().encode("utf-8")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """최근접 순위(nearest-rank) 백분위수."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def parse_server_timing(header: str | None) -> Dict[str, float]:
+    """`Server-Timing: stage;dur=12.3, other;dur=4` 헤더를 {stage: ms}로 변환합니다."""
+    stages: Dict[str, float] = {}
+    if not header:
+        return stages
+    for item in header.split(","):
+        parts = [p.strip() for p in item.split(";")]
+        name = parts[0]
+        for p in parts[1:]:
+            if p.startswith("dur="):
+                try:
+                    stages[name] = stages.get(name, 0.0) + float(p[4:])
+                except ValueError:
+                    pass
+    return stages
+
+
+class Recorder:
+    """엔드포인트별 지연/오류와 Server-Timing 단계 시간을 수집합니다."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.stages: Dict[str, Dict[str, List[float]]] = defaultdict(lambda: defaultdict(list))
+
+    def record(self, endpoint: str, elapsed_ms: float, ok: bool, server_timing: str | None):
+        self.latencies[endpoint].append(elapsed_ms)
+        if not ok:
+            self.errors[endpoint] += 1
+        for stage, ms in parse_server_timing(server_timing).items():
+            self.stages[endpoint][stage].append(ms)
+
+    def report(self, wall_sec: Dict[str, float]) -> Dict[str, dict]:
+        out: Dict[str, dict] = {}
+        for endpoint, values in self.latencies.items():
+            wall = wall_sec.get(endpoint) or 0.0
+            out[endpoint] = {
+                "count": len(values),
+                "errors": self.errors[endpoint],
+                "p50_ms": round(percentile(values, 50), 1),
+                "p95_ms": round(percentile(values, 95), 1),
+                "p99_ms": round(percentile(values, 99), 1),
+                "mean_ms": round(sum(values) / len(values), 1),
+                "throughput_rps": round(len(values) / wall, 2) if wall else None,
+                "stages": {
+                    stage: {
+                        "p50_ms": round(percentile(ms, 50), 1),
+                        "p95_ms": round(percentile(ms, 95), 1),
+                        "mean_ms": round(sum(ms) / len(ms), 1),
+                    }
+                    for stage, ms in sorted(self.stages[endpoint].items())
+                },
+            }
+        return out
+
+
+async def _timed(client: httpx.AsyncClient, recorder: Recorder, endpoint: str, method: str, url: str, **kwargs):
+    started = time.perf_counter()
+    ok = False
+    timing = None
+    try:
+        resp = await client.request(method, url, **kwargs)
+        timing = resp.headers.get("server-timing")
+        ok = resp.status_code < 400
+        if ok and endpoint == "upload":
+            ok = bool(resp.json().get("success"))
+    except Exception as e:
+        print(f"[{endpoint}] request failed: {e}", file=sys.stderr)
+    recorder.record(endpoint, (time.perf_counter() - started) * 1000, ok, timing)
+
+
+async def run_phase(concurrency: int, jobs) -> float:
+    """코루틴 팩토리 목록을 최대 `concurrency`개씩 동시에 실행하고 경과 시간(초)을 반환합니다."""
+    sem = asyncio.Semaphore(concurrency)
+
+    async def guarded(job):
+        async with sem:
+            await job()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(guarded(job) for job in jobs))
+    return time.perf_counter() - started
+
+
+async def main(args) -> Dict[str, dict]:
+    if args.base_url:
+        transport = None
+        base_url = args.base_url
+    else:
+        if args.offline:
+            os.environ.setdefault("LLM_BACKEND", "fake")
+            os.environ.setdefault("EMBEDDING_BACKEND", "fake")
+        # 반복 질문이 캐시 적중으로 끝나지 않도록 기본적으로 답변 캐시를 끕니다.
+        os.environ.setdefault("ANSWER_CACHE_ENABLED", "true" if args.answer_cache else "false")
+        import api
+
+        transport = httpx.ASGITransport(app=api.app)
+        base_url = "http://bench"
+
+    payload = open(args.csv, "rb").read() if args.csv else synthetic_csv(args.rows)
+    filename = os.path.basename(args.csv) if args.csv else "bench.csv"
+    questions = DEFAULT_QUESTIONS
+
+    recorder = Recorder()
+    wall: Dict[str, float] = {}
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=args.timeout) as client:
+        upload_jobs = [
+            (lambda: _timed(client, recorder, "upload", "POST", "/upload",
+                            files={"file": (filename, payload, "text/csv")}))
+            for _ in range(args.uploads)
+        ]
+        wall["upload"] = await run_phase(args.concurrency, upload_jobs)
+
+        chat_jobs = [
+            (lambda q=questions[i % len(questions)]: _timed(client, recorder, "chat", "POST", "/chat",
+                                                             json={"message": q}))
+            for i in range(args.chats)
+        ]
+        wall["chat"] = await run_phase(args.concurrency, chat_jobs)
+
+    return recorder.report(wall)
+
+
+def print_report(report: Dict[str, dict]):
+    for endpoint, r in report.items():
+        print(
+            f"{endpoint:>8} | n={r['count']:<4} err={r['errors']:<3} "
+            f"p50={r['p50_ms']:>8.1f}ms p95={r['p95_ms']:>8.1f}ms p99={r['p99_ms']:>8.1f}ms "
+            f"thr={r['throughput_rps']} req/s"
+        )
+        for stage, s in r["stages"].items():
+            print(f"{'':>8}   - {stage:<24} p50={s['p50_ms']:>8.1f}ms p95={s['p95_ms']:>8.1f}ms mean={s['mean_ms']:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--base-url", default=None, help="측정할 서버 URL(미지정 시 인프로세스 앱)")
+    parser.add_argument("--csv", default=None, help="업로드할 CSV 경로(미지정 시 합성 데이터)")
+    parser.add_argument("--rows", type=int, default=2000, help="합성 CSV 행 수")
+    parser.add_argument("--uploads", type=int, default=1, help="업로드 요청 수")
+    parser.add_argument("--chats", type=int, default=20, help="채팅 요청 수")
+    parser.add_argument("--concurrency", type=int, default=4, help="동시 요청 수")
+    parser.add_argument("--timeout", type=float, default=300.0, help="요청 타임아웃(초)")
+    parser.add_argument("--online", dest="offline", action="store_false", help="실제 LLM/임베딩 백엔드 사용")
+    parser.add_argument("--answer-cache", action="store_true", help="인프로세스 앱의 답변 캐시 사용")
+    parser.add_argument("--json", default=None, help="결과를 JSON으로 저장할 경로")
+    args = parser.parse_args()
+
+    report = asyncio.run(main(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,138 @@
+"""환경변수 기반 런타임 설정.
+
+`paths.py`와 같이 모듈 상수로 노출하며, 값은 임포트 시점에 한 번만 읽습니다.
+배포 환경마다 다른 값은 `.env` 또는 프로세스 환경변수로 덮어씁니다.
+"""
+
+import os
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    raw = os.getenv(name)
+    if raw is None:
+        return default
+    return raw.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_ints(name: str, default: tuple) -> tuple:
+    raw = os.getenv(name)
+    if not raw:
+        return default
+    try:
+        return tuple(int(v) for v in raw.split(",") if v.strip())
+    except ValueError:
+        return default
+
+
+# Answer cache: (데이터셋 해시, 프로필 버전, 최근 대화 창 해시, 정규화 질문) → 답변
+ANSWER_CACHE_ENABLED = _env_bool("ANSWER_CACHE_ENABLED", True)
+ANSWER_CACHE_TTL_SEC = _env_int("ANSWER_CACHE_TTL_SEC", 3600)
+ANSWER_CACHE_MAX_ENTRIES = _env_int("ANSWER_CACHE_MAX_ENTRIES", 512)
+# 키에 넣는 직전 대화 메시지 수(0이면 대화 맥락을 무시)
+ANSWER_CACHE_CONTEXT_MESSAGES = _env_int("ANSWER_CACHE_CONTEXT_MESSAGES", 2)
+# 임베딩 유사도 기반 근사 조회(비슷한 표현의 질문)는 선택 기능입니다.
+ANSWER_CACHE_SEMANTIC = _env_bool("ANSWER_CACHE_SEMANTIC", False)
+ANSWER_CACHE_SIMILARITY = _env_float("ANSWER_CACHE_SIMILARITY", 0.92)
+
+# Conversation context: 요약 + 최근 턴을 합친 프롬프트 예산(추정 토큰)
+CONTEXT_TOKEN_BUDGET = _env_int("CONTEXT_TOKEN_BUDGET", 1500)
+CONTEXT_SUMMARY_TOKENS = _env_int("CONTEXT_SUMMARY_TOKENS", 400)
+CONTEXT_MESSAGE_MAX_TOKENS = _env_int("CONTEXT_MESSAGE_MAX_TOKENS", 400)
+CONTEXT_MAX_RECENT = _env_int("CONTEXT_MAX_RECENT", 20)
+
+# Dataset summary: 프롬프트에 넣는 사전 계산 요약의 최대 크기(추정 토큰)
+DATASET_SUMMARY_TOKENS = _env_int("DATASET_SUMMARY_TOKENS", 600)
+
+# Row offset index: N번째 레코드마다 바이트 위치를 기록(페이지 미리보기용), 미리보기 한 페이지의 최대 행 수
+ROW_INDEX_STRIDE = _env_int("ROW_INDEX_STRIDE", 1000)
+PREVIEW_MAX_ROWS = _env_int("PREVIEW_MAX_ROWS", 1000)
+
+# Sample tiers: 업로드 시 만드는 균등 무작위 표본 계층(행 수, 쉼표 구분)과 도구의 기본 정확도 목표
+# (95% 신뢰 수준의 비율 오차 한계. 0.02면 ±2%p 이내가 되는 가장 작은 계층 사용)
+SAMPLE_TIERS = _env_ints("SAMPLE_TIERS", (1_000, 10_000, 100_000, 1_000_000))
+SAMPLE_MAX_ERROR = _env_float("SAMPLE_MAX_ERROR", 0.02)
+
+# Query cache: 데이터셋별로 보관하는 query_data 결과 캐시 파일 수(넘으면 가장 오래 안 쓴 것부터 삭제)
+QUERY_CACHE_MAX_ENTRIES = _env_int("QUERY_CACHE_MAX_ENTRIES", 256)
+
+# Dtype plan: 업로드 요약으로 읽기 타입(정수 축소/category/날짜)을 정해 모든 로더에 적용.
+# 실수의 float32 축소는 정확 집계 자릿수가 바뀌므로 기본 off
+DTYPE_PLAN = _env_bool("DTYPE_PLAN", True)
+DTYPE_DOWNCAST_FLOATS = _env_bool("DTYPE_DOWNCAST_FLOATS", False)
+DTYPE_CATEGORY_MAX = _env_int("DTYPE_CATEGORY_MAX", 1000)
+
+# Profile: 프롬프트에 주입하는 사용자 프로필 요약의 최대 크기(추정 토큰)
+PROFILE_SUMMARY_MAX_TOKENS = _env_int("PROFILE_SUMMARY_MAX_TOKENS", 300)
+
+# RAG: 벡터 + BM25 하이브리드 검색 사용 여부, 각 검색에서 융합 전에 가져올 후보 수, RRF 상수
+RAG_HYBRID = _env_bool("RAG_HYBRID", True)
+RAG_FETCH_K = _env_int("RAG_FETCH_K", 20)
+RAG_RRF_K = _env_int("RAG_RRF_K", 60)
+# 검색 문서 구성: rows(행 하나 = 문서) | blocks(RAG_BLOCK_ROWS개 행 = 문서), 동일 행 중복 제거, 컬럼 요약 문서 추가
+RAG_DOC_STRATEGY = os.getenv("RAG_DOC_STRATEGY", "rows").strip().lower()
+RAG_BLOCK_ROWS = _env_int("RAG_BLOCK_ROWS", 10)
+RAG_DEDUP_ROWS = _env_bool("RAG_DEDUP_ROWS", True)
+RAG_COLUMN_DOCS = _env_bool("RAG_COLUMN_DOCS", True)
+# 벡터 색인 종류: auto(행 수가 RAG_ANN_MIN_ROWS 이상이면 ivfpq) | flat | ivfpq | hnsw
+RAG_INDEX_MODE = os.getenv("RAG_INDEX_MODE", "auto").strip().lower()
+RAG_ANN_MIN_ROWS = _env_int("RAG_ANN_MIN_ROWS", 200_000)
+# IVF-PQ: 군집 수(0이면 4·√n), 질의 시 훑는 군집 수, 벡터당 PQ 코드 바이트 수
+RAG_IVF_NLIST = _env_int("RAG_IVF_NLIST", 0)
+RAG_IVF_NPROBE = _env_int("RAG_IVF_NPROBE", 16)
+RAG_PQ_M = _env_int("RAG_PQ_M", 48)
+# HNSW: 노드당 이웃 수, 질의 탐색 폭
+RAG_HNSW_M = _env_int("RAG_HNSW_M", 32)
+RAG_HNSW_EF_SEARCH = _env_int("RAG_HNSW_EF_SEARCH", 64)
+# 근사 색인 학습에 쓰는 최대 표본 행 수
+RAG_TRAIN_SAMPLE = _env_int("RAG_TRAIN_SAMPLE", 100_000)
+
+# Admission control: 동시 에이전트 실행(LLM 호출) / MCP 서버 세션 / 업로드 처리(색인) 수와 각 대기열 길이.
+# 대기열이 가득 차거나 ADMISSION_MAX_WAIT_SEC(0이면 무제한) 안에 차례가 오지 않으면 429 + Retry-After
+LLM_MAX_CONCURRENT = _env_int("LLM_MAX_CONCURRENT", 4)
+LLM_MAX_QUEUE = _env_int("LLM_MAX_QUEUE", 16)
+MCP_MAX_SESSIONS = _env_int("MCP_MAX_SESSIONS", 4)
+MCP_MAX_QUEUE = _env_int("MCP_MAX_QUEUE", 16)
+INDEX_MAX_CONCURRENT = _env_int("INDEX_MAX_CONCURRENT", 1)
+INDEX_MAX_QUEUE = _env_int("INDEX_MAX_QUEUE", 4)
+ADMISSION_MAX_WAIT_SEC = _env_float("ADMISSION_MAX_WAIT_SEC", 30.0)
+# Batch chat: 한 요청에 담을 수 있는 최대 질문 수, 질문을 동시에 실행하는 최대 수(LLM 슬롯이 남는 만큼만 사용)
+BATCH_MAX_QUESTIONS = _env_int("BATCH_MAX_QUESTIONS", 50)
+BATCH_MAX_CONCURRENCY = _env_int("BATCH_MAX_CONCURRENCY", 4)
+
+# Executors: CPU 작업용 프로세스 풀(0이면 min(4, CPU 수)), 블로킹 I/O용 스레드 풀과 각 대기 상한
+CPU_WORKERS = _env_int("CPU_WORKERS", 0)
+CPU_MAX_PENDING = _env_int("CPU_MAX_PENDING", 8)
+IO_WORKERS = _env_int("IO_WORKERS", 16)
+IO_MAX_PENDING = _env_int("IO_MAX_PENDING", 256)
+
+# SQLite: DB 파일(대화/프로필)별 연결 풀 크기
+SQLITE_POOL_SIZE = _env_int("SQLITE_POOL_SIZE", 4)
+# 대화 메시지 저장 방식: sync(메시지마다 커밋) | batched(동시 쓰기를 묶어 바로 커밋)
+# 둘 다 커밋 후 반환하지만 WAL + synchronous=NORMAL이라 전원 장애 시 마지막 커밋이 유실될 수 있음
+MEMORY_WRITE_MODE = os.getenv("MEMORY_WRITE_MODE", "batched").strip().lower()
+# 쓰기 큐: 한 트랜잭션에 묶는 최대 행 수, 배치를 버리기 전 커밋 시도 횟수
+DB_WRITE_BATCH_SIZE = _env_int("DB_WRITE_BATCH_SIZE", 64)
+DB_WRITE_MAX_ATTEMPTS = _env_int("DB_WRITE_MAX_ATTEMPTS", 3)
+
+# Retention: 대화 DB 보존 기준(나이/개수), 주기(초, 0이면 자동 실행 안 함), 한 번에 반환할 빈 페이지 수
+RETENTION_MAX_AGE_DAYS = _env_float("RETENTION_MAX_AGE_DAYS", 30.0)
+RETENTION_KEEP_RECENT = _env_int("RETENTION_KEEP_RECENT", 500)
+RETENTION_INTERVAL_SEC = _env_int("RETENTION_INTERVAL_SEC", 3600)
+RETENTION_VACUUM_PAGES = _env_int("RETENTION_VACUUM_PAGES", 2000)
+
+# Metrics: 이 값(ms)보다 오래 걸린 요청은 단계별 시간과 함께 경고 로그를 남깁니다(0이면 비활성).
+SLOW_REQUEST_MS = _env_float("SLOW_REQUEST_MS", 0.0)
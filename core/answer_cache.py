@@ -0,0 +1,178 @@
+"""반복 질문에 대한 답변 캐시.
+
+같은 파일에 대해 같은(또는 거의 같은) 질문이 반복되면 에이전트를 다시 실행하지 않고
+저장된 답변을 돌려줍니다. 키는 (데이터셋 내용 해시, 프로필 버전, 최근 대화 창 해시, 정규화 질문)이며,
+TTL 만료와 최대 항목 수 기반 LRU 축출을 적용합니다. "그럼 두 번째는?"처럼 앞 대화에 기대는 질문이
+다른 대화의 답을 받지 않도록 직전 대화가 같을 때만 적중합니다. 임베딩 함수를 주면 같은
+데이터셋/프로필/대화 창 범위 안에서 코사인 유사도로 근사 조회도 수행합니다(임베딩은 블로킹이므로
+이벤트 루프에서는 스레드 풀로 호출).
+"""
+
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+
+CacheKey = Tuple[str, int, str, str]
+Scope = Tuple[str, int, str]
+
+
+@dataclass
+class _Entry:
+    answer: str
+    expires_at: float
+    vector: Optional[np.ndarray] = None
+
+
+def normalize_question(question: str) -> str:
+    """대소문자/전각 문자/공백 차이와 끝의 문장부호만 없앤 비교용 질문 문자열을 만듭니다.
+
+    비교 연산자, 부호, 소수점, % 같은 기호는 뜻을 바꾸므로 남깁니다("sales > 100"과 "sales < 100"은 다른 키).
+    """
+    text = unicodedata.normalize("NFKC", question or "").lower()
+    text = re.sub(r"\s+", " ", text).strip()
+    return re.sub(r"[\s?!.~…。？！]+$", "", text)
+
+
+def context_fingerprint(messages: List[Dict[str, Any]]) -> str:
+    """최근 대화 창(역할/내용)의 해시. 메시지가 없으면 빈 문자열."""
+    if not messages:
+        return ""
+    digest = hashlib.md5()
+    for msg in messages:
+        digest.update(f"{msg.get('role', '')}\x1f{normalize_question(msg.get('content', ''))}\x1e".encode("utf-8"))
+    return digest.hexdigest()
+
+
+class AnswerCache:
+    """TTL + LRU 답변 캐시(스레드 안전).
+
+    Args:
+        ttl_sec: 항목 유효 시간(초)
+        max_entries: 최대 항목 수. 초과 시 가장 오래 사용되지 않은 항목부터 축출
+        embed_fn: 텍스트 → 벡터 함수(선택). 지정하면 유사 질문 근사 조회 활성화
+        similarity_threshold: 근사 조회로 인정할 최소 코사인 유사도
+    """
+
+    def __init__(
+        self,
+        ttl_sec: int = 3600,
+        max_entries: int = 512,
+        embed_fn: Optional[Callable[[str], List[float]]] = None,
+        similarity_threshold: float = 0.92,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl_sec = ttl_sec
+        self.max_entries = max_entries
+        self.embed_fn = embed_fn
+        self.similarity_threshold = similarity_threshold
+        self._clock = clock
+        self._entries: "OrderedDict[CacheKey, _Entry]" = OrderedDict()
+        self._scopes: Dict[Scope, Set[CacheKey]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def get(self, dataset_hash: str | None, profile_version: int, question: str, context: str = "") -> Optional[str]:
+        """캐시된 답변을 반환합니다. 정확 일치 → (선택) 유사도 일치 순으로 조회합니다.
+
+        `context`는 질문 직전 대화 창의 해시(`context_fingerprint`)입니다.
+        """
+        scope = (dataset_hash or "", profile_version, context)
+        key = (*scope, normalize_question(question))
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.answer
+            if entry is not None:
+                self._remove(key)
+            has_candidates = bool(self._scopes.get(scope))
+
+        if self.embed_fn is not None and has_candidates:
+            match = self._semantic_lookup(scope, question, now)
+            if match is not None:
+                return match
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, dataset_hash: str | None, profile_version: int, question: str, answer: str, context: str = ""):
+        """답변을 저장합니다. 임베딩 함수가 있으면 질문 벡터도 함께 보관합니다."""
+        scope = (dataset_hash or "", profile_version, context)
+        key = (*scope, normalize_question(question))
+        vector = self._embed(question) if self.embed_fn is not None else None
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = _Entry(answer=answer, expires_at=self._clock() + self.ttl_sec, vector=vector)
+            self._scopes.setdefault(scope, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def invalidate(self, dataset_hash: str | None = None):
+        """특정 데이터셋(또는 전체)의 캐시 항목을 제거합니다."""
+        with self._lock:
+            if dataset_hash is None:
+                self._entries.clear()
+                self._scopes.clear()
+                return
+            for key in [k for k in self._entries if k[0] == dataset_hash]:
+                self._remove(key)
+
+    def stats(self) -> Dict[str, int]:
+        """항목 수와 적중/미스 카운터를 반환합니다."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+            }
+
+    def _remove(self, key: CacheKey):
+        self._entries.pop(key, None)
+        scope_keys = self._scopes.get(key[:3])
+        if scope_keys is not None:
+            scope_keys.discard(key)
+            if not scope_keys:
+                del self._scopes[key[:3]]
+
+    def _embed(self, text: str) -> Optional[np.ndarray]:
+        try:
+            vec = np.asarray(self.embed_fn(text), dtype=np.float32)
+        except Exception:
+            return None
+        norm = float(np.linalg.norm(vec))
+        return vec / norm if norm else None
+
+    def _semantic_lookup(self, scope: Scope, question: str, now: float) -> Optional[str]:
+        query = self._embed(question)
+        if query is None:
+            return None
+        with self._lock:
+            best_key, best_score = None, self.similarity_threshold
+            for key in self._scopes.get(scope, ()):
+                entry = self._entries[key]
+                if entry.vector is None or entry.expires_at <= now:
+                    continue
+                score = float(np.dot(query, entry.vector))
+                if score >= best_score:
+                    best_key, best_score = key, score
+            if best_key is None:
+                return None
+            self._entries.move_to_end(best_key)
+            self.semantic_hits += 1
+            return self._entries[best_key].answer
@@ -0,0 +1,136 @@
+"""토큰 예산 기반 대화 컨텍스트 빌더.
+
+최근 대화를 최신순으로 예산(토큰 추정치)까지만 담고, 그보다 오래된 대화는 대화 DB의
+롤링 요약(`conversation_summaries`)으로 접어 넣습니다. 요약은 새로 창 밖으로 밀려난
+메시지만 덧붙이는 방식으로 점진 갱신되며, 요약 자체도 예산을 넘으면 가장 오래된 줄부터
+버립니다. 따라서 대화가 길어져도 프롬프트 크기는 일정하게 유지됩니다.
+
+기본 요약기는 LLM 호출 없이 각 턴의 앞부분을 발췌하는 추출형으로, 채팅마다 추가 왕복을
+만들지 않습니다. 필요하면 `summarize_fn`으로 교체할 수 있습니다.
+"""
+
+from typing import Any, Callable, Dict, List
+
+from core.memory import ConversationMemory
+
+SUMMARY_HEADER = "이전 대화 요약(오래된 순):"
+
+
+def estimate_tokens(text: str) -> int:
+    """토크나이저 없이 쓰는 보수적 토큰 추정치.
+
+    ASCII는 약 4자당 1토큰, 한글 등 비 ASCII 문자는 1자당 1토큰으로 계산합니다.
+    """
+    if not text:
+        return 0
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+def truncate_to_tokens(text: str, max_tokens: int, suffix: str = " …(생략)") -> str:
+    """추정 토큰 수가 max_tokens 이하가 되도록 뒤를 잘라냅니다."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    budget = max(0, max_tokens - estimate_tokens(suffix))
+    used, ascii_run = 0, 0
+    for i, ch in enumerate(text):
+        if ord(ch) < 128:
+            ascii_run += 1
+            cost = 1 if ascii_run % 4 == 1 else 0
+        else:
+            cost = 1
+        if used + cost > budget:
+            return text[:i] + suffix
+        used += cost
+    return text
+
+
+def summarize_turn(message: Dict[str, Any], max_tokens: int = 60) -> str:
+    """한 턴을 요약 한 줄(역할: 발췌)로 변환합니다."""
+    role = {"user": "사용자", "assistant": "어시스턴트"}.get(message["role"], message["role"])
+    text = " ".join(str(message.get("content", "")).split())
+    return f"- {role}: {truncate_to_tokens(text, max_tokens, suffix='…')}"
+
+
+class ConversationContextBuilder:
+    """대화 메모리에서 예산 내 프롬프트 컨텍스트(요약 + 최근 턴)를 구성합니다.
+
+    Args:
+        memory: 대화 메모리
+        token_budget: 요약과 최근 턴을 합친 전체 예산(추정 토큰)
+        summary_token_budget: 롤링 요약에 쓸 최대 예산
+        message_token_cap: 최근 턴 한 개가 차지할 수 있는 최대 토큰(긴 답변 절단)
+        max_recent: 최근 턴 후보로 조회할 최대 메시지 수
+        summarize_fn: 메시지 → 요약 한 줄 함수(기본: 추출형 `summarize_turn`)
+    """
+
+    def __init__(
+        self,
+        memory: ConversationMemory,
+        token_budget: int = 1500,
+        summary_token_budget: int = 400,
+        message_token_cap: int = 400,
+        max_recent: int = 20,
+        summarize_fn: Callable[[Dict[str, Any]], str] = summarize_turn,
+    ):
+        self.memory = memory
+        self.token_budget = token_budget
+        self.summary_token_budget = min(summary_token_budget, token_budget)
+        self.message_token_cap = message_token_cap
+        self.max_recent = max_recent
+        self.summarize_fn = summarize_fn
+
+    def build(self) -> List[Dict[str, str]]:
+        """프롬프트에 넣을 메시지 목록을 반환합니다.
+
+        첫 항목은(요약이 있으면) system 요약 메시지이고, 이어서 최근 턴이 시간순으로 옵니다.
+        호출 시점에 창 밖으로 밀려난 메시지가 있으면 요약을 갱신해 DB에 저장합니다.
+        """
+        summary, summarized_id = self.memory.get_summary()
+        candidates = [
+            m for m in self.memory.get_recent_messages(limit=self.max_recent) if m["id"] > summarized_id
+        ]
+
+        # 최신 턴부터 예산이 허락하는 만큼 담습니다.
+        recent_budget = self.token_budget - self.summary_token_budget
+        window: List[Dict[str, str]] = []
+        used = 0
+        window_start_id = None
+        for msg in reversed(candidates):
+            content = truncate_to_tokens(msg["content"], self.message_token_cap)
+            cost = estimate_tokens(content)
+            if window and used + cost > recent_budget:
+                break
+            window.append({"role": msg["role"], "content": content})
+            used += cost
+            window_start_id = msg["id"]
+        window.reverse()
+
+        if window_start_id is not None:
+            summary = self._fold(summary, summarized_id, window_start_id)
+
+        messages: List[Dict[str, str]] = []
+        if summary:
+            messages.append({"role": "system", "content": f"{SUMMARY_HEADER}\n{summary}"})
+        messages.extend(window)
+        return messages
+
+    def fold_until(self, message_id: int):
+        """id < message_id인 메시지가 요약에 반영되도록 요약을 갱신합니다(보관/삭제 전 호출)."""
+        summary, summarized_id = self.memory.get_summary()
+        if message_id - 1 > summarized_id:
+            self._fold(summary, summarized_id, message_id)
+
+    def _fold(self, summary: str, summarized_id: int, window_start_id: int) -> str:
+        """요약 이후~창 시작 이전 메시지를 요약에 덧붙이고 예산에 맞게 오래된 줄을 버립니다."""
+        evicted = self.memory.get_messages_between(summarized_id, window_start_id)
+        if not evicted:
+            return summary
+
+        lines = summary.splitlines() if summary else []
+        lines.extend(self.summarize_fn(m) for m in evicted)
+        while len(lines) > 1 and estimate_tokens("\n".join(lines)) > self.summary_token_budget:
+            lines.pop(0)
+        summary = truncate_to_tokens("\n".join(lines), self.summary_token_budget)
+        self.memory.save_summary(summary, evicted[-1]["id"])
+        return summary
@@ -0,0 +1,133 @@
+"""Parquet / Arrow IPC 원본을 메모리 맵으로 읽는 로더.
+
+열 지향 파일은 스키마와 행 수가 파일 메타데이터에 있으므로 스니핑(인코딩/구분자 추정)과 행 수 집계가
+필요 없고, 값도 텍스트 파싱 없이 타입 그대로 읽힙니다. 원본은 `memory_map`으로 열어 필요한 컬럼(과
+Parquet은 필요한 row group)만 페이지 단위로 올라오게 합니다.
+
+- `parquet`(.parquet/.pq): `pyarrow.parquet.ParquetFile`. 구간 읽기는 해당 row group만 디코딩
+- `arrow`(.arrow/.feather/.ipc): Arrow IPC 파일(Feather v2) 또는 스트림. 메모리 맵 위의 zero-copy 테이블
+
+pyarrow는 이 형식을 쓸 때만 필요하므로 함수 안에서 임포트합니다.
+"""
+
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+COLUMNAR_EXTS = {"parquet": "parquet", "pq": "parquet", "arrow": "arrow", "feather": "arrow", "ipc": "arrow"}
+
+
+def is_columnar(meta_or_sniff: dict) -> bool:
+    """메타(또는 스니핑 정보)가 열 지향 형식인지 여부."""
+    sniff = meta_or_sniff.get("sniff", meta_or_sniff) or {}
+    return sniff.get("filetype") in ("parquet", "arrow")
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ValueError("UNSUPPORTED_FILE_TYPE: Parquet/Arrow 파일을 읽으려면 pyarrow가 필요합니다.") from e
+    return pa, pq
+
+
+@contextmanager
+def _arrow_table(path: Path):
+    """메모리 맵 위의 Arrow IPC 테이블(파일 형식 우선, 실패 시 스트림 형식)."""
+    pa, _ = _pyarrow()
+    with pa.memory_map(str(path), "r") as source:
+        try:
+            table = pa.ipc.open_file(source).read_all()
+        except pa.ArrowInvalid:
+            source.seek(0)
+            table = pa.ipc.open_stream(source).read_all()
+        yield table
+
+
+def sniff_columnar(raw_path: Path, ext: str) -> Dict[str, Any]:
+    """파일 메타데이터에서 형식/행 수/스키마를 읽습니다(데이터 페이지는 읽지 않음)."""
+    filetype = COLUMNAR_EXTS[ext]
+    info: Dict[str, Any] = {"filetype": filetype, "encoding": None, "delimiter": None, "ext": ext}
+    if filetype == "parquet":
+        _, pq = _pyarrow()
+        pf = pq.ParquetFile(str(raw_path), memory_map=True)
+        schema, rows = pf.schema_arrow, pf.metadata.num_rows
+    else:
+        with _arrow_table(raw_path) as table:
+            schema, rows = table.schema, table.num_rows
+    info.update(rows=int(rows), schema={field.name: str(field.type) for field in schema})
+    return info
+
+
+def count_rows(meta: dict) -> int:
+    """전체 행 수(파일 메타데이터)."""
+    sniff = meta.get("sniff", {})
+    if sniff.get("rows") is not None:
+        return int(sniff["rows"])
+    return sniff_columnar(Path(meta["raw_path"]), sniff.get("ext") or "parquet")["rows"]
+
+
+def as_text(frame: pd.DataFrame) -> pd.DataFrame:
+    """타입 있는 프레임을 CSV를 문자열(object)로 읽은 것과 같은 형태로 바꿉니다(결측은 NaN 유지).
+
+    요약/표본처럼 원문 문자열을 기준으로 동작하는 처리에 씁니다.
+    """
+    return frame.astype(str).where(frame.notna()).astype(object)
+
+
+def _row_groups(pf, offset: int, limit: Optional[int]) -> Tuple[List[int], int]:
+    """[offset, offset+limit) 구간을 덮는 row group 번호와 첫 group의 시작 행 번호."""
+    groups: List[int] = []
+    first_start = 0
+    start = 0
+    end = None if limit is None else offset + limit
+    for i in range(pf.metadata.num_row_groups):
+        n = pf.metadata.row_group(i).num_rows
+        if start + n > offset and (end is None or start < end):
+            if not groups:
+                first_start = start
+            groups.append(i)
+        start += n
+    return groups, first_start
+
+
+def read_columnar(
+    meta: dict, columns: Optional[List[str]] = None, offset: int = 0, limit: Optional[int] = None
+) -> pd.DataFrame:
+    """`offset`번째 행부터 최대 `limit`행을 `columns`만 읽습니다."""
+    path = Path(meta["raw_path"])
+    if meta["sniff"]["filetype"] == "parquet":
+        _, pq = _pyarrow()
+        pf = pq.ParquetFile(str(path), memory_map=True)
+        if offset == 0 and limit is None:
+            table = pf.read(columns=columns)
+        else:
+            groups, first_start = _row_groups(pf, offset, limit)
+            if not groups:
+                table = pf.schema_arrow.empty_table()
+                return (table.select(columns) if columns is not None else table).to_pandas()
+            table = pf.read_row_groups(groups, columns=columns).slice(offset - first_start, limit)
+        return table.to_pandas()
+    with _arrow_table(path) as table:
+        if columns is not None:
+            table = table.select(columns)
+        return table.slice(offset, limit).to_pandas()
+
+
+def iter_columnar(meta: dict, columns: Optional[List[str]] = None, chunksize: int = 100_000) -> Iterator[pd.DataFrame]:
+    """`chunksize`행 단위 DataFrame 청크(전체를 한 번에 변환하지 않음)."""
+    path = Path(meta["raw_path"])
+    if meta["sniff"]["filetype"] == "parquet":
+        _, pq = _pyarrow()
+        pf = pq.ParquetFile(str(path), memory_map=True)
+        for batch in pf.iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()
+        return
+    with _arrow_table(path) as table:
+        if columns is not None:
+            table = table.select(columns)
+        for start in range(0, table.num_rows, chunksize):
+            yield table.slice(start, chunksize).to_pandas()
@@ -0,0 +1,110 @@
+"""업로드 시점 컬럼 요약으로 읽기 타입(dtype)을 계획합니다.
+
+기본 `pd.read_csv`는 정수를 int64, 실수를 float64, 문자열을 파이썬 객체(object)로 읽어 필요보다
+5~10배 많은 메모리를 씁니다. 전체 파일 요약(`summary.json`)에는 값 범위/정수 여부/고유값 수/날짜 표기
+여부가 이미 있으므로, 이를 근거로 모든 로더가 같은 타입으로 읽도록 계획을 메타(`meta["dtypes"]`)에 저장합니다.
+
+- 정수(결측 없음): 범위에 맞는 가장 작은 정수 타입(int8/uint8/…)
+- 정수(결측 있음): 값이 float32로 정확히 표현되는 범위(|x| < 2^24)면 float32
+- 실수: `downcast_floats`일 때만 float32(기본은 float64 유지. 정확 집계 결과의 자릿수가 바뀌지 않도록)
+- 문자열: 고유값이 적으면 category
+- 불리언 표기(True/False): 결측이 없으면 bool, 있으면 계획하지 않음(pandas가 True/False/NaN 객체로 읽음).
+  category로 읽으면 값이 문자열로 남아 `== true` 필터가 맞지 않습니다.
+- ISO 날짜/시각 문자열: datetime64로 파싱
+
+요약은 전체 파일 기준이므로 계획한 타입으로 읽어도 값이 잘리거나 파싱에 실패하지 않습니다.
+"""
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# 고유값 수가 이 값 이하이고 비결측 행의 절반 이하인 문자열 컬럼을 category로 읽습니다.
+CATEGORY_MAX_DISTINCT = 1000
+CATEGORY_MAX_RATIO = 0.5
+# float32 가수부(24비트)로 정확히 표현되는 정수 범위
+FLOAT32_EXACT_INT = 2 ** 24
+
+
+def _int_dtype(lo: float, hi: float) -> Optional[str]:
+    if abs(lo) >= 2 ** 53 or abs(hi) >= 2 ** 53:
+        return None
+    dtype = np.result_type(np.min_scalar_type(int(lo)), np.min_scalar_type(int(hi)))
+    return dtype.name if dtype.kind in "iu" else None
+
+
+def plan_dtypes(
+    summary: Dict[str, Any],
+    downcast_floats: bool = False,
+    category_max: int = CATEGORY_MAX_DISTINCT,
+) -> Dict[str, Any]:
+    """요약의 컬럼 통계로 읽기 타입 계획을 만듭니다.
+
+    Returns:
+        {"dtype": {컬럼: dtype 이름}, "dates": [datetime으로 파싱할 컬럼]}
+        계획에 없는 컬럼은 pandas 기본 추론을 따릅니다.
+    """
+    dtype: Dict[str, str] = {}
+    dates: List[str] = []
+    for col in summary.get("columns", []):
+        name, kind, non_null = col["name"], col.get("type"), col.get("non_null", 0)
+        if kind == "numeric" and col.get("integer") is not None:
+            if col["integer"] and not col.get("missing"):
+                planned = _int_dtype(col["min"], col["max"])
+            elif col["integer"]:
+                planned = "float32" if max(abs(col["min"]), abs(col["max"])) < FLOAT32_EXACT_INT else None
+            else:
+                planned = "float32" if downcast_floats else None
+            if planned:
+                dtype[name] = planned
+        elif kind == "datetime":
+            dates.append(name)
+        elif kind == "boolean":
+            if not col.get("missing"):
+                dtype[name] = "bool"
+        elif (
+            kind == "text"
+            and col.get("distinct_exact", False)
+            and col.get("distinct", 0) <= min(category_max, CATEGORY_MAX_RATIO * non_null)
+        ):
+            dtype[name] = "category"
+    return {"dtype": dtype, "dates": dates}
+
+
+def read_dtype_options(meta: dict, columns: Optional[List[str]] = None, dates: bool = True) -> Dict[str, Any]:
+    """메타의 타입 계획을 `pd.read_csv` 인자(`dtype`, `parse_dates`)로 바꿉니다.
+
+    `columns`(usecols)를 주면 그 컬럼만 남깁니다. `dates=False`면 날짜 컬럼은 원문 문자열로 둡니다
+    (검색 문서처럼 원본 표기를 그대로 써야 하는 경우).
+    """
+    plan = meta.get("dtypes") or {}
+    keep = set(columns) if columns is not None else None
+    dtype = {c: t for c, t in (plan.get("dtype") or {}).items() if keep is None or c in keep}
+    options: Dict[str, Any] = {"dtype": dtype} if dtype else {}
+    parse = [c for c in plan.get("dates") or [] if keep is None or c in keep] if dates else []
+    if parse:
+        options.update(parse_dates=parse, date_format="ISO8601")
+    return options
+
+
+def apply_dtype_plan(df: pd.DataFrame, meta: dict, dates: bool = True) -> pd.DataFrame:
+    """이미 타입이 있는 프레임(Parquet/Arrow)에 타입 계획을 적용합니다.
+
+    파일에 기록된 타입이 계획보다 넓으면(int64 → uint8, 문자열 → category) 줄이고, 날짜 문자열은 파싱합니다.
+    파일이 이미 날짜/시각 타입이면 `dates=False`여도 그대로 둡니다.
+    """
+    plan = meta.get("dtypes") or {}
+    dtype = {
+        c: t
+        for c, t in (plan.get("dtype") or {}).items()
+        # 불리언은 이미 1바이트이므로 category로 바꾸지 않습니다.
+        if c in df.columns and str(df[c].dtype) != t and df[c].dtype != bool
+    }
+    if dtype:
+        df = df.astype(dtype)
+    if dates:
+        for c in plan.get("dates") or []:
+            if c in df.columns and df[c].dtype == object:
+                df[c] = pd.to_datetime(df[c], format="ISO8601")
+    return df
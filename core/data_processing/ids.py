@@ -5,8 +5,11 @@
 """
 
 import hashlib
+import re
 import time
 
+_DATASET_ID = re.compile(r"[0-9a-f]{16}")
+
 
 def gen_dataset_id(filename: str) -> str:
     """업로드 세션을 식별하는 16자리 16진수 ID를 생성합니다.
@@ -16,3 +19,8 @@ def gen_dataset_id(filename: str) -> str:
     """
     raw = f"{filename}-{time.time_ns()}".encode("utf-8")
     return hashlib.sha1(raw).hexdigest()[:16]
+
+
+def is_dataset_id(value: str) -> bool:
+    """`gen_dataset_id` 형식(16자리 소문자 16진수)인지 확인합니다. 경로를 만들기 전에 외부 입력 검증용."""
+    return bool(_DATASET_ID.fullmatch(value or ""))
@@ -1,13 +1,19 @@
 """샘플 로딩과 행수 집계를 위한 데이터 로딩 헬퍼.
 
 인터랙티브 세션에서 응답성과 메모리 사용을 고려해 제한된 범위만 읽습니다.
+CSV 계열은 `pd.read_csv`로, Parquet/Arrow IPC는 `columnar.py`의 메모리 맵 리더로 읽습니다.
 """
 
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Tuple
+from typing import Iterator, List, Optional, Tuple
 
 import pandas as pd
 
+from core.data_processing.columnar import as_text, count_rows, is_columnar, iter_columnar, read_columnar
+from core.data_processing.dtypes import apply_dtype_plan, read_dtype_options
+from core.metrics import span
+
 
 def count_rows_csv(path: Path, enc: str, sep: str | None) -> int:
     """전체 파일을 로드하지 않고 CSV 계열 파일의 총 행 수를 셉니다.
@@ -33,25 +39,109 @@ def sample_load(raw_path: Path, sniff_info: dict, sample_rows: int = 5000):
     """일부 행만 샘플링 로드하고 기본 통계를 계산합니다.
 
     반환값은 DataFrame 샘플과 추정 전체 형태(shape_total)를 담은 dict 입니다.
-    현재는 CSV 계열만 지원합니다.
+    Parquet/Arrow는 앞 `sample_rows`행만 읽고 전체 행 수는 파일 메타데이터에서 가져옵니다.
     """
     ftype = sniff_info["filetype"]
+    if is_columnar(sniff_info):
+        meta = {"raw_path": str(raw_path), "sniff": sniff_info}
+        with span("sample"):
+            df = read_columnar(meta, limit=sample_rows)
+        return df, {"shape_total": (count_rows(meta), int(len(df.columns)))}
     if ftype == "csv":
         enc = sniff_info["encoding"] or "utf-8"
         sep = sniff_info["delimiter"] or None
-        df = pd.read_csv(
-            raw_path,
-            sep=sep,
-            engine="python",
-            encoding=enc,
-            nrows=sample_rows,
-            on_bad_lines="skip",
-        )
+        with span("sample"):
+            df = pd.read_csv(
+                raw_path,
+                sep=sep,
+                engine="python",
+                encoding=enc,
+                nrows=sample_rows,
+                on_bad_lines="skip",
+            )
         try:
-            total_rows = count_rows_csv(raw_path, enc, sep)
+            with span("count_rows"):
+                total_rows = count_rows_csv(raw_path, enc, sep)
         except Exception:
             total_rows = len(df)
         shape_total: Tuple[int, int] = (int(total_rows), int(len(df.columns)))
         return df, {"shape_total": shape_total}
     else:
         raise ValueError(f"UNSUPPORTED_FILE_TYPE: {ftype}")
+
+
+def _read_options(meta: dict) -> dict:
+    """메타의 스니핑 정보로 `pd.read_csv` 공통 인자를 만듭니다."""
+    sniff = meta.get("sniff", {}) or {}
+    ftype = sniff.get("filetype") or "csv"
+    if ftype != "csv":
+        raise ValueError(f"UNSUPPORTED_FILE_TYPE: {ftype}")
+    sep = sniff.get("delimiter") or None
+    return {
+        "sep": sep,
+        "encoding": sniff.get("encoding") or "utf-8",
+        "engine": "c" if sep and len(sep) == 1 else "python",
+        "on_bad_lines": "skip",
+    }
+
+
+@contextmanager
+def _source(meta: dict, start_byte: int = 0):
+    """`pd.read_csv`에 넘길 원본과 추가 인자.
+
+    `start_byte > 0`이면 그 바이트 위치(행 경계)부터 읽습니다. 헤더가 없는 구간이므로 메타의 컬럼명을 씁니다.
+    """
+    path = Path(meta.get("raw_path", ""))
+    if not start_byte:
+        yield path, {}
+        return
+    with open(path, "rb") as f:
+        f.seek(start_byte)
+        yield f, {"header": None, "names": meta.get("columns")}
+
+
+def load_frame(
+    meta: dict,
+    columns: Optional[List[str]] = None,
+    nrows: Optional[int] = None,
+    start_byte: int = 0,
+    dates: bool = True,
+) -> pd.DataFrame:
+    """메타데이터(raw_path/sniff)를 바탕으로 데이터셋을 DataFrame으로 로드합니다.
+
+    `columns`를 주면 해당 컬럼만 파싱해 메모리와 시간을 줄이고, `nrows`로 상한을 둘 수 있습니다.
+    `start_byte`를 주면 그 위치부터(추가된 꼬리 구간만) 읽습니다.
+    도구(plot/query 등)가 같은 방식으로 원본을 읽도록 하는 공용 진입점입니다.
+    스니핑으로 구분자가 확정되어 있으면 빠른 C 파서를 사용하고, 메타에 타입 계획(`dtypes`)이 있으면
+    그 타입으로 읽습니다(`dates=False`면 날짜 컬럼은 문자열 유지).
+    """
+    if is_columnar(meta):
+        if start_byte:
+            raise ValueError("UNSUPPORTED_APPEND: 열 지향 파일은 바이트 위치부터 읽을 수 없습니다.")
+        return apply_dtype_plan(read_columnar(meta, columns, 0, nrows), meta, dates)
+    with _source(meta, start_byte) as (src, extra):
+        return pd.read_csv(
+            src, usecols=columns, nrows=nrows, **extra, **_read_options(meta), **read_dtype_options(meta, columns, dates)
+        )
+
+
+def iter_frames(
+    meta: dict, columns: Optional[List[str]] = None, chunksize: int = 100_000, dtype=None, start_byte: int = 0
+) -> Iterator[pd.DataFrame]:
+    """`load_frame`의 청크 버전. 전체 파일을 메모리에 올리지 않고 순차 처리할 때 사용합니다.
+
+    `dtype`을 주면(예: 요약 계산용 object) 타입 계획 대신 그 타입으로 읽습니다.
+    """
+    if is_columnar(meta):
+        if start_byte:
+            raise ValueError("UNSUPPORTED_APPEND: 열 지향 파일은 바이트 위치부터 읽을 수 없습니다.")
+        for frame in iter_columnar(meta, columns, chunksize):
+            if dtype is None:
+                yield apply_dtype_plan(frame, meta)
+            else:
+                # object 요청은 CSV를 문자열로 읽은 것과 같은 값(요약/표본의 기준)으로 맞춥니다.
+                yield as_text(frame) if dtype in (object, "object", str) else frame.astype(dtype)
+        return
+    typed = {"dtype": dtype} if dtype is not None else read_dtype_options(meta, columns)
+    with _source(meta, start_byte) as (src, extra):
+        yield from pd.read_csv(src, usecols=columns, chunksize=chunksize, **typed, **extra, **_read_options(meta))
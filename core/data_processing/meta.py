@@ -8,7 +8,12 @@ import json
 from pathlib import Path
 from typing import Tuple
 
-from config.paths import META_DIR
+from config.paths import META_DIR, UPLOAD_DIR
+
+
+def dataset_dir(dataset_id: str) -> Path:
+    """데이터셋 원본과 파생 산출물(캐시/색인 등)을 두는 디렉터리(`data/uploads/{dsid}`)."""
+    return UPLOAD_DIR / dataset_id
 
 
 def write_meta(dataset_id: str, meta: dict):
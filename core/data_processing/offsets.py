@@ -0,0 +1,182 @@
+"""CSV 원본의 희소 행 오프셋 색인과 임의 위치 페이지 읽기.
+
+N번째 레코드마다 시작 바이트 위치를 기록해 두면(`data/uploads/{dsid}/row_offsets.npz`), 원하는 행 번호의
+가장 가까운 앞 기록 지점으로 `seek`한 뒤 최대 N-1개 레코드만 건너뛰고 읽을 수 있습니다.
+파일 크기와 무관하게 페이지 한 번을 읽는 비용이 일정합니다.
+
+레코드 경계는 줄바꿈 기준이되, 따옴표로 감싼 필드 안의 줄바꿈은 따옴표 개수의 홀짝으로 추적해
+레코드를 나누지 않습니다(`""` 이스케이프는 짝수라 영향 없음). 빈 줄은 pandas와 같이 행으로 세지 않습니다.
+
+로더는 필드가 헤더보다 많은 행을 건너뛰므로(`on_bad_lines="skip"`), 구분자가 한 글자로 확정된 파일은
+따옴표 밖 구분자 수로 필드 수를 세어 그런 행을 행 번호에서 제외합니다. 그래서 미리보기의 행 번호와
+전체 행 수가 요약/도구가 읽는 DataFrame과 같습니다. 구분자가 확정되지 않은 파일(python 엔진 추정)은
+물리 레코드 위치를 그대로 씁니다.
+"""
+
+from typing import BinaryIO, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.data_processing.columnar import count_rows, is_columnar, read_columnar
+from core.data_processing.dtypes import apply_dtype_plan, read_dtype_options
+from core.data_processing.load import _read_options
+from core.data_processing.meta import dataset_dir
+from core.metrics import span
+
+OFFSETS_FILE = "row_offsets.npz"
+DEFAULT_STRIDE = 1000
+
+
+def _scan(
+    f: BinaryIO,
+    row: int,
+    stride: int,
+    offsets: List[int],
+    limit: Optional[int] = None,
+    shape: Tuple[Optional[bytes], Optional[int]] = (None, None),
+) -> int:
+    """현재 위치부터 레코드를 훑으며 `row % stride == 0`인 레코드의 시작 위치를 기록합니다.
+
+    `shape`(구분자, 최대 필드 수)가 있으면 필드가 더 많은 레코드는 행으로 세지 않습니다(로더가 건너뜀).
+    `limit`개 레코드를 지나면 멈춥니다. 마지막으로 센 행 번호 다음 값을 반환합니다.
+    """
+    delimiter, max_fields = shape
+    in_quote = False
+    record_start, fields = 0, 1
+    end = None if limit is None else row + limit
+    while end is None or row < end:
+        start = f.tell()
+        line = f.readline()
+        if not line:
+            break
+        if not in_quote:
+            if line in (b"\n", b"\r\n"):
+                continue
+            record_start, fields = start, 1
+        if delimiter is not None:
+            # 따옴표로 나눈 조각은 따옴표 밖/안이 번갈아 나옵니다.
+            parts = line.split(b'"')
+            fields += sum(part.count(delimiter) for part in parts[1 if in_quote else 0 :: 2])
+        if line.count(b'"') % 2:
+            in_quote = not in_quote
+        if not in_quote and (max_fields is None or fields <= max_fields):
+            if row % stride == 0:
+                offsets.append(record_start)
+            row += 1
+    return row
+
+
+def _skip(f: BinaryIO, records: int, shape: Tuple[Optional[bytes], Optional[int]] = (None, None)):
+    """레코드 `records`개를 건너뜁니다(헤더 건너뛰기, 페이지 시작까지 이동)."""
+    if records > 0:
+        _scan(f, 0, 1 << 62, [], limit=records, shape=shape)
+
+
+def _record_shape(meta: dict) -> Tuple[Optional[bytes], Optional[int]]:
+    """(구분자 바이트, 헤더 필드 수). 구분자가 한 글자로 확정되지 않았으면 (None, None)."""
+    sniff = meta.get("sniff") or {}
+    sep = sniff.get("delimiter")
+    columns = meta.get("columns")
+    if not sep or len(sep) != 1 or not columns:
+        return None, None
+    try:
+        return sep.encode(sniff.get("encoding") or "utf-8"), len(columns)
+    except (LookupError, UnicodeEncodeError):
+        return None, None
+
+
+def build_row_index(dataset_id: str, meta: dict, stride: int = DEFAULT_STRIDE) -> dict | None:
+    """원본 전체를 한 번 훑어 행 오프셋 색인을 만들고 저장합니다.
+
+    Parquet/Arrow는 row group/배치 단위로 바로 접근하므로 색인을 만들지 않고 None을 반환합니다.
+
+    Returns:
+        {"stride", "rows", "offsets": np.ndarray(int64), "size_bytes"}
+    """
+    if is_columnar(meta):
+        return None
+    with span("row_index_build"):
+        offsets: List[int] = []
+        with open(meta["raw_path"], "rb") as f:
+            _skip(f, 1)
+            rows = _scan(f, 0, stride, offsets, shape=_record_shape(meta))
+            size = f.tell()
+        index = {"stride": stride, "rows": rows, "offsets": np.asarray(offsets, dtype=np.int64), "size_bytes": size}
+        write_row_index(dataset_id, index)
+    return index
+
+
+def extend_row_index(dataset_id: str, meta: dict, start_byte: int, stride: int = DEFAULT_STRIDE) -> dict:
+    """추가 업로드로 이어 붙은 꼬리 구간(`start_byte` 이후)만 훑어 색인을 이어 갑니다.
+
+    저장된 색인이 없거나 `start_byte`가 색인이 끝난 위치와 다르면 전체를 다시 만듭니다.
+    """
+    index = read_row_index(dataset_id)
+    if index is None or index["size_bytes"] != start_byte:
+        return build_row_index(dataset_id, meta, stride)
+    with span("row_index_append"):
+        offsets = list(index["offsets"])
+        with open(meta["raw_path"], "rb") as f:
+            f.seek(start_byte)
+            rows = _scan(f, index["rows"], index["stride"], offsets, shape=_record_shape(meta))
+            size = f.tell()
+        index = {**index, "rows": rows, "offsets": np.asarray(offsets, dtype=np.int64), "size_bytes": size}
+        write_row_index(dataset_id, index)
+    return index
+
+
+def write_row_index(dataset_id: str, index: dict):
+    p = dataset_dir(dataset_id) / OFFSETS_FILE
+    p.parent.mkdir(parents=True, exist_ok=True)
+    np.savez(p, stride=index["stride"], rows=index["rows"], offsets=index["offsets"], size_bytes=index["size_bytes"])
+
+
+def read_row_index(dataset_id: str) -> dict | None:
+    """저장된 행 오프셋 색인을 읽습니다. 없으면 None."""
+    p = dataset_dir(dataset_id) / OFFSETS_FILE
+    if not p.exists():
+        return None
+    with np.load(p) as data:
+        return {
+            "stride": int(data["stride"]),
+            "rows": int(data["rows"]),
+            "offsets": data["offsets"],
+            "size_bytes": int(data["size_bytes"]),
+        }
+
+
+def read_rows(
+    meta: dict, index: Optional[dict], offset: int, limit: int, columns: Optional[List[str]] = None
+) -> Tuple[pd.DataFrame, int]:
+    """`offset`번째 데이터 행부터 최대 `limit`행을 읽습니다.
+
+    가장 가까운 앞 기록 지점으로 이동해 최대 `stride - 1`개 레코드만 건너뜁니다.
+    Parquet/Arrow는 행 오프셋 색인 없이(`index=None`) 해당 row group/구간만 메모리 맵으로 읽습니다.
+
+    Returns:
+        (DataFrame, 전체 행 수)
+    """
+    if is_columnar(meta):
+        with span("row_page_read"):
+            df = read_columnar(meta, columns, offset, max(0, limit))
+        return apply_dtype_plan(df, meta), count_rows(meta)
+    total = index["rows"]
+    names = meta.get("columns")
+    if offset >= total or limit <= 0:
+        return pd.DataFrame(columns=columns or names), total
+    block, skip = divmod(offset, index["stride"])
+    with span("row_page_read"):
+        with open(meta["raw_path"], "rb") as f:
+            f.seek(int(index["offsets"][block]))
+            _skip(f, skip, _record_shape(meta))
+            df = pd.read_csv(
+                f,
+                header=None,
+                names=names,
+                usecols=columns,
+                nrows=limit,
+                **_read_options(meta),
+                **read_dtype_options(meta, columns),
+            )
+    return df, total
@@ -0,0 +1,176 @@
+"""전체 데이터셋에 대한 정확한 필터/그룹/집계/상위 N 질의 엔진.
+
+에이전트가 임베딩 검색(top-k 행)으로 통계를 추정하는 대신, pandas 벡터 연산으로
+필요한 컬럼만 읽어 정확한 값을 계산합니다. 질의 명세(spec)는 JSON 직렬화 가능한 dict로,
+결과 캐시 키로도 사용됩니다.
+
+spec 형식:
+    {
+        "filters": [{"column": "country", "op": "==", "value": "KR"}, ...],
+        "group_by": ["region"],
+        "metrics": ["sales:mean", "count"],      # "<컬럼>:<집계>" 또는 "count"(행 수)
+        "columns": ["id", "sales"],               # group_by/metrics 없이 행을 조회할 때 표시 컬럼
+        "sort_by": "sales_mean", "ascending": false, "top_n": 20
+    }
+"""
+
+import json
+import operator
+from typing import Any, Dict, List, Optional, Set
+
+import pandas as pd
+
+AGG_FUNCS = {"count", "sum", "mean", "min", "max", "median", "nunique", "std"}
+FILTER_OPS = {"==", "!=", ">", ">=", "<", "<=", "in", "not_in", "contains", "isnull", "notnull"}
+MAX_TOP_N = 500
+# 비교 연산은 요청된 것 하나만 계산합니다.
+_COMPARE = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+}
+
+
+def normalize_spec(
+    filters: Optional[List[Dict[str, Any]]] = None,
+    group_by: Optional[List[str]] = None,
+    metrics: Optional[List[str]] = None,
+    columns: Optional[List[str]] = None,
+    sort_by: Optional[str] = None,
+    ascending: bool = False,
+    top_n: int = 20,
+) -> Dict[str, Any]:
+    """질의 인자를 검증해 정규화된 spec(dict)으로 만듭니다. 잘못된 인자는 ValueError."""
+    parsed_metrics = []
+    for m in metrics or []:
+        col, _, agg = str(m).partition(":")
+        if not agg:
+            col, agg = ("", "count") if col == "count" else (col, "")
+        agg = agg.lower()
+        if agg not in AGG_FUNCS:
+            raise ValueError(f"UNKNOWN_AGG: {m} (지원: {', '.join(sorted(AGG_FUNCS))})")
+        parsed_metrics.append(f"{col}:{agg}" if col else "count")
+
+    for f in filters or []:
+        if "column" not in f or f.get("op", "==") not in FILTER_OPS:
+            raise ValueError(f"INVALID_FILTER: {f} (op 지원: {', '.join(sorted(FILTER_OPS))})")
+
+    return {
+        "filters": [{"column": f["column"], "op": f.get("op", "=="), "value": f.get("value")} for f in filters or []],
+        "group_by": list(group_by or []),
+        "metrics": parsed_metrics,
+        "columns": list(columns or []),
+        "sort_by": sort_by,
+        "ascending": bool(ascending),
+        "top_n": max(1, min(int(top_n), MAX_TOP_N)),
+    }
+
+
+def required_columns(spec: Dict[str, Any]) -> Set[str]:
+    """질의에 필요한 컬럼 집합(컬럼 단위 로딩용)."""
+    cols = {f["column"] for f in spec["filters"]} | set(spec["group_by"]) | set(spec["columns"])
+    cols |= {m.split(":", 1)[0] for m in spec["metrics"] if m != "count"}
+    if spec["sort_by"] and not (spec["metrics"] or spec["group_by"]):
+        cols.add(spec["sort_by"])
+    return cols
+
+
+def _is_boolean(series: pd.Series) -> bool:
+    """bool 타입이거나, 결측 때문에 객체/범주로 읽힌 True/False 컬럼인지."""
+    if pd.api.types.is_bool_dtype(series):
+        return True
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return pd.api.types.infer_dtype(series.cat.categories, skipna=True) == "boolean"
+    return series.dtype == object and pd.api.types.infer_dtype(series, skipna=True) == "boolean"
+
+
+def _coerce(series: pd.Series, value: Any) -> Any:
+    """수치 컬럼과 비교할 때 문자열 값을 숫자로, 불리언 컬럼과 비교할 때 "true"/"false"를 불리언으로 변환합니다."""
+    if isinstance(value, str) and value.strip().lower() in ("true", "false") and _is_boolean(series):
+        return value.strip().lower() == "true"
+    if pd.api.types.is_numeric_dtype(series) and isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return value
+    return value
+
+
+def filter_mask(df: pd.DataFrame, filters: List[Dict[str, Any]]) -> pd.Series:
+    """필터 목록을 AND로 결합한 불리언 마스크."""
+    mask = pd.Series(True, index=df.index)
+    for f in filters:
+        s, op, value = df[f["column"]], f["op"], f["value"]
+        if op in ("in", "not_in"):
+            values = value if isinstance(value, list) else [value]
+            cond = s.isin([_coerce(s, v) for v in values])
+            mask &= ~cond if op == "not_in" else cond
+        elif op == "contains":
+            mask &= s.astype(str).str.contains(str(value), case=False, na=False, regex=False)
+        elif op == "isnull":
+            mask &= s.isna()
+        elif op == "notnull":
+            mask &= s.notna()
+        else:
+            if isinstance(s.dtype, pd.CategoricalDtype) and op not in ("==", "!="):
+                s = s.astype(object)
+            mask &= _COMPARE[op](s, _coerce(s, value))
+    return mask
+
+
+def apply_filters(df: pd.DataFrame, filters: List[Dict[str, Any]]) -> pd.DataFrame:
+    """필터 목록을 AND로 결합해 불리언 마스크 한 번으로 적용합니다."""
+    if not filters:
+        return df
+    return df[filter_mask(df, filters)]
+
+
+def run_query(df: pd.DataFrame, spec: Dict[str, Any]) -> Dict[str, Any]:
+    """정규화된 spec을 DataFrame에 적용하고 JSON 직렬화 가능한 결과를 반환합니다.
+
+    Returns:
+        {"columns": [...], "rows": [[...]], "matched_rows": 필터 후 행 수,
+         "result_rows": 반환 행 수, "truncated": top_n으로 잘렸는지 여부}
+    """
+    missing = required_columns(spec) - set(df.columns)
+    if missing:
+        raise ValueError(f"UNKNOWN_COLUMN: {', '.join(sorted(missing))}")
+
+    filtered = apply_filters(df, spec["filters"])
+    metrics = spec["metrics"] or (["count"] if spec["group_by"] else [])
+
+    if metrics:
+        group_by = spec["group_by"]
+        grouped = filtered.groupby(group_by, dropna=False, observed=True) if group_by else None
+        parts: Dict[str, Any] = {}
+        for m in metrics:
+            if m == "count":
+                parts["count"] = grouped.size() if grouped is not None else len(filtered)
+            else:
+                col, agg = m.split(":", 1)
+                parts[f"{col}_{agg}"] = grouped[col].agg(agg) if grouped is not None else filtered[col].agg(agg)
+        result = pd.DataFrame(parts).reset_index() if grouped is not None else pd.DataFrame([parts])
+    else:
+        result = filtered
+
+    sort_by = spec["sort_by"]
+    if sort_by:
+        if sort_by not in result.columns:
+            raise ValueError(f"UNKNOWN_SORT_COLUMN: {sort_by} (가능: {', '.join(map(str, result.columns))})")
+        result = result.sort_values(sort_by, ascending=spec["ascending"], kind="stable")
+    if not metrics and spec["columns"]:
+        result = result[spec["columns"]]
+
+    total = len(result)
+    result = result.head(spec["top_n"])
+    payload = json.loads(result.to_json(orient="split", index=False, date_format="iso", force_ascii=False))
+    return {
+        "columns": payload["columns"],
+        "rows": payload["data"],
+        "matched_rows": int(len(filtered)),
+        "result_rows": int(len(result)),
+        "truncated": total > len(result),
+    }
@@ -0,0 +1,168 @@
+"""균등 무작위 표본 계층(sample tiers)의 생성·확장·선택.
+
+앞부분 N행은 정렬된 내보내기 파일에서 크게 치우치므로, 원본을 한 번 훑으며 행마다 균등 난수 키를 붙이고
+키가 가장 작은 `max(tiers)`개만 남깁니다(bottom-k 저수지 표본). 남은 행을 키 순서로 저장하면
+앞에서부터 n행이 곧 크기 n의 균등 무작위 표본이므로, 계층(예: 1천/1만/10만/100만 행)마다 파일을 따로 두지
+않고 `nrows=n`으로 읽기만 하면 됩니다.
+
+- `data/uploads/{dsid}/sample.csv`: 키 순서로 정렬된 표본 행(모든 값은 원본 문자열 그대로)
+- `data/uploads/{dsid}/sample.npz`: 정렬된 키, 계층 목록, 원본 전체 행 수
+
+추가 업로드는 꼬리 행에만 새 키를 뽑아 저장된 표본과 합치면 전체에 대한 균등 표본이 유지됩니다.
+도구는 `choose_tier`로 정확도 목표(95% 신뢰 수준의 비율 오차 한계)를 만족하는 가장 작은 계층을 고릅니다.
+"""
+
+import hashlib
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.data_processing.dtypes import read_dtype_options
+from core.data_processing.load import iter_frames
+from core.data_processing.meta import dataset_dir
+from core.metrics import span
+
+SAMPLE_FILE = "sample.csv"
+SAMPLE_KEYS_FILE = "sample.npz"
+DEFAULT_TIERS = (1_000, 10_000, 100_000, 1_000_000)
+Z_95 = 1.96
+
+
+def _rng(dataset_id: str, start_row: int) -> np.random.Generator:
+    """데이터셋/구간마다 고정된 난수열(같은 업로드는 같은 표본)."""
+    seed = int(hashlib.md5(dataset_id.encode("utf-8")).hexdigest()[:8], 16)
+    return np.random.default_rng([seed, start_row])
+
+
+def _reservoir(frames, rng: np.random.Generator, size: int, kept: Optional[pd.DataFrame] = None, keys: Optional[np.ndarray] = None):
+    """청크를 한 번씩 훑으며 키가 가장 작은 `size`개 행을 유지합니다. (행, 키, 훑은 행 수)를 반환합니다."""
+    keys = np.empty(0) if keys is None else keys
+    rows = 0
+    for chunk in frames:
+        chunk_keys = rng.random(len(chunk))
+        rows += len(chunk)
+        if len(keys) >= size:
+            # 저수지가 찼으면 현재 최대 키보다 작은 행만 후보가 됩니다(대부분의 청크는 거의 전부 걸러짐).
+            hit = chunk_keys < keys.max()
+            chunk, chunk_keys = chunk[hit], chunk_keys[hit]
+        if not len(chunk):
+            continue
+        kept = chunk if kept is None else pd.concat([kept, chunk], ignore_index=True)
+        keys = np.concatenate([keys, chunk_keys])
+        if len(keys) > size:
+            top = np.argpartition(keys, size - 1)[:size]
+            kept, keys = kept.iloc[top].reset_index(drop=True), keys[top]
+    return kept, keys, rows
+
+
+def _save(dataset_id: str, kept: Optional[pd.DataFrame], keys: np.ndarray, tiers: Sequence[int], total: int, columns: List[str]) -> dict:
+    order = np.argsort(keys, kind="stable")
+    kept = pd.DataFrame(columns=columns) if kept is None else kept.iloc[order]
+    d = dataset_dir(dataset_id)
+    d.mkdir(parents=True, exist_ok=True)
+    kept.to_csv(d / SAMPLE_FILE, index=False)
+    info = {"tiers": sorted({min(int(t), total) for t in tiers if t > 0}), "total_rows": total, "keys": keys[order]}
+    np.savez(d / SAMPLE_KEYS_FILE, tiers=np.asarray(info["tiers"], dtype=np.int64), total_rows=total, keys=info["keys"])
+    return info
+
+
+def build_samples(dataset_id: str, meta: dict, tiers: Sequence[int] = DEFAULT_TIERS) -> dict:
+    """원본 전체를 한 번 훑어 균등 표본을 만들고 저장합니다.
+
+    Returns:
+        {"tiers": [실제 계층 크기(전체 행 수로 상한)], "total_rows", "keys"}
+    """
+    with span("sample_build"):
+        kept, keys, rows = _reservoir(iter_frames(meta, dtype=object), _rng(dataset_id, 0), max(tiers))
+        return _save(dataset_id, kept, keys, tiers, rows, meta.get("columns", []))
+
+
+def extend_samples(dataset_id: str, meta: dict, start_byte: int, start_row: int, tiers: Sequence[int] = DEFAULT_TIERS) -> dict:
+    """추가 업로드의 꼬리 구간(`start_byte` 이후, 원본 행 번호 `start_row`부터)만 훑어 표본에 합칩니다.
+
+    저장된 표본이 없으면 전체를 다시 만듭니다.
+    """
+    info = read_sample_info(dataset_id)
+    if info is None:
+        return build_samples(dataset_id, meta, tiers)
+    with span("sample_append"):
+        kept = pd.read_csv(dataset_dir(dataset_id) / SAMPLE_FILE, dtype=object)
+        frames = iter_frames(meta, dtype=object, start_byte=start_byte)
+        kept, keys, rows = _reservoir(frames, _rng(dataset_id, start_row), max(tiers), kept, info["keys"])
+        return _save(dataset_id, kept, keys, tiers, info["total_rows"] + rows, meta.get("columns", []))
+
+
+def read_sample_info(dataset_id: str) -> dict | None:
+    """저장된 표본 정보를 읽습니다. 없으면 None."""
+    p = dataset_dir(dataset_id) / SAMPLE_KEYS_FILE
+    if not p.exists():
+        return None
+    with np.load(p) as data:
+        return {"tiers": data["tiers"].tolist(), "total_rows": int(data["total_rows"]), "keys": data["keys"]}
+
+
+def margin_of_error(n: int, total: int) -> float:
+    """크기 n 균등 표본으로 추정한 비율의 95% 오차 한계(최악 p=0.5, 유한 모집단 보정). n >= total이면 0."""
+    if n <= 0:
+        return 1.0
+    if n >= total:
+        return 0.0
+    return Z_95 * math.sqrt(0.25 / n) * math.sqrt((total - n) / max(1, total - 1))
+
+
+def choose_tier(info: dict, max_error: float, max_rows: Optional[int] = None) -> int:
+    """오차 한계가 `max_error` 이하인 가장 작은 계층을 고릅니다.
+
+    `max_rows`를 넘는 계층은 제외하며, 목표를 만족하는 계층이 없으면 허용된 가장 큰 계층을 반환합니다.
+    """
+    tiers = [t for t in info["tiers"] if max_rows is None or t <= max_rows] or info["tiers"][:1]
+    for tier in tiers:
+        if margin_of_error(tier, info["total_rows"]) <= max_error:
+            return tier
+    return tiers[-1] if tiers else 0
+
+
+def load_sample(
+    dataset_id: str,
+    meta: dict,
+    max_error: float,
+    columns: Optional[List[str]] = None,
+    max_rows: Optional[int] = None,
+    tiers: Sequence[int] = DEFAULT_TIERS,
+) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """정확도 목표에 맞는 표본 계층을 읽습니다. 표본이 없으면(이전 업로드) 먼저 만듭니다.
+
+    Returns:
+        (DataFrame, {"sample_rows", "total_rows", "margin_of_error", "exact"})
+    """
+    info = read_sample_info(dataset_id) or build_samples(dataset_id, meta, tiers)
+    tier = choose_tier(info, max_error, max_rows)
+    with span("sample_read"):
+        path = dataset_dir(dataset_id) / SAMPLE_FILE
+        df = pd.read_csv(path, usecols=columns, nrows=tier, **read_dtype_options(meta, columns))
+    total = info["total_rows"]
+    return df, {
+        "sample_rows": int(len(df)),
+        "total_rows": total,
+        "margin_of_error": round(margin_of_error(len(df), total), 4),
+        "exact": len(df) >= total,
+    }
+
+
+def scale_estimates(result: Dict[str, Any], factor: float) -> Dict[str, Any]:
+    """표본에서 계산한 `run_query` 결과의 건수/합계를 전체 규모로 환산합니다.
+
+    `count`와 `*_sum` 컬럼, `matched_rows`만 `factor`(전체 행 수 / 표본 행 수)배 합니다.
+    평균/중앙값/표준편차는 그대로 추정치이고, 최솟값/최댓값/고유값 수는 표본 기준 값입니다.
+    """
+    scaled = [i for i, c in enumerate(result["columns"]) if c == "count" or str(c).endswith("_sum")]
+
+    def scale(v):
+        if isinstance(v, bool) or not isinstance(v, (int, float)):
+            return v
+        return int(round(v * factor)) if isinstance(v, int) else v * factor
+
+    rows = [[scale(v) if i in scaled else v for i, v in enumerate(row)] for row in result["rows"]]
+    return {**result, "rows": rows, "matched_rows": int(round(result["matched_rows"] * factor))}
@@ -2,13 +2,16 @@
 
 목표는 큰 파일에서도 안정적으로 샘플을 읽을 수 있는 최소한의 힌트를 얻는 것입니다.
 보수적으로 동작하며 합리적인 폴백을 적용합니다.
+Parquet/Arrow IPC는 추정 대신 파일 메타데이터(스키마/행 수)를 읽습니다(`columnar.py`).
 """
 
 from pathlib import Path
 import csv
 import chardet
 
-SUPPORTED = {"csv", "tsv", "txt"}
+from core.data_processing.columnar import COLUMNAR_EXTS, sniff_columnar
+
+SUPPORTED = {"csv", "tsv", "txt", *COLUMNAR_EXTS}
 
 
 def detect_encoding(path: Path, max_bytes: int = 200_000) -> str:
@@ -40,10 +43,13 @@ def sniff_file(raw_path: Path, ext: str):
     """파일 확장자와 내용 일부를 바탕으로 로더 힌트를 생성합니다.
 
     반환값은 하위 로더들이 사용하는 형태(dict)로, filetype/encoding/delimiter/ext를 포함합니다.
+    열 지향 형식은 `rows`(전체 행 수)와 `schema`(컬럼 → Arrow 타입)를 더합니다.
     """
     ext = (ext or "").lower()
     if ext not in SUPPORTED:
         raise ValueError(f"UNSUPPORTED_FILE_TYPE: .{ext}")
+    if ext in COLUMNAR_EXTS:
+        return sniff_columnar(raw_path, ext)
 
     info = {"filetype": None, "encoding": None, "delimiter": None, "ext": ext}
     if ext in ("csv", "tsv", "txt"):
@@ -0,0 +1,284 @@
+"""업로드 시점에 미리 계산해 두는 데이터셋 요약.
+
+컬럼별 타입, 범위(min/max), 평균/표준편차, 카디널리티, 상위 값, 결측률을 전체 파일을
+청크 단위로 한 번만 훑어 계산하고 `data/uploads/{dsid}/summary.json`에 저장합니다.
+"이 파일 요약해줘" 같은 개요 질문은 행 검색 없이 이 요약만으로 답할 수 있습니다.
+
+컬럼 통계(`ColumnStats`)는 청크마다 `update`하고 `merge`로 합칠 수 있는 형태(건수/평균/편차 제곱합(M2)/
+최솟값/최댓값/값 빈도)로 유지합니다. 분산은 제곱합에서 평균의 제곱을 빼면 큰 값(예: epoch ms)에서
+자릿수가 상쇄되므로, 청크 안에서는 평균 기준 편차로 M2를 구하고 청크끼리는 Chan의 병합식으로 합칩니다.
+"""
+
+import json
+import math
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from core.context import estimate_tokens, truncate_to_tokens
+from core.data_processing.load import iter_frames
+from core.data_processing.meta import dataset_dir
+from core.metrics import span
+
+SUMMARY_FILE = "summary.json"
+# 추가(append) 업로드 때 꼬리 구간만 합칠 수 있도록 병합 가능한 누적 통계도 함께 저장합니다.
+STATS_FILE = "stats.json"
+TOP_K = 5
+# 값 빈도는 이 개수까지만 정확히 추적하고, 넘으면 빈도 상위 값만 남깁니다(카디널리티는 하한으로 표시).
+DISTINCT_CAP = 10_000
+# 숫자로 해석되는 비율이 이 값 이상이면 수치 컬럼으로 봅니다.
+NUMERIC_RATIO = 0.95
+# 정수 표기, ISO 날짜/시각 표기(읽기 타입 계획용, `core.data_processing.dtypes`)
+INTEGER_PATTERN = r"[+-]?\d+"
+DATE_PATTERN = r"\d{4}-\d{2}-\d{2}(?:[ T]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?)?"
+# pandas `read_csv`가 불리언으로 읽는 표기(기본 true_values/false_values)
+BOOLEAN_PATTERN = r"True|TRUE|true|False|FALSE|false"
+
+
+class ColumnStats:
+    """한 컬럼의 병합 가능한 누적 통계."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.count = 0
+        self.nulls = 0
+        self.numeric = 0
+        self.integers = 0
+        self.dates = 0
+        self.booleans = 0
+        # 수치 값(self.numeric개)의 평균과 평균 기준 편차 제곱합(Welford/Chan)
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.text_min: Optional[str] = None
+        self.text_max: Optional[str] = None
+        self.values: Counter = Counter()
+        self.overflow = False
+
+    def update(self, series: pd.Series):
+        """문자열(object)로 읽은 청크 한 개를 누적합니다."""
+        self.count += len(series)
+        non_null = series.dropna()
+        self.nulls += len(series) - len(non_null)
+        if non_null.empty:
+            return
+
+        nums = pd.to_numeric(non_null, errors="coerce").dropna()
+        text = non_null.astype(str)
+        if not nums.empty:
+            self.integers += int(text.loc[nums.index].str.fullmatch(INTEGER_PATTERN).sum())
+            values = nums.astype(float)
+            chunk_mean = float(values.mean())
+            self._merge_moments(len(values), chunk_mean, float(((values - chunk_mean) ** 2).sum()))
+            lo, hi = float(nums.min()), float(nums.max())
+            self.min = lo if self.min is None else min(self.min, lo)
+            self.max = hi if self.max is None else max(self.max, hi)
+        if len(nums) < len(text):
+            self.dates += int(text.str.fullmatch(DATE_PATTERN).sum())
+            self.booleans += int(text.str.fullmatch(BOOLEAN_PATTERN).sum())
+
+        lo, hi = text.min(), text.max()
+        self.text_min = lo if self.text_min is None else min(self.text_min, lo)
+        self.text_max = hi if self.text_max is None else max(self.text_max, hi)
+        self._add_counts(Counter({k: int(v) for k, v in text.value_counts().items()}))
+
+    def _merge_moments(self, n: int, mean: float, m2: float):
+        """(건수, 평균, M2) 묶음을 합칩니다(Chan et al.). `self.numeric`도 함께 늘립니다."""
+        if n <= 0:
+            return
+        total = self.numeric + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.numeric * n / total
+        self.numeric = total
+
+    def merge(self, other: "ColumnStats") -> "ColumnStats":
+        """다른 청크/구간의 통계를 합칩니다(자기 자신을 갱신해 반환)."""
+        self.count += other.count
+        self.nulls += other.nulls
+        self._merge_moments(other.numeric, other.mean, other.m2)
+        self.integers += other.integers
+        self.dates += other.dates
+        self.booleans += other.booleans
+        for attr, pick in (("min", min), ("max", max), ("text_min", min), ("text_max", max)):
+            a, b = getattr(self, attr), getattr(other, attr)
+            setattr(self, attr, b if a is None else a if b is None else pick(a, b))
+        self.overflow = self.overflow or other.overflow
+        self._add_counts(other.values)
+        return self
+
+    def to_state(self) -> Dict[str, Any]:
+        """병합 가능한 상태 전체(JSON 직렬화 가능)."""
+        state = dict(vars(self))
+        state["values"] = dict(self.values)
+        return state
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "ColumnStats":
+        state = dict(state)
+        if "sum" in state:
+            # 이전 형식(합/제곱합)으로 저장된 누적 통계
+            n, total, total_sq = state.get("numeric", 0), state.pop("sum"), state.pop("sum_sq", 0.0)
+            state["mean"] = total / n if n else 0.0
+            state["m2"] = max(0.0, total_sq - n * state["mean"] ** 2)
+        stats = cls(state["name"])
+        vars(stats).update(state)
+        stats.values = Counter(state.get("values", {}))
+        return stats
+
+    def _add_counts(self, counts: Counter):
+        self.values.update(counts)
+        if len(self.values) > DISTINCT_CAP:
+            self.values = Counter(dict(self.values.most_common(DISTINCT_CAP)))
+            self.overflow = True
+
+    def to_dict(self) -> Dict[str, Any]:
+        non_null = self.count - self.nulls
+        is_numeric = non_null > 0 and self.numeric >= NUMERIC_RATIO * non_null
+        if non_null == 0:
+            kind = "empty"
+        elif is_numeric:
+            kind = "numeric"
+        elif self.dates == non_null:
+            kind = "datetime"
+        else:
+            kind = "boolean" if self.booleans == non_null else "text"
+        info: Dict[str, Any] = {
+            "name": self.name,
+            "type": kind,
+            "non_null": non_null,
+            "missing": self.nulls,
+            "missing_ratio": round(self.nulls / self.count, 4) if self.count else 0.0,
+            "distinct": len(self.values),
+            "distinct_exact": not self.overflow,
+            # 모든 값이 한 번씩만 나오는 ID성 컬럼은 상위 값이 의미가 없으므로 2회 이상 나온 값만 둡니다.
+            "top": [[value, count] for value, count in self.values.most_common(TOP_K) if count > 1],
+        }
+        if is_numeric and self.numeric:
+            var = max(0.0, self.m2 / self.numeric)
+            info.update(min=self.min, max=self.max, mean=round(self.mean, 6), std=round(math.sqrt(var), 6))
+            # 모든 값이 숫자이고 정수 표기일 때만 true(정수 타입으로 읽어도 안전)
+            info["integer"] = self.numeric == non_null and self.integers == self.numeric
+        elif non_null:
+            info.update(min=self.text_min, max=self.text_max)
+        return info
+
+
+def summarize_frames(frames: Iterable[pd.DataFrame]) -> Dict[str, ColumnStats]:
+    """DataFrame 청크들을 훑어 컬럼별 누적 통계를 만듭니다(컬럼 순서 유지)."""
+    stats: Dict[str, ColumnStats] = {}
+    for frame in frames:
+        for col in frame.columns:
+            stats.setdefault(str(col), ColumnStats(str(col))).update(frame[col])
+    return stats
+
+
+def finalize_summary(stats: Dict[str, ColumnStats], dataset_id: Optional[str] = None) -> Dict[str, Any]:
+    """누적 통계를 JSON 직렬화 가능한 요약 dict로 변환합니다."""
+    columns = [s.to_dict() for s in stats.values()]
+    return {
+        "dataset_id": dataset_id,
+        "rows": max((s.count for s in stats.values()), default=0),
+        "columns": columns,
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    }
+
+
+def build_summary(dataset_id: str, meta: dict) -> Dict[str, Any]:
+    """원본 전체를 한 번 훑어 요약을 계산하고 `summary.json`으로 저장한 뒤 반환합니다."""
+    with span("summary_build"):
+        stats = summarize_frames(iter_frames(meta, dtype=object))
+        summary = finalize_summary(stats, dataset_id)
+        write_summary(dataset_id, summary)
+        write_stats(dataset_id, stats)
+    return summary
+
+
+def append_summary(dataset_id: str, meta: dict, start_byte: int) -> Dict[str, Any]:
+    """`start_byte` 이후에 추가된 꼬리 구간만 훑어 저장된 누적 통계에 합치고 요약을 갱신합니다.
+
+    누적 통계가 없으면(이전 버전에서 만든 데이터셋) 전체를 다시 계산합니다.
+    """
+    stats = read_stats(dataset_id)
+    if stats is None:
+        return build_summary(dataset_id, meta)
+    with span("summary_append"):
+        tail = summarize_frames(iter_frames(meta, dtype=object, start_byte=start_byte))
+        for name, column in tail.items():
+            stats[name] = stats[name].merge(column) if name in stats else column
+        summary = finalize_summary(stats, dataset_id)
+        write_summary(dataset_id, summary)
+        write_stats(dataset_id, stats)
+    return summary
+
+
+def write_stats(dataset_id: str, stats: Dict[str, ColumnStats]):
+    p = dataset_dir(dataset_id) / STATS_FILE
+    p.parent.mkdir(parents=True, exist_ok=True)
+    with open(p, "w", encoding="utf-8") as f:
+        json.dump([column.to_state() for column in stats.values()], f, ensure_ascii=False)
+
+
+def read_stats(dataset_id: str) -> Dict[str, ColumnStats] | None:
+    """저장된 누적 통계를 읽습니다. 없으면 None."""
+    p = dataset_dir(dataset_id) / STATS_FILE
+    if not p.exists():
+        return None
+    with open(p, "r", encoding="utf-8") as f:
+        return {state["name"]: ColumnStats.from_state(state) for state in json.load(f)}
+
+
+def write_summary(dataset_id: str, summary: Dict[str, Any]):
+    p = dataset_dir(dataset_id) / SUMMARY_FILE
+    p.parent.mkdir(parents=True, exist_ok=True)
+    with open(p, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+
+
+def read_summary(dataset_id: str) -> Dict[str, Any] | None:
+    """저장된 요약을 읽습니다. 없으면 None."""
+    p = dataset_dir(dataset_id) / SUMMARY_FILE
+    if not p.exists():
+        return None
+    with open(p, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _fmt(value: Any) -> str:
+    if isinstance(value, float):
+        return f"{value:.6g}"
+    return str(value)
+
+
+def format_column(col: Dict[str, Any], top_n: int = 3) -> str:
+    """컬럼 요약 한 개를 한 줄 텍스트로 변환합니다."""
+    parts = [f"{col['name']} [{col['type']}]", f"결측 {col['missing_ratio'] * 100:.1f}%"]
+    distinct = f"{col['distinct']}" + ("" if col.get("distinct_exact", True) else "+")
+    parts.append(f"고유값 {distinct}")
+    if col["type"] == "numeric":
+        parts.append(f"범위 {_fmt(col['min'])}~{_fmt(col['max'])}, 평균 {_fmt(col['mean'])}, 표준편차 {_fmt(col['std'])}")
+    elif col.get("top"):
+        top = ", ".join(f"{truncate_to_tokens(str(v), 12, suffix='…')}({c})" for v, c in col["top"][:top_n])
+        parts.append(f"상위 {top}")
+    return ", ".join(parts)
+
+
+def format_summary(summary: Dict[str, Any], max_tokens: int = 600) -> str:
+    """요약을 프롬프트용 텍스트로 변환합니다. 추정 토큰이 max_tokens를 넘지 않도록 줄/컬럼 수를 줄입니다."""
+    lines: List[str] = [f"전체 {summary.get('rows', '?')}행, {len(summary.get('columns', []))}개 컬럼"]
+    lines += [f"- {format_column(col)}" for col in summary.get("columns", [])]
+
+    text = "\n".join(lines)
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    # 예산 초과 시 뒤쪽 컬럼부터 생략하고 생략 개수를 표시합니다.
+    kept = lines[:1]
+    for line in lines[1:]:
+        if estimate_tokens("\n".join(kept + [line])) > max_tokens - 10:
+            break
+        kept.append(line)
+    omitted = len(lines) - len(kept)
+    return "\n".join(kept) + (f"\n- … 외 {omitted}개 컬럼(get_dataset_summary 도구로 전체 확인)" if omitted else "")
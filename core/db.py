@@ -0,0 +1,338 @@
+"""SQLite 연결 풀.
+
+대화 메모리/프로필처럼 요청마다 여러 번 조회·저장하는 경량 DB용으로, 호출마다
+`sqlite3.connect`(파일 열기 + 스키마 로드)를 반복하지 않도록 연결을 재사용합니다.
+
+- WAL 저널: 읽기와 쓰기가 서로를 막지 않아 스레드 풀에서 동시에 조회/저장할 수 있습니다.
+- `synchronous=NORMAL`: WAL에서는 커밋마다 fsync하지 않아도 DB가 손상되지 않습니다
+  (전원 장애 시 마지막 커밋 일부만 유실될 수 있음).
+- `busy_timeout`: 쓰기 잠금 경합 시 즉시 실패하지 않고 잠시 기다립니다.
+- `auto_vacuum=INCREMENTAL`: 삭제로 생긴 빈 페이지를 `core.retention`이 조금씩 반환할 수 있습니다.
+  새 DB는 만들 때, 이 설정이 없는 기존 DB는 풀이 처음 열릴 때(연결/쓰기 큐가 생기기 전) 한 번 VACUUM으로 전환합니다.
+
+DB 파일 경로마다 풀 하나를 공유하며(`get_pool`), 연결은 스레드 간에 옮겨 다닐 수 있도록
+`check_same_thread=False`로 열되 한 번에 한 스레드만 사용합니다.
+
+`WriteBehindWriter`는 INSERT를 큐에 모았다가 백그라운드 스레드가 한 트랜잭션으로 묶어
+커밋하는 그룹 커밋 계층입니다. 동시 요청의 쓰기가 커밋 한 번을 공유하고, 행 id는 트랜잭션 안에서
+SQLite가 배정합니다.
+"""
+
+import atexit
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager, suppress
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config import settings
+from core.metrics import REGISTRY
+
+WRITE_MODES = ("sync", "batched")
+
+
+def _ensure_incremental_vacuum(db_path: Path, busy_timeout_ms: int):
+    """auto_vacuum이 꺼진 기존 DB를 INCREMENTAL로 전환합니다.
+
+    auto_vacuum 변경은 VACUUM(파일 전체 재작성, 배타 잠금) 이후에만 적용되므로, 풀이 연결을 내주기
+    전에 별도 연결로 한 번만 실행합니다. 실패하면 전환 없이 계속합니다(증분 vacuum만 건너뜀).
+    """
+    if not db_path.exists() or db_path.stat().st_size == 0:
+        return
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            return
+        started = time.perf_counter()
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        logging.info("converted %s to auto_vacuum=INCREMENTAL in %.2fs", db_path, time.perf_counter() - started)
+    except sqlite3.Error as e:
+        logging.warning("auto_vacuum conversion skipped for %s: %s", db_path, e)
+    finally:
+        conn.close()
+
+
+class SQLitePool:
+    """고정 크기 SQLite 연결 풀. 연결은 필요할 때 최대 `size`개까지 생성합니다."""
+
+    def __init__(self, db_path: Path, size: int = 4, busy_timeout_ms: int = 5000):
+        self.db_path = Path(db_path)
+        self.size = max(1, size)
+        self.busy_timeout_ms = busy_timeout_ms
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        _ensure_incremental_vacuum(self.db_path, busy_timeout_ms)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        # 새 DB 파일은 증분 vacuum을 쓸 수 있게 만듭니다(헤더가 쓰이기 전에만 적용, 기존 DB에는 영향 없음).
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    self._created -= 1
+                    raise
+        return self._idle.get(timeout=self.busy_timeout_ms / 1000)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """연결 하나를 빌려 줍니다(autocommit). 여러 문장을 묶으려면 `transaction()`을 사용하세요."""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """`BEGIN IMMEDIATE` 트랜잭션으로 감싼 연결을 빌려 주고, 블록이 끝나면 커밋(예외 시 롤백)합니다.
+
+        블록이나 COMMIT이 실패하면 롤백합니다. 롤백까지 실패해 트랜잭션이 열린 채 남으면 그 연결은 풀에 돌려놓지 않고 닫습니다.
+        """
+        conn = self._acquire()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                if conn.in_transaction:
+                    with suppress(sqlite3.Error):
+                        conn.execute("ROLLBACK")
+                raise
+        finally:
+            if conn.in_transaction:
+                self._discard(conn)
+            else:
+                self._idle.put(conn)
+
+    def _discard(self, conn: sqlite3.Connection):
+        """쓸 수 없는 연결을 닫고 풀 크기에서 뺍니다(다음 `_acquire`가 새로 엽니다)."""
+        with suppress(sqlite3.Error):
+            conn.close()
+        with self._lock:
+            self._created -= 1
+
+    def close(self):
+        """유휴 연결을 모두 닫습니다."""
+        with self._lock:
+            while True:
+                try:
+                    self._idle.get_nowait().close()
+                except queue.Empty:
+                    break
+                self._created -= 1
+
+
+class _Pending:
+    """큐에 들어간 쓰기 한 건. 호출자는 `done`으로 커밋 완료(또는 실패)를 통지받습니다."""
+
+    __slots__ = ("params", "done", "error", "row_id")
+
+    def __init__(self, params: Tuple[Any, ...]):
+        self.params = params
+        self.done = threading.Event()
+        self.error: Optional[BaseException] = None
+        self.row_id: Optional[int] = None
+
+
+class WriteBehindWriter:
+    """같은 INSERT 문을 배치로 모아 한 트랜잭션으로 커밋하는 쓰기 큐(그룹 커밋).
+
+    - `submit(params)`: 배치가 커밋될 때까지 기다렸다가 SQLite가 배정한 rowid를 반환합니다(반환 시 영속).
+      id는 배치 트랜잭션 안의 INSERT가 정하므로 같은 DB 파일을 여러 프로세스가 써도 겹치지 않습니다.
+    - 대기 중인 쓰기가 있으면 바로 커밋합니다(동시에 들어온 쓰기끼리만 최대 `batch_size`개씩 묶임).
+    - 커밋이 실패하면 `max_attempts`번까지 다시 시도하고, 그래도 실패하면 배치를 버리고 모든 호출자에게
+      예외를 전달합니다(무한 재시도로 큐가 막히거나 종료가 멈추지 않음).
+    """
+
+    def __init__(
+        self,
+        pool: SQLitePool,
+        sql: str,
+        name: str,
+        batch_size: int = 64,
+        max_attempts: int = 3,
+    ):
+        self.pool = pool
+        self.sql = sql
+        self.name = name
+        self.batch_size = max(1, batch_size)
+        self.max_attempts = max(1, max_attempts)
+        self._queue: List[_Pending] = []
+        self._inflight: List[_Pending] = []
+        lock = threading.Lock()
+        self._cond = threading.Condition(lock)
+        self._idle = threading.Condition(lock)
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=f"write-behind-{self.name}", daemon=True)
+            self._thread.start()
+
+    def submit(self, params: Tuple[Any, ...]) -> int:
+        """쓰기 한 건을 큐에 넣고 커밋될 때까지 기다려 rowid를 반환합니다. 실패 시 커밋 오류를 그대로 올립니다."""
+        item = _Pending(params)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError(f"WRITER_CLOSED: {self.name}")
+            self._ensure_thread()
+            self._queue.append(item)
+            self._cond.notify_all()
+        item.done.wait()
+        if item.error is not None:
+            raise item.error
+        return item.row_id
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """현재까지 제출된 쓰기가 모두 커밋(또는 실패)될 때까지 기다립니다. 시간 초과 시 False."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._cond.notify_all()
+            while self._queue or self._inflight:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining if remaining is not None else 0.1)
+        return True
+
+    def close(self, timeout: float = 5.0):
+        """남은 쓰기를 커밋하고 백그라운드 스레드를 멈춥니다."""
+        self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _next_batch(self) -> Optional[List[_Pending]]:
+        with self._cond:
+            while not self._queue and not self._closed:
+                self._cond.wait()
+            if not self._queue:
+                return None
+            batch = self._queue[: self.batch_size]
+            del self._queue[: len(batch)]
+            self._inflight = batch
+            return batch
+
+    def _commit(self, batch: List[_Pending]) -> Optional[BaseException]:
+        """배치를 한 트랜잭션으로 INSERT하고 각 항목에 rowid를 채웁니다. 최종 실패 시 예외를 반환합니다."""
+        for attempt in range(1, self.max_attempts + 1):
+            started = time.perf_counter()
+            try:
+                with self.pool.transaction() as conn:
+                    row_ids = [conn.execute(self.sql, item.params).lastrowid for item in batch]
+            except Exception as e:
+                logging.warning(
+                    "write-behind commit failed (%s, %d rows, attempt %d/%d): %s",
+                    self.name, len(batch), attempt, self.max_attempts, e,
+                )
+                if attempt == self.max_attempts:
+                    return e
+                time.sleep(0.05 * attempt)
+                continue
+            for item, row_id in zip(batch, row_ids):
+                item.row_id = row_id
+            REGISTRY.observe(
+                "write_behind_batch_seconds",
+                time.perf_counter() - started,
+                labels={"writer": self.name},
+                help_text="Commit latency of write-behind batches",
+            )
+            REGISTRY.inc("write_behind_rows_total", len(batch), labels={"writer": self.name}, help_text="Rows committed")
+            return None
+        return None
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            error = self._commit(batch)
+            if error is not None:
+                # 다시 큐에 넣지 않고 버립니다. 호출자는 모두 예외를 받습니다.
+                logging.error("write-behind batch dropped (%s, %d rows): %s", self.name, len(batch), error)
+                REGISTRY.inc(
+                    "write_behind_failed_rows_total",
+                    len(batch),
+                    labels={"writer": self.name},
+                    help_text="Rows dropped after repeated commit failures",
+                )
+            with self._cond:
+                self._inflight = []
+                for item in batch:
+                    item.error = error
+                    item.done.set()
+                self._idle.notify_all()
+
+
+_POOLS: Dict[Path, SQLitePool] = {}
+_POOLS_LOCK = threading.Lock()
+_WRITERS: Dict[Tuple[Path, str], WriteBehindWriter] = {}
+
+
+def get_pool(db_path: Path) -> SQLitePool:
+    """DB 파일 경로별 공유 풀을 반환합니다(같은 파일을 여는 인스턴스끼리 연결을 공유)."""
+    key = Path(db_path).resolve()
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = _POOLS[key] = SQLitePool(key, size=settings.SQLITE_POOL_SIZE)
+        return pool
+
+
+def get_writer(db_path: Path, name: str, sql: str) -> WriteBehindWriter:
+    """(DB 파일, 이름)별 공유 쓰기 큐를 반환합니다."""
+    pool = get_pool(db_path)
+    key = (pool.db_path, name)
+    with _POOLS_LOCK:
+        writer = _WRITERS.get(key)
+        if writer is None:
+            writer = _WRITERS[key] = WriteBehindWriter(
+                pool,
+                sql,
+                name=name,
+                batch_size=settings.DB_WRITE_BATCH_SIZE,
+                max_attempts=settings.DB_WRITE_MAX_ATTEMPTS,
+            )
+        return writer
+
+
+def close_all():
+    """애플리케이션 종료 시 쓰기 큐를 비우고 모든 풀의 연결을 닫습니다."""
+    with _POOLS_LOCK:
+        writers = list(_WRITERS.values())
+        _WRITERS.clear()
+    for writer in writers:
+        writer.close()
+    with _POOLS_LOCK:
+        for pool in _POOLS.values():
+            pool.close()
+
+
+# lifespan 없이 쓰는 경우(스크립트/MCP 서버 등)에도 커밋 전 쓰기를 남기지 않도록 종료 시 비웁니다.
+atexit.register(close_all)
@@ -1,24 +1,58 @@
 """LLM 생성 팩토리.
 
 환경변수(.env)를 로드하고, 지정된 모델/온도로 LangChain LLM 인스턴스를 생성합니다.
+`LLM_BACKEND`로 백엔드를 고릅니다(google: Gemini, fake: 오프라인 결정적 모델).
 """
 
+import json
 import os
+from pathlib import Path
 from dotenv import load_dotenv
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.output_parsers import StrOutputParser
 
 
-def get_llm(model: str = "gemini-2.5-flash", temperature: float = 0.4):
+def _google_llm(model: str, temperature: float):
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    return ChatGoogleGenerativeAI(model=model, temperature=temperature, api_key=os.getenv("GOOGLE_API_KEY"))
+
+
+def _fake_llm(model: str, temperature: float):
+    from core.llm.fake import DEFAULT_TOOL_PLAN, ScriptedChatModel
+
+    # FAKE_LLM_SCRIPT: 도구 계획 JSON 문자열 또는 JSON 파일 경로
+    script = os.getenv("FAKE_LLM_SCRIPT")
+    tool_plan = DEFAULT_TOOL_PLAN
+    if script:
+        raw = Path(script).read_text(encoding="utf-8") if Path(script).is_file() else script
+        tool_plan = json.loads(raw)
+    return ScriptedChatModel(
+        tool_plan=tool_plan,
+        latency_ms=float(os.getenv("FAKE_LLM_LATENCY_MS", "0")),
+        token_delay_ms=float(os.getenv("FAKE_LLM_TOKEN_DELAY_MS", "0")),
+    )
+
+
+LLM_BACKENDS = {
+    "google": _google_llm,
+    "fake": _fake_llm,
+}
+
+
+def get_llm(model: str = "gemini-2.5-flash", temperature: float = 0.4, backend: str | None = None):
     """LLM 인스턴스를 반환합니다.
 
     Args:
         model: 모델 이름(Google Generative AI)
         temperature: 생성 온도
+        backend: `LLM_BACKENDS`의 키. 미지정 시 환경변수 `LLM_BACKEND`(기본 google)
     """
     load_dotenv()
     os.environ["LANGCHAIN_PROJECT"] = os.environ.get("LANGCHAIN_PROJECT", "langchain_streamlit")
-    return ChatGoogleGenerativeAI(model=model, temperature=temperature, api_key=os.getenv("GOOGLE_API_KEY"))
+    name = (backend or os.getenv("LLM_BACKEND") or "google").lower()
+    if name not in LLM_BACKENDS:
+        raise ValueError(f"UNSUPPORTED_LLM_BACKEND: {name}")
+    return LLM_BACKENDS[name](model, temperature)
 
 
 def get_chain(llm):
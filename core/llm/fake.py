@@ -0,0 +1,120 @@
+"""네트워크 없이 동작하는 결정적(scripted) 채팅 모델.
+
+벤치마크/오프라인 검증용으로, 미리 정한 도구 호출 계획(tool plan)을 순서대로 수행한 뒤
+도구 결과를 요약한 고정 형식의 답변을 돌려줍니다. 같은 입력에는 항상 같은 출력을 냅니다.
+`bind_tools`를 지원하므로 `create_react_agent`에 그대로 연결할 수 있습니다.
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+
+DEFAULT_TOOL_PLAN: List[Dict[str, Any]] = [
+    {"name": "doc_search", "args": {"query": "{question}"}},
+]
+
+
+class ScriptedChatModel(BaseChatModel):
+    """도구 호출 계획을 재생하는 결정적 채팅 모델.
+
+    Attributes:
+        tool_plan: `[{"name": 도구명, "args": {...}}]`. 문자열 인자의 `{question}`은
+            마지막 사용자 질문으로 치환됩니다. 바인딩되지 않은 도구는 건너뜁니다.
+        latency_ms: 호출마다 첫 응답까지 지연(ms). 실제 LLM 왕복 시간을 흉내 냅니다.
+        token_delay_ms: 스트리밍 시 토큰 사이 지연(ms).
+    """
+
+    tool_plan: List[Dict[str, Any]] = DEFAULT_TOOL_PLAN
+    latency_ms: float = 0.0
+    token_delay_ms: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted-fake"
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any):
+        return self.bind(tools=[convert_to_openai_tool(t) for t in tools], **kwargs)
+
+    # ---- scripted policy ----
+    def _next_message(self, messages: List[BaseMessage], **kwargs: Any) -> AIMessage:
+        bound = {t["function"]["name"] for t in kwargs.get("tools") or [] if t.get("type") == "function"}
+
+        # 마지막 사용자 질문 이후의 도구 결과만 현재 턴의 진행 상황으로 봅니다.
+        question, tool_results = "", []
+        for msg in messages:
+            if isinstance(msg, HumanMessage):
+                question, tool_results = str(msg.content), []
+            elif isinstance(msg, ToolMessage):
+                tool_results.append(str(msg.content))
+
+        steps = [s for s in self.tool_plan if s.get("name") in bound]
+        step = len(tool_results)
+        if step < len(steps):
+            plan = steps[step]
+            args = {
+                k: v.replace("{question}", question) if isinstance(v, str) else v
+                for k, v in (plan.get("args") or {}).items()
+            }
+            return AIMessage(
+                content="",
+                tool_calls=[{"name": plan["name"], "args": args, "id": f"call_{step}", "type": "tool_call"}],
+            )
+
+        evidence = " / ".join(r.replace("\n", " ")[:80] for r in tool_results)
+        answer = f"[offline] '{question}'에 대한 답변입니다. 도구 결과 {len(tool_results)}건을 참고했습니다."
+        if evidence:
+            answer += f" 근거: {evidence}"
+        return AIMessage(content=answer)
+
+    @staticmethod
+    def _tokens(text: str) -> List[str]:
+        words = text.split(" ")
+        return [w if i == len(words) - 1 else w + " " for i, w in enumerate(words)]
+
+    @staticmethod
+    def _chunks(message: AIMessage) -> List[AIMessageChunk]:
+        if message.tool_calls:
+            return [
+                AIMessageChunk(
+                    content="",
+                    tool_call_chunks=[
+                        {"name": tc["name"], "args": json.dumps(tc["args"], ensure_ascii=False), "id": tc["id"], "index": i}
+                        for i, tc in enumerate(message.tool_calls)
+                    ],
+                )
+            ]
+        return [AIMessageChunk(content=tok) for tok in ScriptedChatModel._tokens(str(message.content))]
+
+    # ---- BaseChatModel hooks ----
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency_ms / 1000)
+        return ChatResult(generations=[ChatGeneration(message=self._next_message(messages, **kwargs))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency_ms / 1000)
+        return ChatResult(generations=[ChatGeneration(message=self._next_message(messages, **kwargs))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency_ms / 1000)
+        for i, chunk in enumerate(self._chunks(self._next_message(messages, **kwargs))):
+            if i:
+                time.sleep(self.token_delay_ms / 1000)
+            if run_manager and chunk.content:
+                run_manager.on_llm_new_token(chunk.content, chunk=ChatGenerationChunk(message=chunk))
+            yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency_ms / 1000)
+        for i, chunk in enumerate(self._chunks(self._next_message(messages, **kwargs))):
+            if i:
+                await asyncio.sleep(self.token_delay_ms / 1000)
+            if run_manager and chunk.content:
+                await run_manager.on_llm_new_token(chunk.content, chunk=ChatGenerationChunk(message=chunk))
+            yield ChatGenerationChunk(message=chunk)
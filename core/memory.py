@@ -1,9 +1,18 @@
 import json
 import logging
+import re
 import sqlite3
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
+from config import settings
+from core.db import WRITE_MODES, get_pool, get_writer
+
+INSERT_MESSAGE_SQL = """
+    INSERT INTO conversations (user_id, role, content, file_context)
+    VALUES (?, ?, ?, ?)
+"""
+
 
 class ConversationMemory:
     """대화 메모리를 SQLite로 관리하는 경량 헬퍼.
@@ -11,17 +20,36 @@ class ConversationMemory:
     - 사용자별 별도 DB 파일에 메시지를 저장합니다.
     - 파일 컨텍스트(업로드 파일 정보)도 함께 저장해 맥락 유지에 사용합니다.
     - 최근 N개 조회, 전체 조회, 삭제 등의 기본 기능을 제공합니다.
+    - 오래된 대화의 롤링 요약(conversation_summaries)을 함께 보관합니다.
+    - 연결은 DB 파일별 공유 풀(WAL)에서 빌려 쓰고, 정렬은 자동 증가 id 기준입니다.
+    - 메시지 본문은 FTS5 색인(conversations_fts)으로 전문 검색할 수 있습니다(미지원 시 LIKE 폴백).
+    - 메시지 저장 방식(write_mode)
+      - sync: 메시지마다 즉시 커밋
+      - batched: 쓰기 큐로 동시에 들어온 쓰기를 한 트랜잭션에 묶어 바로 커밋
+      두 방식 모두 커밋될 때까지 기다리고 id는 SQLite가 배정하므로, 반환 시 영속이며 여러 프로세스가
+      같은 DB를 써도 id가 겹치지 않습니다. 커밋이 끝내 실패하면 예외가 호출자에게 전달됩니다.
+      단 WAL + synchronous=NORMAL이라 전원이 꺼지면 마지막 커밋 몇 건이 사라질 수 있습니다(프로세스 종료에는 안전).
     """
 
-    def __init__(self, user_id: str = "default"):
+    def __init__(self, user_id: str = "default", write_mode: Optional[str] = None):
         self.user_id = user_id
         self.db_path = Path(f"data/conversations_{user_id}.db")
+        self.pool = get_pool(self.db_path)
+        self.fts_enabled = False
+        self.write_mode = write_mode or settings.MEMORY_WRITE_MODE
+        if self.write_mode not in WRITE_MODES:
+            logging.warning("Unknown MEMORY_WRITE_MODE %r, using 'sync'", self.write_mode)
+            self.write_mode = "sync"
         self.init_db()
+        self.writer = (
+            get_writer(self.db_path, "conversations", INSERT_MESSAGE_SQL)
+            if self.write_mode != "sync"
+            else None
+        )
 
     def init_db(self):
         """DB 파일 및 테이블이 없으면 생성합니다."""
-        self.db_path.parent.mkdir(exist_ok=True)
-        with sqlite3.connect(self.db_path) as conn:
+        with self.pool.transaction() as conn:
             conn.execute(
                 """
                 CREATE TABLE IF NOT EXISTS conversations (
@@ -34,11 +62,84 @@ class ConversationMemory:
                 )
                 """
             )
-            conn.commit()
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS conversation_summaries (
+                    user_id TEXT PRIMARY KEY,
+                    summary TEXT NOT NULL,
+                    last_message_id INTEGER NOT NULL,
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+                """
+            )
+            # 최근 N개/구간 조회가 테이블 크기와 무관하게 인덱스 역순 탐색만 하도록 (user_id, id) 인덱스를 둡니다.
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_conversations_user_id ON conversations (user_id, id)")
+            # 삭제(전체 초기화/보존 정책 보관)는 마지막 id를 바꾸지 않으므로, 동기화 ETag용 삭제 횟수를 따로 셉니다.
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS conversation_sync (
+                    user_id TEXT PRIMARY KEY,
+                    deletes INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+        self.fts_enabled = self._init_fts()
         logging.debug("conversations table ensured at %s", self.db_path)
 
-    def add_message(self, role: str, content: str, file_context: Optional[Dict[str, Any]] = None):
-        """메시지를 DB에 저장합니다.
+    def _init_fts(self) -> bool:
+        """본문 전문 검색용 FTS5 외부 콘텐츠 색인과 동기화 트리거를 보장합니다.
+
+        conversations 테이블을 그대로 참조하므로 본문을 중복 저장하지 않으며, 색인이 새로 만들어질 때
+        기존 메시지를 한 번 재색인합니다. SQLite에 FTS5가 없으면 False(LIKE 폴백)를 반환합니다.
+        """
+        try:
+            with self.pool.transaction() as conn:
+                exists = conn.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'conversations_fts'"
+                ).fetchone()
+                # unicode61 + 접두 검색: "파일"이 "파일을/파일의"처럼 조사가 붙은 한국어 어절과도 일치합니다.
+                conn.execute(
+                    """
+                    CREATE VIRTUAL TABLE IF NOT EXISTS conversations_fts USING fts5(
+                        content, user_id UNINDEXED,
+                        content='conversations', content_rowid='id',
+                        tokenize='unicode61 remove_diacritics 2'
+                    )
+                    """
+                )
+                conn.execute(
+                    """
+                    CREATE TRIGGER IF NOT EXISTS conversations_fts_ai AFTER INSERT ON conversations BEGIN
+                        INSERT INTO conversations_fts(rowid, content, user_id) VALUES (new.id, new.content, new.user_id);
+                    END
+                    """
+                )
+                conn.execute(
+                    """
+                    CREATE TRIGGER IF NOT EXISTS conversations_fts_ad AFTER DELETE ON conversations BEGIN
+                        INSERT INTO conversations_fts(conversations_fts, rowid, content, user_id)
+                        VALUES ('delete', old.id, old.content, old.user_id);
+                    END
+                    """
+                )
+                conn.execute(
+                    """
+                    CREATE TRIGGER IF NOT EXISTS conversations_fts_au AFTER UPDATE ON conversations BEGIN
+                        INSERT INTO conversations_fts(conversations_fts, rowid, content, user_id)
+                        VALUES ('delete', old.id, old.content, old.user_id);
+                        INSERT INTO conversations_fts(rowid, content, user_id) VALUES (new.id, new.content, new.user_id);
+                    END
+                    """
+                )
+                if not exists:
+                    conn.execute("INSERT INTO conversations_fts(conversations_fts) VALUES ('rebuild')")
+            return True
+        except sqlite3.OperationalError as e:
+            logging.warning("FTS5 unavailable, falling back to LIKE search: %s", e)
+            return False
+
+    def add_message(self, role: str, content: str, file_context: Optional[Dict[str, Any]] = None) -> int:
+        """메시지를 DB에 저장하고 새 메시지 id를 반환합니다.
 
         Args:
             role: 'user' | 'assistant' | 'system'
@@ -46,26 +147,26 @@ class ConversationMemory:
             file_context: 파일 관련 보조 정보(선택)
         """
         file_context_json = json.dumps(file_context, ensure_ascii=False) if file_context else None
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute(
-                """
-                INSERT INTO conversations (user_id, role, content, file_context)
-                VALUES (?, ?, ?, ?)
-                """,
-                (self.user_id, role, content, file_context_json),
-            )
-            conn.commit()
+        params = (self.user_id, role, content, file_context_json)
+        if self.writer is None:
+            with self.pool.connection() as conn:
+                return conn.execute(INSERT_MESSAGE_SQL, params).lastrowid
+        return self.writer.submit(params)
+
+    def flush(self):
+        """쓰기 큐에 남은 메시지가 모두 커밋될 때까지 기다립니다(보관/초기화 전)."""
+        if self.writer is not None:
+            self.writer.flush()
 
     def get_recent_messages(self, limit: int = 20) -> List[Dict[str, Any]]:
         """최신 메시지부터 limit개를 가져와 시간순으로 반환합니다."""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        with self.pool.connection() as conn:
             cursor = conn.execute(
                 """
-                SELECT role, content, file_context, timestamp
+                SELECT id, role, content, file_context, timestamp
                 FROM conversations
                 WHERE user_id = ?
-                ORDER BY timestamp DESC
+                ORDER BY id DESC
                 LIMIT ?
                 """,
                 (self.user_id, limit),
@@ -75,24 +176,183 @@ class ConversationMemory:
                 file_context = json.loads(row["file_context"]) if row["file_context"] else None
                 messages.append(
                     {
+                        "id": row["id"],
                         "role": row["role"],
                         "content": row["content"],
                         "file_context": file_context,
                         "timestamp": row["timestamp"],
                     }
                 )
-            return messages
+        return messages
+
+    def get_messages_page(
+        self, since_id: Optional[int] = None, before_id: Optional[int] = None, limit: int = 100
+    ) -> tuple[List[Dict[str, Any]], bool]:
+        """id 커서 기반 페이지 조회. (시간순 메시지 목록, 더 있는지 여부)를 반환합니다.
+
+        - since_id: 그 이후(id > since_id) 메시지를 오래된 순으로 limit개(증분 동기화)
+        - before_id: 그 이전(id < before_id) 메시지 중 최신 limit개(과거 스크롤)
+        - 둘 다 없으면 최신 limit개
+        """
+        clauses, params = ["user_id = ?"], [self.user_id]
+        if since_id is not None:
+            clauses.append("id > ?")
+            params.append(since_id)
+        if before_id is not None:
+            clauses.append("id < ?")
+            params.append(before_id)
+        # since_id만 있으면 커서 바로 뒤부터, 그 외에는 최신 쪽부터 읽습니다.
+        order = "ASC" if since_id is not None and before_id is None else "DESC"
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT id, role, content, timestamp
+                FROM conversations
+                WHERE {" AND ".join(clauses)}
+                ORDER BY id {order}
+                LIMIT ?
+                """,
+                (*params, limit + 1),
+            ).fetchall()
+        messages = [
+            {"id": row["id"], "role": row["role"], "content": row["content"], "timestamp": row["timestamp"]}
+            for row in rows
+        ]
+        has_more = len(messages) > limit
+        messages = messages[:limit]
+        if order == "DESC":
+            messages.reverse()
+        return messages, has_more
+
+    def get_last_message_id(self) -> int:
+        """가장 최근 메시지 id(없으면 0). 인덱스만 조회합니다."""
+        return self.get_sync_state()[0]
+
+    def get_sync_state(self) -> tuple[int, int]:
+        """(가장 최근 메시지 id, 삭제 횟수). 동기화 ETag 계산용으로 인덱스/한 행만 조회합니다.
+
+        메시지가 추가되면 앞 값이, 삭제되면(초기화/보관) 뒤 값이 바뀝니다.
+        """
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT MAX(id) FROM conversations WHERE user_id = ?", (self.user_id,)).fetchone()
+            deletes = conn.execute("SELECT deletes FROM conversation_sync WHERE user_id = ?", (self.user_id,)).fetchone()
+        return row[0] or 0, deletes[0] if deletes else 0
+
+    def record_delete(self, conn: sqlite3.Connection):
+        """메시지를 삭제한 트랜잭션 안에서 호출해 삭제 횟수를 늘립니다(클라이언트 캐시 무효화)."""
+        conn.execute(
+            """
+            INSERT INTO conversation_sync (user_id, deletes) VALUES (?, 1)
+            ON CONFLICT(user_id) DO UPDATE SET deletes = deletes + 1
+            """,
+            (self.user_id,),
+        )
+
+    def get_messages_between(self, after_id: int, before_id: int, limit: int = 200) -> List[Dict[str, Any]]:
+        """after_id < id < before_id 구간에서 최신 limit개를 id 오름차순으로 반환합니다(요약 갱신용)."""
+        self.flush()
+        with self.pool.connection() as conn:
+            cursor = conn.execute(
+                """
+                SELECT id, role, content
+                FROM conversations
+                WHERE user_id = ? AND id > ? AND id < ?
+                ORDER BY id DESC
+                LIMIT ?
+                """,
+                (self.user_id, after_id, before_id, limit),
+            )
+            return [
+                {"id": row["id"], "role": row["role"], "content": row["content"]}
+                for row in reversed(cursor.fetchall())
+            ]
+
+    def search_messages(self, query: str, limit: int = 5, snippet_tokens: int = 12) -> List[Dict[str, Any]]:
+        """본문 전문 검색. 관련도(BM25) 순으로 메시지 id/역할/시각과 일치 구간 발췌를 반환합니다.
+
+        검색어는 공백 단위로 나눠 모두 포함(AND)하는 접두 일치로 해석합니다. 본문 전체 대신
+        발췌만 돌려주므로 긴 대화에서도 프롬프트 비용이 작습니다.
+        """
+        self.flush()
+        terms = [t for t in re.split(r"\s+", query.strip()) if t]
+        if not terms:
+            return []
+        with self.pool.connection() as conn:
+            if self.fts_enabled:
+                match = " AND ".join('"' + t.replace('"', '""') + '"*' for t in terms)
+                rows = conn.execute(
+                    """
+                    SELECT c.id, c.role, c.timestamp,
+                           snippet(conversations_fts, 0, '[', ']', '…', ?) AS snippet,
+                           bm25(conversations_fts) AS score
+                    FROM conversations_fts
+                    JOIN conversations c ON c.id = conversations_fts.rowid
+                    WHERE conversations_fts MATCH ? AND conversations_fts.user_id = ?
+                    ORDER BY score, c.id DESC
+                    LIMIT ?
+                    """,
+                    (snippet_tokens, match, self.user_id, limit),
+                ).fetchall()
+                return [dict(row) for row in rows]
+
+            # 폴백: 모든 검색어를 포함하는 최신 메시지를 찾고, 첫 검색어 주변을 발췌합니다.
+            like = " AND ".join("content LIKE ?" for _ in terms)
+            rows = conn.execute(
+                f"""
+                SELECT id, role, timestamp, content
+                FROM conversations
+                WHERE user_id = ? AND {like}
+                ORDER BY id DESC
+                LIMIT ?
+                """,
+                (self.user_id, *[f"%{t}%" for t in terms], limit),
+            ).fetchall()
+        results = []
+        for row in rows:
+            content = row["content"]
+            pos = content.lower().find(terms[0].lower())
+            start = max(0, pos - 40)
+            end = pos + len(terms[0]) + 40
+            snippet = ("…" if start else "") + content[start:end] + ("…" if end < len(content) else "")
+            results.append(
+                {"id": row["id"], "role": row["role"], "timestamp": row["timestamp"], "snippet": snippet, "score": None}
+            )
+        return results
+
+    def get_summary(self) -> tuple[str, int]:
+        """저장된 롤링 요약과 요약에 반영된 마지막 메시지 id를 반환합니다(없으면 ("", 0))."""
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                "SELECT summary, last_message_id FROM conversation_summaries WHERE user_id = ?",
+                (self.user_id,),
+            ).fetchone()
+            return (row[0], row[1]) if row else ("", 0)
+
+    def save_summary(self, summary: str, last_message_id: int):
+        """롤링 요약을 저장(갱신)합니다."""
+        with self.pool.connection() as conn:
+            conn.execute(
+                """
+                INSERT INTO conversation_summaries (user_id, summary, last_message_id, updated_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(user_id) DO UPDATE SET
+                    summary = excluded.summary,
+                    last_message_id = excluded.last_message_id,
+                    updated_at = excluded.updated_at
+                """,
+                (self.user_id, summary, last_message_id),
+            )
 
     def get_all_messages(self) -> List[Dict[str, Any]]:
         """전체 대화 기록을 오래된 순으로 반환합니다."""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
+        self.flush()
+        with self.pool.connection() as conn:
             cursor = conn.execute(
                 """
-                SELECT role, content, file_context, timestamp
+                SELECT id, role, content, file_context, timestamp
                 FROM conversations
                 WHERE user_id = ?
-                ORDER BY timestamp ASC
+                ORDER BY id ASC
                 """,
                 (self.user_id,),
             )
@@ -101,6 +361,7 @@ class ConversationMemory:
                 file_context = json.loads(row["file_context"]) if row["file_context"] else None
                 messages.append(
                     {
+                        "id": row["id"],
                         "role": row["role"],
                         "content": row["content"],
                         "file_context": file_context,
@@ -143,9 +404,11 @@ class ConversationMemory:
 
     def clear_conversation(self):
         """현재 사용자 대화 기록을 모두 삭제합니다."""
-        with sqlite3.connect(self.db_path) as conn:
+        self.flush()
+        with self.pool.transaction() as conn:
             conn.execute("DELETE FROM conversations WHERE user_id = ?", (self.user_id,))
-            conn.commit()
+            conn.execute("DELETE FROM conversation_summaries WHERE user_id = ?", (self.user_id,))
+            self.record_delete(conn)
 
 
 def get_memory(user_id: str = "default") -> ConversationMemory:
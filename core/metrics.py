@@ -0,0 +1,183 @@
+"""프로세스 내 경량 메트릭 레지스트리와 단계별 타이밍 스팬.
+
+외부 의존성 없이 카운터/게이지/히스토그램을 모으고 Prometheus 텍스트 형식으로 내보냅니다.
+`span("stage")`는 단계 소요 시간을 `stage_duration_seconds` 히스토그램에 기록하고,
+요청 단위 컨텍스트(`start_request_timings`)가 열려 있으면 해당 요청의 단계 목록에도 추가합니다.
+요청 단위 목록은 `Server-Timing` 헤더와 느린 요청 로그에 사용됩니다.
+"""
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+# collector가 반환하는 샘플: (이름, 타입, 설명, 라벨, 값)
+Sample = Tuple[str, str, str, Dict[str, str], float]
+
+
+def _label_key(labels: Optional[Dict[str, str]]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in (labels or {}).items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    body = ",".join(f'{k}="{v.replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for k, v in items)
+    return "{" + body + "}"
+
+
+class _Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.sum += value
+        self.count += 1
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class MetricsRegistry:
+    """카운터/게이지/히스토그램 저장소(스레드 안전)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._gauges: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+
+    def _describe(self, name: str, kind: str, help_text: str):
+        self._help.setdefault(name, (kind, help_text))
+
+    def inc(self, name: str, value: float = 1.0, labels: Optional[Dict[str, str]] = None, help_text: str = ""):
+        with self._lock:
+            self._describe(name, "counter", help_text)
+            series = self._counters.setdefault(name, {})
+            key = _label_key(labels)
+            series[key] = series.get(key, 0.0) + value
+
+    def set_gauge(self, name: str, value: float, labels: Optional[Dict[str, str]] = None, help_text: str = ""):
+        with self._lock:
+            self._describe(name, "gauge", help_text)
+            self._gauges.setdefault(name, {})[_label_key(labels)] = float(value)
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        labels: Optional[Dict[str, str]] = None,
+        help_text: str = "",
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        with self._lock:
+            self._describe(name, "histogram", help_text)
+            series = self._histograms.setdefault(name, {})
+            key = _label_key(labels)
+            if key not in series:
+                series[key] = _Histogram(buckets)
+            series[key].observe(value)
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]):
+        """렌더링 시점에 값을 계산하는 수집 함수를 등록합니다(예: 캐시 통계)."""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Prometheus 텍스트 노출 형식(0.0.4)으로 직렬화합니다."""
+        collected: Dict[str, Tuple[str, str, List[Tuple[LabelKey, float]]]] = {}
+        for collector in list(self._collectors):
+            try:
+                for name, kind, help_text, labels, value in collector():
+                    collected.setdefault(name, (kind, help_text, []))[2].append((_label_key(labels), float(value)))
+            except Exception:
+                continue
+
+        lines: List[str] = []
+        with self._lock:
+            for store in (self._counters, self._gauges):
+                for name, series in sorted(store.items()):
+                    kind, help_text = self._help[name]
+                    lines.append(f"# HELP {name} {help_text or name}")
+                    lines.append(f"# TYPE {name} {kind}")
+                    for key, value in sorted(series.items()):
+                        lines.append(f"{name}{_format_labels(key)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                _, help_text = self._help[name]
+                lines.append(f"# HELP {name} {help_text or name}")
+                lines.append(f"# TYPE {name} histogram")
+                for key, hist in sorted(series.items()):
+                    for bound, count in zip(hist.buckets, hist.counts):
+                        lines.append(f"{name}_bucket{_format_labels(key, ('le', f'{bound:g}'))} {count}")
+                    lines.append(f"{name}_bucket{_format_labels(key, ('le', '+Inf'))} {hist.count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {hist.sum:g}")
+                    lines.append(f"{name}_count{_format_labels(key)} {hist.count}")
+        for name, (kind, help_text, samples) in sorted(collected.items()):
+            lines.append(f"# HELP {name} {help_text or name}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, value in samples:
+                lines.append(f"{name}{_format_labels(key)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+# 프로세스 전역 레지스트리
+REGISTRY = MetricsRegistry()
+
+_request_timings: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar(
+    "request_timings", default=None
+)
+
+
+def start_request_timings() -> contextvars.Token:
+    """현재 컨텍스트에 요청 단위 단계 목록을 엽니다. 반환된 토큰으로 `reset_request_timings` 하세요."""
+    return _request_timings.set([])
+
+
+def reset_request_timings(token: contextvars.Token):
+    _request_timings.reset(token)
+
+
+def current_request_timings() -> List[Tuple[str, float]]:
+    """현재 요청에서 기록된 (단계, ms) 목록을 반환합니다(요청 컨텍스트 밖이면 빈 목록)."""
+    return list(_request_timings.get() or [])
+
+
+def record_stage(stage: str, seconds: float):
+    """단계 소요 시간을 히스토그램과 (있다면) 현재 요청 목록에 기록합니다."""
+    REGISTRY.observe(
+        "stage_duration_seconds",
+        seconds,
+        labels={"stage": stage},
+        help_text="Duration of internal processing stages",
+    )
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.append((stage, seconds * 1000))
+
+
+@contextmanager
+def span(stage: str):
+    """`with span("sniff"): ...` 형태로 블록 소요 시간을 기록합니다(예외가 나도 기록)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - started)
+
+
+def server_timing_header(timings: List[Tuple[str, float]]) -> str:
+    """단계 목록을 `Server-Timing` 헤더 값으로 변환합니다. 같은 단계는 합산합니다."""
+    totals: Dict[str, float] = {}
+    for stage, ms in timings:
+        totals[stage] = totals.get(stage, 0.0) + ms
+    return ", ".join(f"{stage.replace(' ', '_')};dur={ms:.1f}" for stage, ms in totals.items())
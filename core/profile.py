@@ -1,97 +1,169 @@
 import logging
-import sqlite3
+import threading
 from pathlib import Path
+from typing import Tuple
+
+from config import settings
+from core.context import estimate_tokens, truncate_to_tokens
+from core.db import get_pool
+
+EMPTY_PROFILE_SUMMARY = "사용자 프로필 정보가 없습니다."
 
 
 class UserProfile:
     """사용자 프로필(자유 텍스트)을 SQLite로 간단히 저장/조회.
 
-    - '정보' 레코드를 시간순으로 누적 저장합니다.
-    - AI 프롬프트용 요약 텍스트를 생성할 수 있습니다.
+    - 정보는 (카테고리, 키)별로 하나만 유지합니다. 같은 키로 다시 저장하면 값을 갱신합니다(upsert).
+    - AI 프롬프트용 요약 텍스트를 생성할 수 있습니다. 요약은 토큰 예산(`summary_max_tokens`) 안에서
+      최근에 갱신된 정보부터 담고, 프로세스 메모리에 캐시합니다.
+    - 쓰기마다 증가하는 `version`으로 요약 캐시와 프로필 의존 캐시(답변 캐시 등)를 무효화합니다.
     """
 
-    def __init__(self, user_id: str = "default"):
+    def __init__(self, user_id: str = "default", summary_max_tokens: int | None = None):
         self.user_id = user_id
         self.db_path = Path(f"data/profiles_{user_id}.db")
+        self.version = 0
+        self.summary_max_tokens = summary_max_tokens or settings.PROFILE_SUMMARY_MAX_TOKENS
+        self.pool = get_pool(self.db_path)
+        self._summary_cache: Tuple[int, str] | None = None
+        self._lock = threading.Lock()
         self.init_db()
 
     def init_db(self):
-        """DB 파일 및 user_info 테이블 보장."""
-        self.db_path.parent.mkdir(exist_ok=True)
-        with sqlite3.connect(self.db_path) as conn:
+        """DB 파일 및 user_info 테이블 보장.
+
+        카테고리/키 컬럼이 없던 이전 스키마는 컬럼을 추가하고, 기존 누적 행은 ('personal', 본문)을
+        키로 삼아 중복을 정리한 뒤 (user_id, category, key) 유일 인덱스를 만듭니다.
+        """
+        with self.pool.transaction() as conn:
             conn.execute(
                 """
                 CREATE TABLE IF NOT EXISTS user_info (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     user_id TEXT NOT NULL,
                     info TEXT NOT NULL,
-                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    category TEXT,
+                    key TEXT
+                )
+                """
+            )
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(user_info)")}
+            for column in ("category", "key"):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE user_info ADD COLUMN {column} TEXT")
+            conn.execute("UPDATE user_info SET category = 'personal' WHERE category IS NULL")
+            conn.execute("UPDATE user_info SET key = info WHERE key IS NULL")
+            conn.execute(
+                """
+                DELETE FROM user_info WHERE id NOT IN (
+                    SELECT MAX(id) FROM user_info GROUP BY user_id, category, key
                 )
                 """
             )
-            conn.commit()
+            conn.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS idx_user_info_key ON user_info (user_id, category, key)"
+            )
         logging.debug("user_info table ensured at %s", self.db_path)
 
+    def _bump_version(self):
+        with self._lock:
+            self.version += 1
+            self._summary_cache = None
+
     def set_info(self, category: str, key: str, value: str):
-        """새 정보를 누적 저장합니다(카테고리/키는 현재 표시용, 스키마 최소화)."""
-        with sqlite3.connect(self.db_path) as conn:
+        """(카테고리, 키)의 정보를 저장합니다. 이미 있으면 값과 갱신 시각만 바꿉니다."""
+        with self.pool.connection() as conn:
             conn.execute(
                 """
-                INSERT INTO user_info (user_id, info)
-                VALUES (?, ?)
+                INSERT INTO user_info (user_id, category, key, info, updated_at)
+                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(user_id, category, key) DO UPDATE SET
+                    info = excluded.info,
+                    updated_at = excluded.updated_at
                 """,
-                (self.user_id, value),
+                (self.user_id, category, key, str(value)),
             )
-            conn.commit()
+        self._bump_version()
 
     def get_info(self, category: str, key: str) -> str:
-        """최신 1개 정보를 조회합니다."""
-        with sqlite3.connect(self.db_path) as conn:
+        """(카테고리, 키)의 정보를 조회합니다(없으면 빈 문자열)."""
+        with self.pool.connection() as conn:
             cursor = conn.execute(
                 """
                 SELECT info FROM user_info
-                WHERE user_id = ?
-                ORDER BY updated_at DESC
-                LIMIT 1
+                WHERE user_id = ? AND category = ? AND key = ?
                 """,
-                (self.user_id,),
+                (self.user_id, category, key),
             )
             result = cursor.fetchone()
             return result[0] if result else ""
 
     def get_all_info(self) -> list:
-        """모든 정보를 오래된 순으로 조회합니다."""
-        with sqlite3.connect(self.db_path) as conn:
+        """모든 정보를 갱신 순(오래된 순)으로 조회합니다."""
+        with self.pool.connection() as conn:
             cursor = conn.execute(
                 """
-                SELECT info, updated_at FROM user_info
+                SELECT category, key, info, updated_at FROM user_info
                 WHERE user_id = ?
-                ORDER BY updated_at ASC
+                ORDER BY updated_at ASC, id ASC
                 """,
                 (self.user_id,),
             )
-            return [{"info": row[0], "time": row[1]} for row in cursor.fetchall()]
+            return [
+                {"category": row[0], "key": row[1], "info": row[2], "time": row[3]} for row in cursor.fetchall()
+            ]
 
     def get_all_profile(self):
-        """모든 정보를 단순 구조로 반환(프론트 표시용)."""
-        all_info = self.get_all_info()
-        if all_info:
-            return {"personal": {"info_list": [item["info"] for item in all_info]}}
-        return {}
+        """카테고리별 정보 목록을 반환(프론트 표시용)."""
+        profile = {}
+        for item in self.get_all_info():
+            entry = profile.setdefault(item["category"], {"info_list": [], "entries": {}})
+            entry["info_list"].append(item["info"])
+            entry["entries"][item["key"]] = item["info"]
+        return profile
 
     def get_profile_summary(self) -> str:
-        """AI 프롬프트에 주입하기 좋은 요약 문장을 생성합니다."""
-        all_info = self.get_all_info()
-        if all_info:
-            info_texts = [item["info"] for item in all_info]
-            return f"사용자 정보: {' | '.join(info_texts)}"
-        return "사용자 프로필 정보가 없습니다."
+        """AI 프롬프트에 주입하기 좋은 요약 문장을 생성합니다.
+
+        쓰기가 없으면 DB를 다시 읽지 않고 캐시를 돌려줍니다.
+        """
+        with self._lock:
+            version, cache = self.version, self._summary_cache
+        if cache is not None and cache[0] == version:
+            return cache[1]
+
+        summary = self._build_summary(self.get_all_info())
+        with self._lock:
+            # 요약을 만드는 사이 쓰기가 있었다면 캐시하지 않습니다(다음 호출에서 다시 생성).
+            if self.version == version:
+                self._summary_cache = (version, summary)
+        return summary
+
+    def _build_summary(self, all_info: list) -> str:
+        """최근 갱신된 정보부터 예산 안에 담고, 넘치는 오래된 정보는 개수만 표시합니다."""
+        if not all_info:
+            return EMPTY_PROFILE_SUMMARY
+        prefix, sep = "사용자 정보: ", " | "
+        budget = self.summary_max_tokens - estimate_tokens(prefix) - estimate_tokens(" (외 0000개)")
+        kept: list = []
+        used = 0
+        for item in reversed(all_info):
+            text = truncate_to_tokens(item["info"], max(1, budget // 2))
+            cost = estimate_tokens(text) + (estimate_tokens(sep) if kept else 0)
+            if kept and used + cost > budget:
+                break
+            kept.append(text)
+            used += cost
+        omitted = len(all_info) - len(kept)
+        summary = prefix + sep.join(reversed(kept))
+        return summary + (f" (외 {omitted}개)" if omitted else "")
 
     def clear_profile(self):
         """모든 프로필 정보를 삭제합니다."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self.pool.connection() as conn:
             conn.execute("DELETE FROM user_info WHERE user_id = ?", (self.user_id,))
-            conn.commit()
+        self._bump_version()
 
 
 def get_user_profile(user_id: str = "default") -> UserProfile:
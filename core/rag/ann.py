@@ -0,0 +1,138 @@
+"""행 수에 따라 FAISS 색인 종류(정확/근사)를 고르고 학습·평가하는 모듈.
+
+평탄(Flat) 색인은 행마다 384차원 float32 벡터(약 1.5KB)를 그대로 보관하고 검색도 선형이므로,
+행이 많은 데이터셋은 압축 근사 색인으로 바꿉니다.
+
+- `flat`: `IndexFlatL2`. 정확, 메모리 n x d x 4 바이트
+- `ivfpq`: `IndexIVFPQ`. 벡터를 `nlist`개 군집으로 나누고 각 벡터를 `pq_m` 바이트 코드로 압축
+  (384차원 기준 약 1/30 크기). 질의는 가까운 `nprobe`개 군집만 훑습니다
+- `hnsw`: `IndexHNSWSQ`(8비트 스칼라 양자화 + HNSW 그래프). 메모리 약 1/4 + 그래프, 로그 시간 질의
+- `auto`: `min_rows` 미만이면 `flat`, 이상이면 `ivfpq`
+
+학습은 전체가 아닌 무작위 표본으로 하고, 만든 뒤에는 표본 질의로 정확 검색 대비 recall@k를 측정해
+색인 크기와 함께 보고합니다. 색인은 `faiss.serialize_index`로 바이트 배열(pickle 가능)이 되어
+프로세스 풀에서 만들고 부모 프로세스에서 복원합니다.
+"""
+
+import logging
+import math
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import faiss
+import numpy as np
+
+INDEX_MODES = ("auto", "flat", "ivfpq", "hnsw")
+# 근사 색인 학습에 필요한 최소 행 수(PQ 코드북 256개 x 학습점). 이보다 적으면 flat을 사용합니다.
+MIN_ANN_ROWS = 10_000
+RECALL_QUERIES = 50
+RECALL_K = 10
+
+
+def _pq_subquantizers(dim: int, m: int) -> int:
+    """`dim`을 나누는 `m` 이하의 가장 큰 부분 양자화기 수."""
+    m = max(1, min(m, dim))
+    while dim % m:
+        m -= 1
+    return m
+
+
+def build_index(
+    vectors: np.ndarray,
+    mode: str = "auto",
+    min_rows: int = 200_000,
+    nlist: int = 0,
+    pq_m: int = 48,
+    hnsw_m: int = 32,
+    train_sample: int = 100_000,
+    seed: int = 0,
+) -> Tuple[faiss.Index, Dict[str, Any]]:
+    """벡터로 FAISS 색인을 만들고 (색인, 보고서)를 반환합니다.
+
+    Returns:
+        보고서: {"mode", "vectors", "dim", "index_bytes", "flat_bytes", "train_rows", "build_ms",
+                 "recall_at_k", "k"(+ ivfpq: "nlist", "pq_m" / hnsw: "hnsw_m")}
+    """
+    if mode not in INDEX_MODES:
+        raise ValueError(f"UNKNOWN_INDEX_MODE: {mode} (지원: {', '.join(INDEX_MODES)})")
+    n, dim = vectors.shape
+    if mode == "auto":
+        mode = "ivfpq" if n >= min_rows else "flat"
+    if mode != "flat" and n < MIN_ANN_ROWS:
+        logging.info("index mode %s needs >= %d rows (got %d); using flat", mode, MIN_ANN_ROWS, n)
+        mode = "flat"
+
+    started = time.perf_counter()
+    report: Dict[str, Any] = {"mode": mode, "vectors": n, "dim": dim, "train_rows": 0}
+    if mode == "flat":
+        index = faiss.IndexFlatL2(dim)
+    elif mode == "ivfpq":
+        nlist = nlist or int(4 * math.sqrt(n))
+        # k-means는 군집당 약 39개 이상의 학습점이 있어야 안정적입니다.
+        nlist = max(16, min(nlist, n // 39, 65536))
+        pq_m = _pq_subquantizers(dim, pq_m)
+        index = faiss.IndexIVFPQ(faiss.IndexFlatL2(dim), dim, nlist, pq_m, 8)
+        report.update({"nlist": nlist, "pq_m": pq_m})
+    else:
+        index = faiss.IndexHNSWSQ(dim, faiss.ScalarQuantizer.QT_8bit, hnsw_m)
+        report["hnsw_m"] = hnsw_m
+
+    if not index.is_trained:
+        rng = np.random.default_rng(seed)
+        size = min(n, max(train_sample, 39 * report.get("nlist", 0)))
+        sample = vectors[rng.choice(n, size, replace=False)] if size < n else vectors
+        index.train(sample)
+        report["train_rows"] = int(len(sample))
+    index.add(vectors)
+
+    report["build_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    report["index_bytes"] = int(len(faiss.serialize_index(index)))
+    report["flat_bytes"] = int(n * dim * 4)
+    report["k"] = RECALL_K
+    report["recall_at_k"] = measure_recall(index, vectors, seed=seed) if mode != "flat" else 1.0
+    return index, report
+
+
+def measure_recall(index: faiss.Index, vectors: np.ndarray, queries: int = RECALL_QUERIES, k: int = RECALL_K, seed: int = 0) -> float:
+    """표본 벡터를 질의로 써서 정확 검색 상위 k 대비 색인 검색 상위 k의 평균 재현율을 잽니다."""
+    n = len(vectors)
+    if not n:
+        return 1.0
+    k = min(k, n)
+    rng = np.random.default_rng(seed + 1)
+    xq = vectors[rng.choice(n, min(queries, n), replace=False)]
+    _, truth = faiss.knn(xq, vectors, k)
+    configure_search(index)
+    _, found = index.search(xq, k)
+    hits = sum(len(set(t) & set(f)) for t, f in zip(truth.tolist(), found.tolist()))
+    return round(hits / (len(xq) * k), 4)
+
+
+def configure_search(index: faiss.Index, nprobe: int = 16, ef_search: int = 64):
+    """검색 폭(직렬화되지 않는 설정)을 색인에 적용합니다."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        ivf.nprobe = min(nprobe, ivf.nlist)
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = ef_search
+
+
+def search_params(index: faiss.Index, mask: Optional[np.ndarray] = None) -> Tuple[Optional[faiss.SearchParameters], Any]:
+    """후보 마스크를 반영한 검색 파라미터와, 검색이 끝날 때까지 살려 둘 비트맵을 반환합니다.
+
+    근사 색인에서 후보가 적으면 가까운 군집/이웃 안에 후보가 없어 결과가 비기 쉬우므로, 후보 비율에
+    반비례해 `nprobe`/`efSearch`를 넓혀 훑는 후보 수가 필터 없는 검색과 비슷하게 유지되도록 합니다.
+    """
+    if mask is None:
+        return None, None
+    bitmap = np.packbits(mask, bitorder="little")
+    selector = faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(bitmap))
+    widen = len(mask) / max(1, int(mask.sum()))
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None:
+        params = faiss.SearchParametersIVF(sel=selector, nprobe=min(ivf.nlist, math.ceil(ivf.nprobe * widen)))
+    elif isinstance(index, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW(sel=selector, efSearch=min(4096, math.ceil(index.hnsw.efSearch * widen)))
+    else:
+        params = faiss.SearchParameters(sel=selector)
+    return params, (bitmap, selector)
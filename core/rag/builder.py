@@ -1,29 +1,173 @@
 """CSV 파일을 임베딩해 검색용 Retriever로 변환하는 빌더.
 
-단순화를 위해 전체 행을 문서로 변환하여 FAISS에 색인합니다. 대용량 CSV의 경우
-메모리 사용량이 커질 수 있으니, 실제 운영에서는 청크/샘플링 도입을 고려하세요.
+단순화를 위해 전체 행을 문서로 변환하여 FAISS에 색인합니다. 행 수가 `RAG_ANN_MIN_ROWS` 이상이면
+(`RAG_INDEX_MODE=auto`) 압축 근사 색인(IVF-PQ)을 사용해 메모리와 검색 시간을 줄입니다(`core.rag.ann`).
 """
 
-import pandas as pd
+import logging
+import os
+from functools import lru_cache
+
+import faiss
+import numpy as np
 from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
 from langchain_community.embeddings import HuggingFaceEmbeddings
 
+from config import settings
+from core.data_processing.load import load_frame
+from core.metrics import REGISTRY, span
+from core.rag.ann import build_index, configure_search
+from core.rag.columns import ColumnIndex
+from core.rag.hybrid import HybridRetriever
+from core.rag.documents import build_documents
+from core.rag.lexical import BM25Index
 
-def build_retriever_from_csv(uploaded_file, k: int = 3):
-    """CSV 경로를 받아 Retriever 객체를 생성합니다.
 
-    Args:
-        uploaded_file: CSV 파일 경로(str 또는 Path)
-        k: 검색 시 반환할 문서 개수
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_DIM = 384
+
+
+@lru_cache(maxsize=1)
+def get_embedding_model():
+    """임베딩 모델을 프로세스당 한 번만 로드해 재사용합니다.
+
+    환경변수 `EMBEDDING_BACKEND=fake`이면 모델 다운로드 없이 동작하는 결정적 해시 임베딩을 사용합니다.
+    """
+    if os.getenv("EMBEDDING_BACKEND", "huggingface").lower() == "fake":
+        return DeterministicFakeEmbedding(size=EMBEDDING_DIM)
+    return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME)
+
+
+def build_index_payload(meta: dict) -> dict:
+    """데이터셋 원본(메타의 `raw_path`)을 문서로 변환하고 임베딩까지 계산한 색인 재료(pickle 가능)를 반환합니다.
+
+    메타의 타입 계획(`dtypes`)으로 읽어 `ColumnIndex`가 작은 타입을 그대로 보관합니다. 날짜 컬럼은
+    문서 텍스트가 원본 표기를 유지하도록 문자열로 읽습니다.
+
+    문서 구성(행/블록, 중복 제거, 컬럼 요약 문서)은 `RAG_DOC_STRATEGY` 등 설정을 따릅니다(`core.rag.documents`).
+
+    파싱, 임베딩, 근사 색인 학습이 대부분의 시간을 차지하므로 프로세스 풀에서 실행하기 좋도록
+    순수 데이터만 돌려줍니다. 벡터 색인은 `faiss.serialize_index` 바이트 배열로 담습니다.
+
+    Returns:
+        {"texts": [...], "metadatas": [...], "index": np.ndarray(uint8, 직렬화된 FAISS 색인),
+         "index_report": 색인 종류/크기/recall, "lexical": BM25Index,
+         "columns": ColumnIndex(타입 있는 컬럼 값, 구조화 필터용), "row_doc": 행 → 문서 번호,
+         "row_line": 행 → 문서 안 줄 번호}
+    """
+    with span("index_load"):
+        df = load_frame(meta, dates=False)
+
+    with span("index_documents"):
+        docs = build_documents(
+            df,
+            strategy=settings.RAG_DOC_STRATEGY,
+            block_rows=settings.RAG_BLOCK_ROWS,
+            dedup=settings.RAG_DEDUP_ROWS,
+            column_docs=settings.RAG_COLUMN_DOCS,
+        )
+    texts, metadatas = docs["texts"], docs["metadatas"]
+
+    with span("index_lexical"):
+        lexical = BM25Index.build(docs["tokens"])
+    with span("index_embed"):
+        vectors = np.asarray(get_embedding_model().embed_documents(texts), dtype=np.float32)
+    with span("index_train"):
+        index, report = build_index(
+            vectors,
+            mode=settings.RAG_INDEX_MODE,
+            min_rows=settings.RAG_ANN_MIN_ROWS,
+            nlist=settings.RAG_IVF_NLIST,
+            pq_m=settings.RAG_PQ_M,
+            hnsw_m=settings.RAG_HNSW_M,
+            train_sample=settings.RAG_TRAIN_SAMPLE,
+        )
+    return {
+        "texts": texts,
+        "metadatas": metadatas,
+        "index": faiss.serialize_index(index),
+        "index_report": report,
+        "lexical": lexical,
+        "columns": ColumnIndex(df),
+        "row_doc": docs["row_doc"],
+        "row_line": docs["row_line"],
+    }
+
+
+def build_append_payload(meta: dict, start_byte: int, start_row: int) -> dict:
+    """추가 업로드로 늘어난 꼬리 구간(`start_byte` 이후)만 문서화/임베딩한 색인 재료를 반환합니다.
+
+    기존 색인에 `HybridRetriever.extend`로 이어 붙입니다. 중복 제거는 꼬리 구간 안에서만 하고,
+    컬럼 요약 문서는 만들지 않습니다(기존 문서 유지).
+
+    Returns:
+        {"texts", "metadatas", "vectors": np.ndarray(float32), "tokens", "frame": 꼬리 DataFrame, "row_doc": 꼬리 내 상대 번호, "row_line"}
+    """
+    with span("index_load"):
+        df = load_frame(meta, start_byte=start_byte, dates=False)
+    with span("index_documents"):
+        docs = build_documents(
+            df,
+            strategy=settings.RAG_DOC_STRATEGY,
+            block_rows=settings.RAG_BLOCK_ROWS,
+            dedup=settings.RAG_DEDUP_ROWS,
+            column_docs=False,
+            start_row=start_row,
+        )
+    with span("index_embed"):
+        vectors = np.asarray(get_embedding_model().embed_documents(docs["texts"]), dtype=np.float32)
+    return {**docs, "vectors": vectors.reshape(len(docs["texts"]), -1), "frame": df}
+
+
+def retriever_from_payload(payload: dict, k: int = 3):
+    """`build_index_payload` 결과로 FAISS 색인을 조립해 Retriever를 반환합니다.
+
+    `RAG_HYBRID`가 켜져 있으면 벡터 + BM25 하이브리드, 꺼져 있으면 벡터 검색만 하는 `HybridRetriever`를
+    반환합니다. 어느 쪽이든 컬럼 보조 색인으로 구조화 필터(`search(query, filters)`)를 지원합니다.
     """
-    df = pd.read_csv(uploaded_file)
+    report = payload["index_report"]
+    with span("index_assemble"):
+        index = faiss.deserialize_index(payload["index"])
+        configure_search(index, nprobe=settings.RAG_IVF_NPROBE, ef_search=settings.RAG_HNSW_EF_SEARCH)
+        texts, metadatas = payload["texts"], payload["metadatas"]
+        vs = FAISS(
+            embedding_function=get_embedding_model(),
+            index=index,
+            docstore=InMemoryDocstore(
+                {str(i): Document(page_content=text, metadata=meta) for i, (text, meta) in enumerate(zip(texts, metadatas))}
+            ),
+            index_to_docstore_id={i: str(i) for i in range(len(texts))},
+        )
+    logging.info("retriever index: %s", report)
+    REGISTRY.set_gauge("rag_index_vectors", vs.index.ntotal, help_text="Vectors in the most recently built retriever index")
+    if payload.get("row_doc") is not None:
+        REGISTRY.set_gauge("rag_index_rows", len(payload["row_doc"]), help_text="Source rows behind the most recent retriever index")
+    REGISTRY.set_gauge("rag_index_bytes", report["index_bytes"], help_text="Serialized size of the most recent vector index")
+    REGISTRY.set_gauge("rag_index_recall", report["recall_at_k"], help_text="Sampled recall@k of the most recent vector index against exact search")
+    REGISTRY.inc("rag_index_builds_total", labels={"mode": report["mode"]}, help_text="Retriever index builds")
+    return HybridRetriever(
+        vectorstore=vs,
+        lexical=payload.get("lexical") if settings.RAG_HYBRID else None,
+        columns=payload.get("columns"),
+        row_doc=payload.get("row_doc"),
+        row_line=payload.get("row_line"),
+        index_report=report,
+        texts=payload["texts"],
+        metadatas=payload["metadatas"],
+        k=k,
+        fetch_k=max(k, settings.RAG_FETCH_K),
+        rrf_k=settings.RAG_RRF_K,
+    )
+
 
-    docs = []
-    for i, row in df.iterrows():
-        content = row.to_json(force_ascii=False)
-        docs.append(Document(page_content=content, metadata={"row": i}))
+def build_retriever_from_csv(meta: dict, k: int = 3):
+    """데이터셋 메타(원본 경로/스니핑 정보/타입 계획)를 받아 Retriever 객체를 생성합니다.
 
-    embed = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-    vs = FAISS.from_documents(docs, embed)
-    return vs.as_retriever(search_kwargs={"k": k})
+    Args:
+        meta: 데이터셋 메타 dict(`raw_path` 포함)
+        k: 검색 시 반환할 문서 개수
+    """
+    return retriever_from_payload(build_index_payload(meta), k=k)
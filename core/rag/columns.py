@@ -0,0 +1,57 @@
+"""행 문서의 타입 있는 컬럼 값을 보관하는 열 지향 보조 색인.
+
+벡터/어휘 색인은 행 JSON 텍스트만 알기 때문에 "country == KR인 행 중에서" 같은 조건을 걸 수 없습니다.
+색인에 넣은 순서(문서 번호)대로 컬럼별 값을 pandas가 추론한 타입(수치/불리언) 그대로 보관하고,
+반복 값이 많은 문자열 컬럼은 범주형(정수 코드)으로 바꿔 같음 비교를 문자열 비교 없이 처리합니다.
+구조화 필터는 벡터 연산 한 번으로 후보 문서 집합(불리언 마스크)이 됩니다.
+
+필터 형식과 연산자는 `query_data`와 같습니다(`core.data_processing.query.FILTER_OPS`).
+"""
+
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from core.data_processing.query import filter_mask, normalize_spec
+
+# 고유값 비율이 이 값 이하인 문자열 컬럼은 범주형으로 저장합니다.
+CATEGORY_MAX_RATIO = 0.5
+
+
+class ColumnIndex:
+    """문서 번호(0..n-1) 순서의 컬럼 값 테이블."""
+
+    def __init__(self, frame: pd.DataFrame):
+        frame = frame.reset_index(drop=True)
+        for column in frame.columns:
+            s = frame[column]
+            if s.dtype == object and s.nunique(dropna=True) <= CATEGORY_MAX_RATIO * max(1, len(s)):
+                frame[column] = s.astype("category")
+        self.frame = frame
+
+    def extend(self, frame: pd.DataFrame):
+        """추가된 행을 뒤에 붙입니다. 합친 뒤 타입/범주형 변환을 다시 정합니다."""
+        merged = pd.concat(
+            [self.frame.astype({c: object for c in self.frame.select_dtypes("category").columns}), frame],
+            ignore_index=True,
+        )
+        self.frame = ColumnIndex(merged).frame
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    @property
+    def columns(self) -> List[str]:
+        return [str(c) for c in self.frame.columns]
+
+    def mask(self, filters: List[Dict[str, Any]]) -> np.ndarray:
+        """필터(AND)를 만족하는 문서의 불리언 마스크. 잘못된 필터/컬럼은 ValueError."""
+        filters = normalize_spec(filters=filters)["filters"]
+        missing = {f["column"] for f in filters} - set(self.frame.columns)
+        if missing:
+            raise ValueError(f"UNKNOWN_COLUMN: {', '.join(sorted(missing))} (가능: {', '.join(self.columns)})")
+        try:
+            return filter_mask(self.frame, filters).to_numpy(dtype=bool)
+        except TypeError as e:
+            raise ValueError(f"INVALID_FILTER_VALUE: {e}") from e
@@ -0,0 +1,90 @@
+"""CSV 행을 검색 문서로 묶는 전략.
+
+행마다 문서를 만들면 임베딩 수와 색인 크기가 행 수에 1:1로 비례하지만, 실제 데이터에는 같은 행이
+반복되거나 비슷한 행이 많습니다. 다음 전략을 조합해 임베딩할 문서 수를 줄입니다.
+
+- `rows`: 행 하나 = 문서 하나(기본)
+- `blocks`: 연속한 `block_rows`개 행을 JSON Lines 한 문서로 묶음
+- `dedup`: 직렬화 결과가 같은 행은 처음 한 번만 문서화(나머지는 같은 문서를 가리킴)
+- `column_docs`: 컬럼마다 타입/범위/상위 값 요약 문서를 추가(개요성 질의의 근거)
+
+모든 행은 정확히 한 문서에 속하며 `row_doc[행 번호] = 문서 번호`, `row_line[행 번호] = 문서 안 줄 번호`로
+기록합니다. 구조화 필터는 행 단위로 평가한 뒤 이 매핑으로 문서 단위 후보가 되고, 블록 문서는 조건을
+만족하는 행의 줄만 남겨 반환합니다. 컬럼 요약 문서는 어떤 행에도 대응하지 않으므로 필터가 있는 검색에서는
+제외됩니다.
+"""
+
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from core.data_processing.summary import finalize_summary, format_column, summarize_frames
+from core.rag.lexical import cell_token, tokenize
+
+DOC_STRATEGIES = ("rows", "blocks")
+
+
+def build_documents(
+    df: pd.DataFrame,
+    strategy: str = "rows",
+    block_rows: int = 10,
+    dedup: bool = True,
+    column_docs: bool = True,
+    start_row: int = 0,
+) -> Dict[str, Any]:
+    """DataFrame을 문서 목록으로 변환합니다.
+
+    `start_row`는 `df` 첫 행의 원본 행 번호입니다(추가 업로드의 꼬리 구간용). `row_doc`은 `df` 안에서의
+    상대 문서 번호이므로, 기존 색인 뒤에 붙일 때는 기존 문서 수를 더해 씁니다.
+
+    Returns:
+        {"texts": [...], "metadatas": [...], "tokens": 문서별 BM25 토큰 목록,
+         "row_doc": np.ndarray(int32, 행 수) 행 → 문서 번호,
+         "row_line": np.ndarray(int32, 행 수) 행 → 문서 텍스트 안 줄 번호}
+        행 문서 metadata: `row`(첫 행 번호), `rows`(대표하는 원본 행 수).
+        컬럼 요약 문서 metadata: `column`(컬럼명).
+    """
+    if strategy not in DOC_STRATEGIES:
+        raise ValueError(f"UNKNOWN_DOC_STRATEGY: {strategy} (지원: {', '.join(DOC_STRATEGIES)})")
+    df = df.reset_index(drop=True)
+    lines = df.to_json(orient="records", lines=True, date_format="iso", force_ascii=False).splitlines() if len(df) else []
+
+    # 1) 중복 제거: 같은 직렬화 결과의 행은 첫 행(대표 행)으로 모읍니다.
+    unit_of_row = np.arange(len(lines), dtype=np.int32)
+    unit_rows: List[int] = []
+    unit_counts: List[int] = []
+    seen: Dict[str, int] = {}
+    for i, line in enumerate(lines):
+        unit = seen.setdefault(line, len(unit_rows)) if dedup else len(unit_rows)
+        if unit == len(unit_rows):
+            unit_rows.append(i)
+            unit_counts.append(0)
+        unit_of_row[i] = unit
+        unit_counts[unit] += 1
+
+    # 2) 묶기: 대표 행을 순서대로 block_rows개씩 한 문서로 만듭니다.
+    size = max(1, block_rows) if strategy == "blocks" else 1
+    cells = [[token for token in map(cell_token, values) if token] for values in df.itertuples(index=False)]
+    texts: List[str] = []
+    metadatas: List[dict] = []
+    tokens: List[List[str]] = []
+    for start in range(0, len(unit_rows), size):
+        members = unit_rows[start : start + size]
+        text = "\n".join(lines[i] for i in members)
+        texts.append(text)
+        metadatas.append({"row": start_row + members[0], "rows": sum(unit_counts[start : start + size])})
+        tokens.append(tokenize(text) + [token for i in members for token in cells[i]])
+    row_doc = (unit_of_row // size).astype(np.int32)
+    row_line = (unit_of_row % size).astype(np.int32)
+
+    # 3) 컬럼 요약 문서
+    if column_docs and len(df.columns):
+        summary = finalize_summary(summarize_frames([df]))
+        for col in summary["columns"]:
+            text = f"컬럼 요약(전체 {summary['rows']}행): {format_column(col, top_n=5)}"
+            texts.append(text)
+            metadatas.append({"column": col["name"]})
+            tokens.append(tokenize(text))
+
+    return {"texts": texts, "metadatas": metadatas, "tokens": tokens, "row_doc": row_doc, "row_line": row_line}
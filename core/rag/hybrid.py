@@ -0,0 +1,176 @@
+"""FAISS 벡터 검색 + BM25 어휘 검색을 순위 융합(RRF)으로 합치는 Retriever.
+
+두 검색의 점수 척도가 달라 직접 더할 수 없으므로 순위만 사용합니다.
+문서 점수 = Σ 1 / (rrf_k + 순위). 한쪽에서만 찾은 문서도 후보가 되고, 양쪽 모두에서 상위인
+문서가 가장 앞에 옵니다.
+
+질의 어절이 셀 값과 정확히 일치하는 문서(ID, 코드, 범주 값)는 일치한 셀 수가 많은 순으로
+융합 순위보다 먼저 정렬하므로, 정확한 값을 묻는 질의는 한 번의 검색으로 해당 행이 맨 앞에 옵니다.
+
+구조화 필터(`search(query, filters=...)`)가 있으면 컬럼 보조 색인으로 후보 마스크를 먼저 만들고,
+벡터 검색은 FAISS `IDSelectorBitmap`으로 후보의 거리만 계산하며(근사 색인이면 탐색 폭도 넓힘) BM25도 후보 밖 점수를 버립니다.
+조건이 좁을수록 계산량이 줄고, 조건 밖의 행이 상위를 차지하는 일이 없습니다. 여러 행을 묶은 블록 문서는
+조건을 만족하는 행의 줄만 남겨 반환하므로, 같은 블록의 조건 밖 행이 결과에 섞이지 않습니다.
+"""
+
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict, PrivateAttr
+
+from core.rag.ann import search_params
+from core.rag.columns import ColumnIndex
+from core.rag.lexical import BM25Index, query_tokens
+
+
+class HybridRetriever(BaseRetriever):
+    """벡터/어휘 검색 결과를 RRF로 합쳐 상위 k개 문서를 반환합니다.
+
+    문서 번호는 색인에 넣은 순서(= FAISS 내부 위치 = BM25 문서 번호 = 컬럼 색인 행)로 모든 색인이 공유합니다.
+    반환 문서의 metadata에는 원래 메타에 더해 `score`(RRF 점수)와 `match`(찾은 검색 종류)가 붙습니다.
+    `lexical`이 None이면 벡터 검색만, `columns`가 None이면 필터 없는 검색만 지원합니다.
+    `row_doc`(행 → 문서 번호)이 None이면 문서 번호와 행 번호가 같다고 봅니다. `row_line`(행 → 문서 안 줄 번호)이
+    있으면 필터 검색 결과의 문서를 조건을 만족하는 줄로 줄입니다.
+    """
+
+    vectorstore: Any
+    lexical: Optional[BM25Index] = None
+    columns: Optional[ColumnIndex] = None
+    row_doc: Optional[np.ndarray] = None
+    row_line: Optional[np.ndarray] = None
+    index_report: Dict[str, Any] = {}
+    texts: List[str]
+    metadatas: List[dict]
+    k: int = 3
+    fetch_k: int = 20
+    rrf_k: int = 60
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+    # 추가 업로드(extend)와 검색이 동시에 색인을 건드리지 않도록 보호합니다.
+    _lock: threading.RLock = PrivateAttr(default_factory=threading.RLock)
+
+    def _vector_ranks(self, query: str, mask: Optional[np.ndarray] = None) -> List[int]:
+        vector = np.asarray([self.vectorstore.embeddings.embed_query(query)], dtype=np.float32)
+        index = self.vectorstore.index
+        # _keepalive(비트맵/선택기)는 검색이 끝날 때까지 살아 있어야 합니다.
+        params, _keepalive = search_params(index, mask)
+        _, ids = index.search(vector, self.fetch_k, params=params)
+        return [int(i) for i in ids[0] if i >= 0]
+
+    def search(
+        self, query: str, filters: Optional[List[Dict[str, Any]]] = None, k: Optional[int] = None
+    ) -> Tuple[List[Document], int]:
+        """필터(AND) 조건을 만족하는 행 안에서 질의와 관련된 상위 k개 문서를 찾습니다.
+
+        Returns:
+            (문서 목록, 필터를 만족하는 행 수). 잘못된 필터/컬럼은 ValueError.
+            여러 행을 묶은 문서는 조건을 만족하는 행을 하나라도 포함하면 후보가 되고, 조건을 만족하는 행의
+            줄만 남겨 반환합니다(metadata `row`/`rows`도 남은 행 기준).
+        """
+        with self._lock:
+            return self._search(query, filters, k or self.k)
+
+    def _search(self, query: str, filters: Optional[List[Dict[str, Any]]], k: int) -> Tuple[List[Document], int]:
+        mask = None
+        rows = None
+        matched = len(self.texts)
+        if filters:
+            if self.columns is None:
+                raise ValueError("FILTERS_UNSUPPORTED: 이 색인에는 컬럼 값이 없습니다.")
+            rows = self.columns.mask(filters)
+            matched = int(rows.sum())
+            if not matched:
+                return [], 0
+            if self.row_doc is None:
+                mask = rows
+            else:
+                mask = np.zeros(len(self.texts), dtype=bool)
+                mask[self.row_doc[rows]] = True
+
+        tokens = query_tokens(query)
+        ranked = {"vector": self._vector_ranks(query, mask)}
+        if self.lexical is not None:
+            ranked["lexical"] = [doc_id for doc_id, _ in self.lexical.search(tokens, self.fetch_k, mask)]
+        scores: Dict[int, float] = {}
+        matches: Dict[int, List[str]] = {}
+        for source, doc_ids in ranked.items():
+            for rank, doc_id in enumerate(doc_ids, start=1):
+                scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (self.rrf_k + rank)
+                matches.setdefault(doc_id, []).append(source)
+
+        exact = self.lexical.exact_counts(tokens, list(scores)) if self.lexical is not None else {}
+        top = sorted(scores, key=lambda doc_id: (-exact.get(doc_id, 0), -scores[doc_id], doc_id))[:k]
+        documents = [
+            Document(
+                page_content=self.texts[doc_id],
+                metadata={
+                    **self.metadatas[doc_id],
+                    "score": round(scores[doc_id], 6),
+                    "match": matches[doc_id] + (["exact"] if exact.get(doc_id) else []),
+                },
+            )
+            for doc_id in top
+        ]
+        if rows is not None and self.row_doc is not None and self.row_line is not None:
+            documents = self._trim_to_rows(documents, top, rows)
+        return documents, matched
+
+    def _trim_to_rows(self, documents: List[Document], doc_ids: List[int], rows: np.ndarray) -> List[Document]:
+        """블록 문서를 조건을 만족하는 행(`rows` 마스크)의 줄로 줄입니다."""
+        matched_rows = np.flatnonzero(rows)
+        selected = np.isin(self.row_doc[matched_rows], doc_ids)
+        matched_rows = matched_rows[selected]
+        lines: Dict[int, Dict[int, int]] = {}
+        counts: Dict[int, int] = {}
+        for row, doc_id, line in zip(
+            matched_rows.tolist(), self.row_doc[matched_rows].tolist(), self.row_line[matched_rows].tolist()
+        ):
+            # 줄 번호 → 그 줄(중복 제거된 대표 행)에 해당하는 첫 행 번호
+            lines.setdefault(doc_id, {}).setdefault(line, row)
+            counts[doc_id] = counts.get(doc_id, 0) + 1
+        trimmed = []
+        for doc, doc_id in zip(documents, doc_ids):
+            keep = lines.get(doc_id)
+            if not keep:
+                trimmed.append(doc)
+                continue
+            text_lines = doc.page_content.split("\n")
+            trimmed.append(
+                Document(
+                    page_content="\n".join(text_lines[i] for i in sorted(keep)),
+                    metadata={**doc.metadata, "row": min(keep.values()), "rows": counts[doc_id]},
+                )
+            )
+        return trimmed
+
+    def extend(self, payload: Dict[str, Any]):
+        """`build_append_payload` 결과(추가된 행의 문서/벡터)를 기존 색인 뒤에 이어 붙입니다.
+
+        근사 색인도 학습된 군집/코드북을 그대로 쓰고 벡터만 추가하므로 재학습이 없습니다.
+        """
+        texts, metadatas = payload["texts"], payload["metadatas"]
+        with self._lock:
+            offset = len(self.texts)
+            self.vectorstore.index.add(payload["vectors"])
+            self.vectorstore.docstore.add(
+                {str(offset + i): Document(page_content=t, metadata=m) for i, (t, m) in enumerate(zip(texts, metadatas))}
+            )
+            self.vectorstore.index_to_docstore_id.update({offset + i: str(offset + i) for i in range(len(texts))})
+            if self.lexical is not None:
+                self.lexical.extend(payload["tokens"])
+            if self.columns is not None:
+                self.columns.extend(payload["frame"])
+            if self.row_doc is not None:
+                self.row_doc = np.concatenate([self.row_doc, payload["row_doc"] + offset]).astype(np.int32)
+            if self.row_line is not None:
+                self.row_line = np.concatenate([self.row_line, payload["row_line"]]).astype(np.int32)
+            self.texts.extend(texts)
+            self.metadatas.extend(metadatas)
+            self.index_report = {**self.index_report, "vectors": int(self.vectorstore.index.ntotal)}
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return self.search(query)[0]
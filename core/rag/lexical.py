@@ -0,0 +1,138 @@
+"""행 문서용 BM25 역색인.
+
+임베딩 유사도는 주문번호/코드/숫자 같은 정확한 값에 약하므로, 같은 행 문서에 대해
+토큰 역색인을 함께 만들어 어휘 일치 점수(BM25)를 계산합니다.
+
+- 단어 토큰: 행 텍스트를 소문자 `\\w+` 단위로 분리(예: "ORD-2024-001" → ord, 2024, 001)
+- 셀 토큰: 셀 값 전체를 하나의 토큰(`=값`)으로 추가해, 질의에 값이 그대로 나오면 강하게 일치
+  (범주형 값, ID, 코드)
+
+색인은 토큰 → (문서 번호 배열, 빈도 배열)의 numpy 포스팅으로 저장되어 pickle 가능하므로
+프로세스 풀에서 만들어 부모로 돌려줄 수 있습니다.
+"""
+
+import re
+from collections import Counter, defaultdict
+from datetime import datetime, time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+# 셀 값 전체 토큰은 너무 긴 값(자유 텍스트)에는 만들지 않습니다.
+MAX_CELL_TOKEN_CHARS = 64
+
+
+def tokenize(text: str) -> List[str]:
+    """소문자 단어 토큰."""
+    return _WORD.findall(str(text).lower())
+
+
+def cell_token(value) -> str | None:
+    """셀 값 전체를 나타내는 토큰(`=값`). 비어 있거나 너무 길면 None."""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    elif isinstance(value, datetime) and value.time() == time(0):
+        # Parquet/Arrow 날짜 컬럼의 자정 시각은 CSV 원문처럼 날짜만 씁니다.
+        value = value.date()
+    text = str(value).strip().lower()
+    if not text or text == "nan" or len(text) > MAX_CELL_TOKEN_CHARS:
+        return None
+    return f"={text}"
+
+
+def query_tokens(query: str) -> List[str]:
+    """질의 토큰: 단어 토큰 + 공백으로 나눈 각 어절(앞뒤 구두점 제거)의 셀 토큰."""
+    tokens = tokenize(query)
+    for word in query.split():
+        token = cell_token(word.strip(".,;:!?()[]{}\"'`"))
+        if token:
+            tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    """문서 번호(0..n-1) 단위 BM25 역색인."""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.doc_len = np.zeros(0, dtype=np.float32)
+        self.avg_len = 0.0
+
+    @classmethod
+    def build(cls, docs: Iterable[Sequence[str]], k1: float = 1.5, b: float = 0.75) -> "BM25Index":
+        """문서별 토큰 목록으로 색인을 만듭니다."""
+        index = cls(k1, b)
+        doc_ids: Dict[str, List[int]] = defaultdict(list)
+        freqs: Dict[str, List[int]] = defaultdict(list)
+        lengths: List[int] = []
+        for doc_id, tokens in enumerate(docs):
+            counts = Counter(tokens)
+            lengths.append(sum(counts.values()))
+            for token, tf in counts.items():
+                doc_ids[token].append(doc_id)
+                freqs[token].append(tf)
+        index.postings = {
+            token: (np.asarray(ids, dtype=np.int32), np.asarray(freqs[token], dtype=np.float32))
+            for token, ids in doc_ids.items()
+        }
+        index.doc_len = np.asarray(lengths, dtype=np.float32)
+        index.avg_len = float(index.doc_len.mean()) if lengths else 0.0
+        return index
+
+    def __len__(self) -> int:
+        return len(self.doc_len)
+
+    def extend(self, docs: Iterable[Sequence[str]]):
+        """문서를 뒤에 추가합니다(문서 번호는 기존 문서 수부터 이어짐). 기존 포스팅 뒤에 이어 붙입니다."""
+        tail = BM25Index.build(docs, self.k1, self.b)
+        offset = len(self.doc_len)
+        for token, (ids, tf) in tail.postings.items():
+            ids = ids + offset
+            if token in self.postings:
+                old_ids, old_tf = self.postings[token]
+                ids, tf = np.concatenate([old_ids, ids]), np.concatenate([old_tf, tf])
+            self.postings[token] = (ids, tf)
+        self.doc_len = np.concatenate([self.doc_len, tail.doc_len])
+        self.avg_len = float(self.doc_len.mean()) if len(self.doc_len) else 0.0
+
+    def search(
+        self, tokens: Sequence[str], k: int = 10, mask: Optional[np.ndarray] = None
+    ) -> List[Tuple[int, float]]:
+        """질의 토큰으로 상위 k개 (문서 번호, 점수)를 점수 내림차순으로 반환합니다.
+
+        `mask`(문서별 불리언)가 주어지면 마스크 밖 문서는 결과에서 제외합니다.
+        """
+        n = len(self.doc_len)
+        if not n:
+            return []
+        scores = np.zeros(n, dtype=np.float32)
+        norm = self.k1 * (1 - self.b + self.b * self.doc_len / (self.avg_len or 1.0))
+        for token in set(tokens):
+            posting = self.postings.get(token)
+            if posting is None:
+                continue
+            ids, tf = posting
+            idf = np.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+            scores[ids] += idf * tf * (self.k1 + 1) / (tf + norm[ids])
+        if mask is not None:
+            scores[~mask] = 0
+        hits = np.flatnonzero(scores)
+        if not len(hits):
+            return []
+        top = hits[np.argsort(-scores[hits], kind="stable")[:k]]
+        return [(int(i), float(scores[i])) for i in top]
+
+    def exact_counts(self, tokens: Sequence[str], doc_ids: Sequence[int]) -> Dict[int, int]:
+        """각 문서가 질의의 셀 토큰(`=값`)과 몇 개 정확히 일치하는지 셉니다."""
+        counts = {int(doc_id): 0 for doc_id in doc_ids}
+        candidates = np.asarray(list(counts), dtype=np.int32)
+        for token in {t for t in tokens if t.startswith("=")}:
+            posting = self.postings.get(token)
+            if posting is None:
+                continue
+            for doc_id in candidates[np.isin(candidates, posting[0])]:
+                counts[int(doc_id)] += 1
+        return counts
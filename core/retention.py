@@ -0,0 +1,173 @@
+"""대화 DB 보존 정책: 오래된 메시지 보관(아카이브), 압축(vacuum), 크기 보고.
+
+장기 사용자의 `data/conversations_{user}.db`가 끝없이 커지지 않도록, 보존 기준(나이/개수)을
+벗어난 메시지를 gzip JSONL 세그먼트(`data/archive/conversations_{user}/{첫id}-{끝id}.jsonl.gz`)로
+옮기고 핫 테이블에서 삭제합니다.
+
+- 삭제 전에 `before_archive(cutoff_id)`(기본 연결: 컨텍스트 빌더의 `fold_until`)로 롤링 요약에
+  해당 구간을 반영하므로, `conversation_summaries`의 요약 행은 그대로 남아 프롬프트 맥락이 끊기지 않습니다.
+- 세그먼트를 먼저 디스크에 쓴 뒤 같은 구간을 삭제합니다. 중간에 중단되면 다음 실행에서 같은 구간을
+  다시 보관할 수 있으나(중복 세그먼트) 메시지가 유실되지는 않습니다.
+- 삭제로 생긴 빈 페이지는 `PRAGMA incremental_vacuum`으로 조금씩 반환합니다. 운영 중인 풀에서
+  VACUUM(전체 재작성)은 하지 않으며, auto_vacuum이 꺼진 DB의 전환은 `core.db`가 풀을 열 때 처리합니다.
+"""
+
+import gzip
+import json
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from config.paths import DATA_DIR
+from core.memory import ConversationMemory
+from core.metrics import span
+
+ARCHIVE_DIR = DATA_DIR / "archive"
+
+
+class ConversationRetention:
+    """한 사용자 대화 DB에 대한 보존 작업.
+
+    Args:
+        memory: 대상 대화 메모리
+        max_age_days: 이보다 오래된 메시지를 보관(0이면 나이 기준 비활성)
+        keep_recent: 핫 테이블에 남길 최대 메시지 수(0이면 개수 기준 비활성)
+        vacuum_pages: 한 번에 반환할 최대 빈 페이지 수(0이면 전부)
+        segment_rows: 세그먼트 한 개에 담을 최대 메시지 수
+        before_archive: 보관 직전 호출(인자: 이 id 미만이 보관됨). 요약 갱신에 사용
+    """
+
+    def __init__(
+        self,
+        memory: ConversationMemory,
+        max_age_days: float = 30,
+        keep_recent: int = 500,
+        vacuum_pages: int = 2000,
+        segment_rows: int = 5000,
+        before_archive: Optional[Callable[[int], None]] = None,
+        archive_dir: Path = ARCHIVE_DIR,
+    ):
+        self.memory = memory
+        self.max_age_days = max_age_days
+        self.keep_recent = keep_recent
+        self.vacuum_pages = vacuum_pages
+        self.segment_rows = max(1, segment_rows)
+        self.before_archive = before_archive
+        self.archive_dir = Path(archive_dir) / f"conversations_{memory.user_id}"
+
+    def _cutoff_id(self) -> int:
+        """보관 대상의 경계 id(이 id 이하가 대상). 대상이 없으면 0."""
+        cutoff = 0
+        with self.memory.pool.connection() as conn:
+            if self.keep_recent:
+                row = conn.execute(
+                    "SELECT id FROM conversations WHERE user_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?",
+                    (self.memory.user_id, self.keep_recent),
+                ).fetchone()
+                cutoff = max(cutoff, row[0] if row else 0)
+            if self.max_age_days:
+                row = conn.execute(
+                    "SELECT MAX(id) FROM conversations WHERE user_id = ? AND timestamp < datetime('now', ?)",
+                    (self.memory.user_id, f"-{float(self.max_age_days)} days"),
+                ).fetchone()
+                cutoff = max(cutoff, row[0] or 0)
+        return cutoff
+
+    def archive(self) -> Dict[str, Any]:
+        """보존 기준을 벗어난 메시지를 세그먼트로 옮기고 삭제합니다."""
+        self.memory.flush()
+        cutoff = self._cutoff_id()
+        if not cutoff:
+            return {"archived": 0, "segments": []}
+        if self.before_archive is not None:
+            self.before_archive(cutoff + 1)
+
+        archived, segments = 0, []
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        while True:
+            with self.memory.pool.connection() as conn:
+                rows = conn.execute(
+                    """
+                    SELECT id, role, content, file_context, timestamp
+                    FROM conversations
+                    WHERE user_id = ? AND id <= ?
+                    ORDER BY id ASC
+                    LIMIT ?
+                    """,
+                    (self.memory.user_id, cutoff, self.segment_rows),
+                ).fetchall()
+            if not rows:
+                break
+            first_id, last_id = rows[0]["id"], rows[-1]["id"]
+            path = self.archive_dir / f"{first_id:012d}-{last_id:012d}.jsonl.gz"
+            tmp = path.with_suffix(".tmp")
+            with gzip.open(tmp, "wt", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(dict(row), ensure_ascii=False) + "\n")
+            with open(tmp, "rb") as f:
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+
+            with self.memory.pool.transaction() as conn:
+                conn.execute(
+                    "DELETE FROM conversations WHERE user_id = ? AND id BETWEEN ? AND ?",
+                    (self.memory.user_id, first_id, last_id),
+                )
+                self.memory.record_delete(conn)
+            archived += len(rows)
+            segments.append(path.name)
+        logging.info("archived %d messages of %s into %d segments", archived, self.memory.user_id, len(segments))
+        return {"archived": archived, "segments": segments}
+
+    def compact(self) -> Dict[str, Any]:
+        """빈 페이지를 반환하고 WAL을 비웁니다. 증분 vacuum은 auto_vacuum=INCREMENTAL인 DB에서만 실행합니다."""
+        with self.memory.pool.connection() as conn:
+            incremental = conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+            free_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if incremental:
+                # incremental_vacuum은 페이지 하나당 한 단계씩 실행되므로, 끝까지 실행되는 executescript로 호출합니다.
+                pages = f"({int(self.vacuum_pages)})" if self.vacuum_pages else ""
+                conn.executescript(f"PRAGMA incremental_vacuum{pages};")
+            free_after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        return {"incremental_vacuum": incremental, "pages_freed": free_before - free_after}
+
+    def run(self) -> Dict[str, Any]:
+        """보관 → 압축을 차례로 실행하고 실행 결과와 크기 보고를 반환합니다."""
+        started = time.perf_counter()
+        with span("retention"):
+            result = {**self.archive(), **self.compact()}
+        result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        result["storage"] = self.storage_report()
+        return result
+
+    def clear_archive(self):
+        """보관된 세그먼트를 모두 삭제합니다(전체 초기화용)."""
+        if self.archive_dir.exists():
+            shutil.rmtree(self.archive_dir)
+
+    def storage_report(self) -> Dict[str, Any]:
+        """DB/WAL/아카이브 크기와 메시지 수."""
+        db_path = self.memory.pool.db_path
+        wal_path = db_path.with_name(db_path.name + "-wal")
+        with self.memory.pool.connection() as conn:
+            page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+            page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+            freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            messages = conn.execute(
+                "SELECT COUNT(*) FROM conversations WHERE user_id = ?", (self.memory.user_id,)
+            ).fetchone()[0]
+        segments = list(self.archive_dir.glob("*.jsonl.gz")) if self.archive_dir.exists() else []
+        return {
+            "db_bytes": db_path.stat().st_size if db_path.exists() else 0,
+            "wal_bytes": wal_path.stat().st_size if wal_path.exists() else 0,
+            "page_size": page_size,
+            "page_count": page_count,
+            "freelist_pages": freelist,
+            "messages": messages,
+            "archive_segments": len(segments),
+            "archive_bytes": sum(p.stat().st_size for p in segments),
+        }
@@ -11,7 +11,7 @@ import {
 } from '@mui/material';
 import { Send, SmartToy, Person } from '@mui/icons-material';
 import axios from 'axios';
-import { ChatMessage, FileInfo } from '../types';
+import { ChatMessage, ChatResponse, FileInfo, MessagesPage } from '../types';
 
 interface ChatInterfaceProps {
   fileInfo: FileInfo | null;
@@ -25,6 +25,8 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({ fileInfo }) => {
   const [isLoading, setIsLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
   const messagesEndRef = useRef<HTMLDivElement>(null);
+  // 서버와 동기화된 마지막 메시지 id(증분 동기화 커서)
+  const lastIdRef = useRef<number | null>(null);
 
   const scrollToBottom = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
@@ -41,8 +43,9 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({ fileInfo }) => {
 
   const loadMessages = async () => {
     try {
-      const response = await axios.get(`${API_BASE_URL}/messages`);
+      const response = await axios.get<MessagesPage>(`${API_BASE_URL}/messages`);
       setMessages(response.data.messages);
+      lastIdRef.current = response.data.last_id;
     } catch (err) {
       console.error('메시지 로드 실패:', err);
     }
@@ -62,16 +65,22 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({ fileInfo }) => {
     setError(null);
 
     try {
-      const response = await axios.post(`${API_BASE_URL}/chat`, {
+      const response = await axios.post<ChatResponse>(`${API_BASE_URL}/chat`, {
         message: inputMessage,
+        since_id: lastIdRef.current,
       });
 
-      const assistantMessage: ChatMessage = {
-        role: 'assistant',
-        content: response.data.response,
-      };
-
-      setMessages(prev => [...prev, assistantMessage]);
+      // 커서 이후 메시지가 한 응답에 다 담기지 않았으면 최신 목록을 다시 받습니다.
+      if (response.data.has_more) {
+        await loadMessages();
+        return;
+      }
+      // 응답에는 커서 이후의 새 메시지만 담겨 오므로, 낙관적으로 추가한(id 없는) 메시지를 대체해 덧붙입니다.
+      const newMessages = response.data.messages;
+      setMessages(prev => [...prev.filter(m => m.id !== undefined), ...newMessages]);
+      if (newMessages.length > 0) {
+        lastIdRef.current = newMessages[newMessages.length - 1].id ?? lastIdRef.current;
+      }
     } catch (err: any) {
       setError(err.response?.data?.detail || '메시지 전송 중 오류가 발생했습니다.');
     } finally {
@@ -141,7 +150,7 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({ fileInfo }) => {
       <Box sx={{ flex: 1, overflow: 'auto', mb: 2 }}>
         {messages.map((message, index) => (
           <Box
-            key={index}
+            key={message.id ?? `pending-${index}`}
             sx={{
               display: 'flex',
               mb: 2,
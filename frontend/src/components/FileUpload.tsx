@@ -71,6 +71,8 @@ const FileUpload: React.FC<FileUploadProps> = ({ onFileUploaded }) => {
       'text/csv': ['.csv'],
       'text/tab-separated-values': ['.tsv'],
       'text/plain': ['.txt'],
+      'application/vnd.apache.parquet': ['.parquet', '.pq'],
+      'application/vnd.apache.arrow.file': ['.arrow', '.feather', '.ipc'],
     },
     multiple: false,
   });
@@ -122,7 +124,7 @@ const FileUpload: React.FC<FileUploadProps> = ({ onFileUploaded }) => {
               {isDragActive ? '파일을 여기에 놓으세요' : '파일을 드래그하거나 클릭하여 업로드'}
             </Typography>
             <Typography variant="body2" color="text.secondary">
-              CSV, TSV, TXT 파일만 지원됩니다
+              CSV, TSV, TXT, Parquet, Arrow(Feather) 파일만 지원됩니다
             </Typography>
             <Button
               variant="outlined"
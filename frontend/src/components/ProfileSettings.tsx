@@ -66,14 +66,15 @@ const ProfileSettings: React.FC<ProfileSettingsProps> = ({
     try {
       setLoading(true);
       
+      // 정보는 (category, key)별로 하나만 저장되므로, 내용 자체를 키로 써서 같은 정보의 중복 저장을 막습니다.
       await axios.post(`${API_BASE_URL}/profile`, {
         category: 'personal',
-        key: 'name',
+        key: name.trim(),
         value: name,
       });
       
       setSuccess('정보가 추가되었습니다!');
-      setAllInfo(prev => [...prev, name]); // 새 정보 추가
+      setAllInfo(prev => (prev.includes(name) ? prev : [...prev, name])); // 새 정보 추가
       setName(''); // 입력 필드 비우기
       setTimeout(() => setSuccess(null), 2000);
       onProfileUpdate();
@@ -1,6 +1,8 @@
 export interface ChatMessage {
+  id?: number;
   role: 'user' | 'assistant';
   content: string;
+  timestamp?: string;
 }
 
 export interface FileInfo {
@@ -30,6 +32,13 @@ export interface FileInfo {
 export interface ChatResponse {
   response: string;
   messages: ChatMessage[];
+  has_more: boolean;
+}
+
+export interface MessagesPage {
+  messages: ChatMessage[];
+  last_id: number;
+  has_more: boolean;
 }
 
 export interface FileUploadResponse {
@@ -0,0 +1,22 @@
+import os
+
+# 모델 다운로드 없이 동작하는 결정적 임베딩/LLM을 사용합니다(설정 모듈 import 전에 지정).
+os.environ.setdefault("EMBEDDING_BACKEND", "fake")
+os.environ.setdefault("LLM_BACKEND", "fake")
+
+import pytest  # noqa: E402
+
+import backend.services.ingest as ingest  # noqa: E402
+import core.data_processing.meta as meta_module  # noqa: E402
+
+
+@pytest.fixture
+def data_dirs(tmp_path, monkeypatch):
+    """업로드/메타 디렉터리를 테스트 전용 임시 디렉터리로 바꿉니다."""
+    uploads, metas = tmp_path / "uploads", tmp_path / "meta"
+    uploads.mkdir()
+    metas.mkdir()
+    for module in (meta_module, ingest):
+        monkeypatch.setattr(module, "UPLOAD_DIR", uploads)
+        monkeypatch.setattr(module, "META_DIR", metas)
+    return uploads, metas
@@ -0,0 +1,146 @@
+"""추가 업로드: 접두사 검사, 꼬리 통계 병합, 색인 이어 붙이기, 실패 시 되돌리기."""
+
+import pandas as pd
+import pytest
+
+from backend.services.ingest import append_tail, find_append_start, restore_dataset, snapshot_dataset
+from config import settings
+from core.data_processing.meta import dataset_dir, write_meta
+from core.data_processing.sniff import sniff_file
+from core.data_processing.summary import append_summary, build_summary
+from core.rag.builder import build_append_payload, build_index_payload, retriever_from_payload
+
+CITIES = ["Seoul", "Busan", "Incheon", "Daegu"]
+
+
+def _frame(start: int, stop: int) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "order_id": [f"A{i:04d}" for i in range(start, stop)],
+            "city": [CITIES[i % len(CITIES)] for i in range(start, stop)],
+            "amount": [round(1000 + i * 7.5, 2) for i in range(start, stop)],
+        }
+    )
+
+
+def _csv_bytes(rows: int) -> bytes:
+    return _frame(0, rows).to_csv(index=False).encode("utf-8")
+
+
+def _dataset(uploads, dsid: str, content: bytes) -> dict:
+    raw = uploads / dsid / "raw.csv"
+    raw.parent.mkdir(parents=True)
+    raw.write_bytes(content)
+    meta = {"sniff": sniff_file(raw, "csv"), "raw_path": str(raw), "columns": ["order_id", "city", "amount"]}
+    return meta
+
+
+def _upload(tmp_path, content: bytes) -> str:
+    path = tmp_path / "upload.csv"
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_find_append_start_accepts_prefix(tmp_path, data_dirs):
+    old, new = _csv_bytes(30), _csv_bytes(40)
+    meta = _dataset(data_dirs[0], "ds_prefix", old)
+    assert find_append_start(_upload(tmp_path, new), meta) == len(old)
+    # 검사만 하고 원본은 건드리지 않습니다.
+    assert (data_dirs[0] / "ds_prefix" / "raw.csv").read_bytes() == old
+
+
+def test_find_append_start_uses_stored_md5(tmp_path, data_dirs):
+    old = _csv_bytes(30)
+    meta = _dataset(data_dirs[0], "ds_md5", old)
+    meta.update(size_bytes=len(old), md5="0" * 32)
+    # 저장된 md5가 새 파일 접두사와 다르면 접두사가 아닌 것으로 봅니다.
+    assert find_append_start(_upload(tmp_path, _csv_bytes(40)), meta) is None
+
+
+@pytest.mark.parametrize(
+    "old, new",
+    [
+        (_csv_bytes(30), _csv_bytes(40).replace(b"Seoul", b"Tokyo", 1)),  # 접두사가 다름
+        (_csv_bytes(30), _csv_bytes(30)),  # 늘어난 내용 없음
+        (_csv_bytes(30), _csv_bytes(20)),  # 줄어듦
+        (_csv_bytes(30).rstrip(b"\n"), _csv_bytes(40)),  # 원본이 줄바꿈으로 끝나지 않음
+    ],
+)
+def test_find_append_start_rejects(tmp_path, data_dirs, old, new):
+    meta = _dataset(data_dirs[0], "ds_reject", old)
+    assert find_append_start(_upload(tmp_path, new), meta) is None
+
+
+def test_find_append_start_rejects_columnar(tmp_path, data_dirs):
+    meta = _dataset(data_dirs[0], "ds_columnar", _csv_bytes(30))
+    meta["sniff"] = {**meta["sniff"], "filetype": "parquet"}
+    assert find_append_start(_upload(tmp_path, _csv_bytes(40)), meta) is None
+
+
+def test_append_summary_matches_full_scan(tmp_path, data_dirs):
+    old, new = _csv_bytes(300), _csv_bytes(500)
+    meta = _dataset(data_dirs[0], "ds_summary", old)
+    build_summary("ds_summary", meta)
+    appended = append_summary("ds_summary", {**meta, "raw_path": _upload(tmp_path, new)}, len(old))
+
+    full_meta = _dataset(data_dirs[0], "ds_summary_full", new)
+    full = build_summary("ds_summary_full", full_meta)
+
+    assert appended["rows"] == full["rows"] == 500
+    for merged, expected in zip(appended["columns"], full["columns"]):
+        assert merged["name"] == expected["name"]
+        assert merged["type"] == expected["type"]
+        assert merged["missing"] == expected["missing"]
+        assert merged["distinct"] == expected["distinct"]
+        if expected["type"] == "numeric":
+            for key in ("min", "max", "mean", "std"):
+                assert merged[key] == pytest.approx(expected[key], rel=1e-9)
+        else:
+            assert merged["top"] == expected["top"]
+
+
+def test_retriever_extend_matches_full_build(tmp_path, data_dirs, monkeypatch):
+    monkeypatch.setattr(settings, "RAG_DOC_STRATEGY", "rows")
+    monkeypatch.setattr(settings, "RAG_INDEX_MODE", "flat")
+    old, new = _csv_bytes(30), _csv_bytes(40)
+    meta = _dataset(data_dirs[0], "ds_index", old)
+    retriever = retriever_from_payload(build_index_payload(meta), k=5)
+    before = len(retriever.texts)
+
+    staged = {**meta, "raw_path": _upload(tmp_path, new)}
+    retriever.extend(build_append_payload(staged, len(old), len(retriever.row_doc)))
+
+    assert len(retriever.texts) == before + 10
+    assert retriever.vectorstore.index.ntotal == len(retriever.texts)
+    assert len(retriever.row_doc) == 40
+    assert retriever.row_doc[30:].tolist() == list(range(before, before + 10))
+    assert [m["row"] for m in retriever.metadatas[before:]] == list(range(30, 40))
+
+    # 꼬리에만 있는 값은 정확 일치로, 꼬리 행에 대한 필터는 컬럼 색인으로 찾습니다.
+    documents, _ = retriever.search("A0035")
+    assert documents[0].metadata["row"] == 35
+    documents, matched = retriever.search("Busan", filters=[{"column": "amount", "op": ">=", "value": 1000 + 30 * 7.5}])
+    assert matched == 10
+    assert {doc.metadata["row"] for doc in documents} <= set(range(30, 40))
+
+
+def test_restore_dataset_rolls_back_raw_and_derived(tmp_path, data_dirs):
+    old, new = _csv_bytes(30), _csv_bytes(40)
+    meta = _dataset(data_dirs[0], "ds_rollback", old)
+    write_meta("ds_rollback", meta)
+    build_summary("ds_rollback", meta)
+    summary_before = (dataset_dir("ds_rollback") / "summary.json").read_bytes()
+
+    backup = snapshot_dataset("ds_rollback", meta["raw_path"])
+    staged = {**meta, "raw_path": _upload(tmp_path, new)}
+    append_summary("ds_rollback", staged, len(old))
+    append_tail(staged["raw_path"], meta["raw_path"], len(old))
+    (dataset_dir("ds_rollback") / "extra.npz").write_bytes(b"partial")
+    restore_dataset("ds_rollback", meta["raw_path"], len(old), backup)
+
+    assert (data_dirs[0] / "ds_rollback" / "raw.csv").read_bytes() == old
+    assert (dataset_dir("ds_rollback") / "summary.json").read_bytes() == summary_before
+    assert not (dataset_dir("ds_rollback") / "extra.npz").exists()
+    assert not backup.exists()
+    # 되돌린 뒤에는 같은 꼬리를 다시 추가 업로드로 처리할 수 있습니다.
+    assert find_append_start(staged["raw_path"], meta) == len(old)